@@ -1,13 +1,41 @@
+import contextvars
+import re
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from tools.base_tool import BaseTool
+from core import instrumentation
 from core.config import Config
+from core.intent_router import IntentRouter, RouteResult, default_router
+from core.llm import LLMClient, LLMError, client_from_config
+from core.memory import Message, Session, SessionMemory
+from core.response_cache import Probe, ResponseCache
+from core.runtime import current_session, iterate_sync, run_sync
+from core.utils import truncate_stream
+from core.templates import Template
+from core.tool_registry import ToolRegistry
+
+
+# 关键词未命中时请大模型判断意图
+INTENT_PROMPT = Template("请判断用户输入属于以下哪一类意图，只输出意图名称；都不属于时输出 none。\n"
+                         "意图：{intents}\n用户输入：{text}")
+ANSWER_PROMPT = Template("参考资料：\n{context}\n\n请根据参考资料回答用户的问题：{text}")
+DEFAULT_SYSTEM_PROMPT = "你是一个乐于助人的智能助手，请用简洁的中文回答。"
+
+# 包含这些字样的响应是错误提示，不写入响应缓存
+ERROR_MARKERS = ("错误", "出错")
 
 
 class BaseAgent(ABC):
     """
     Agent 基类，定义了 Agent 的基本接口和通用功能
     """
+
+    # 意图名称 -> 关键词列表，按优先级排列，子类覆盖
+    INTENTS: Dict[str, List[str]] = {}
+    # 响应缓存的有效期（秒），0 表示不缓存；可用配置项 response_cache_ttl 覆盖
+    RESPONSE_CACHE_TTL: float = 0
+    # 响应是否因用户而异（如包含个人信息），是则缓存按用户隔离
+    USER_SCOPED_CACHE: bool = False
     
     def __init__(self, config: Config):
         """
@@ -17,17 +45,175 @@ class BaseAgent(ABC):
             config (Config): 配置对象
         """
         self.config = config
-        self.tools: List[BaseTool] = []
-        self.memory = []
+        # 按工具名查找工具，工具在首次使用时才构造
+        self.tools = ToolRegistry()
+        # 按会话ID保存有界的对话历史和最近出现的实体
+        self.sessions = SessionMemory(
+            capacity=config.get("memory_capacity", 50),
+            max_sessions=config.get("max_sessions", 10000),
+            ttl=config.get("session_ttl", 3600),
+        )
+        self.router: IntentRouter = default_router
+        self.router.register(self.intent_namespace, self.INTENTS)
+        # 配置 llm_base_url 时使用大模型兜底意图识别和生成回答，相同配置的 Agent 共用一个客户端
+        self.llm: Optional[LLMClient] = client_from_config(config)
+        # 相同或近似的输入直接返回缓存的响应；response_cache_ttl 可以是秒数，或 Agent 类名 -> 秒数
+        ttl = config.get("response_cache_ttl", self.RESPONSE_CACHE_TTL)
+        if isinstance(ttl, dict):
+            ttl = ttl.get(type(self).__name__, self.RESPONSE_CACHE_TTL)
+        self.response_cache: Optional[ResponseCache] = ResponseCache(
+            ttl, max_size=config.get("response_cache_size", 10000),
+            threshold=config.get("response_cache_threshold", 0.8),
+        ) if ttl else None
+
+    @property
+    def session(self) -> Session:
+        """
+        当前会话，会话由 get_response/aget_response 的 session_id 决定
+        """
+        return self.sessions.get(current_session.get())
+
+    @property
+    def memory(self) -> List[Dict[str, str]]:
+        """
+        当前会话的对话历史（按时间顺序，最多保留 memory_capacity 条），
+        每条为 {"role": ..., "content": ...}
+        """
+        return [message.to_dict() for message in self.session.messages]
+
+    @property
+    def history(self) -> List[Message]:
+        """
+        当前会话的原始消息记录（包含时间戳）
+        """
+        return list(self.session.messages)
+
+    @property
+    def current_user_id(self) -> Optional[str]:
+        """
+        当前会话的用户ID，由 get_response/aget_response 的 user_id 设置
+        """
+        return self.session.user_id
+
+    @current_user_id.setter
+    def current_user_id(self, user_id: Optional[str]) -> None:
+        self.session.user_id = user_id
+
+    @property
+    def intent_namespace(self) -> str:
+        """
+        在共享路由器中注册关键词表使用的命名空间
+        """
+        return type(self).__name__
+
+    def route(self, user_input: str) -> RouteResult:
+        """
+        对用户输入做一次意图识别
+        
+        Args:
+            user_input (str): 用户输入
+            
+        Returns:
+            RouteResult: 所有 Agent 的意图命中结果
+        """
+        tracer = instrumentation.tracer
+        if tracer is None:
+            return self.router.route(user_input)
+        with tracer.start("agent.route", self.intent_namespace):
+            return self.router.route(user_input)
+
+    def classify(self, user_input: str) -> Optional[str]:
+        """
+        识别用户输入在本 Agent 中优先级最高的意图
+        
+        Args:
+            user_input (str): 用户输入
+            
+        Returns:
+            Optional[str]: 意图名称，未命中时返回 None
+        """
+        intent = self.route(user_input).best(self.intent_namespace)
+        if intent is None and self.llm is not None and self.INTENTS:
+            intent = self.llm_intent(user_input)
+        return intent
 
-    def add_tool(self, tool: BaseTool) -> None:
+    def llm_intent(self, user_input: str) -> Optional[str]:
+        """
+        请大模型从本 Agent 的意图中选择一个
+        
+        Args:
+            user_input (str): 用户输入
+            
+        Returns:
+            Optional[str]: 意图名称，大模型不可用、调用失败或判断为都不属于时返回 None
+        """
+        if self.llm is None:
+            return None
+        prompt = INTENT_PROMPT.render(intents="、".join(self.INTENTS), text=user_input)
+        try:
+            with instrumentation.span("agent.llm_intent", self.intent_namespace):
+                answer = self.llm.complete(prompt, max_tokens=8).lower()
+        except LLMError:
+            return None
+        # 取回答中最先出现的意图名称
+        match = re.search(r"\b(" + "|".join(map(re.escape, self.INTENTS)) + r")\b", answer)
+        return match.group(1) if match else None
+
+    def generate_answer(self, user_input: str, context: Optional[str] = None) -> Optional[str]:
+        """
+        用大模型生成回答，附带当前会话最近的对话历史
+        
+        Args:
+            user_input (str): 用户输入
+            context (Optional[str]): 参考资料（如知识库检索结果）
+            
+        Returns:
+            Optional[str]: 回答，大模型不可用或调用失败时返回 None
+        """
+        if self.llm is None:
+            return None
+        messages = [{"role": "system", "content": self.config.get("system_prompt", DEFAULT_SYSTEM_PROMPT)}]
+        history = self.memory[-self.config.get("llm_history", 6):]
+        # get_response 已把本次输入记入历史，这里单独作为最后一条发送
+        if history and history[-1] == {"role": "user", "content": user_input}:
+            history.pop()
+        messages.extend(history)
+        content = ANSWER_PROMPT.render(context=context, text=user_input) if context else user_input
+        messages.append({"role": "user", "content": content})
+        try:
+            with instrumentation.span("agent.llm_answer", self.intent_namespace):
+                return self.llm.chat(messages).text
+        except LLMError:
+            return None
+
+    def add_tool(self, tool: Union[type, BaseTool, Callable[[], BaseTool]], name: Optional[str] = None,
+                 **kwargs) -> str:
         """
         添加工具到 Agent
         
         Args:
-            tool (BaseTool): 工具实例
+            tool (Union[type, BaseTool, Callable[[], BaseTool]]): 工具类（kwargs 为构造参数）、工具实例，
+                或返回工具实例的无参工厂函数；工具在首次使用时才构造，STATELESS 为真的工具类和参数相同时
+                在 Agent 之间共享
+            name (Optional[str]): 工具名，默认使用工具的 name 属性
+            **kwargs: 工具类的构造参数
+            
+        Returns:
+            str: 工具名
+        """
+        return self.tools.register(tool, name=name, **kwargs)
+
+    def get_tool(self, name: str) -> BaseTool:
+        """
+        按工具名获取工具
+        
+        Args:
+            name (str): 工具名
+            
+        Returns:
+            BaseTool: 工具实例
         """
-        self.tools.append(tool)
+        return self.tools.get(name)
 
     @abstractmethod
     def process_request(self, user_input: str) -> str:
@@ -42,17 +228,218 @@ class BaseAgent(ABC):
         """
         pass
 
-    def get_response(self, user_input: str) -> str:
+    async def aprocess_request(self, user_input: str) -> str:
+        """
+        异步处理用户请求，默认将同步的 process_request 放到共享线程池中执行，
+        子类可以覆盖为原生异步实现
+        
+        Args:
+            user_input (str): 用户输入
+            
+        Returns:
+            str: 处理结果
+        """
+        return await run_sync(self.process_request, user_input)
+
+    def stream_request(self, user_input: str) -> Iterator[str]:
+        """
+        逐段处理用户请求，拼接后与 process_request 的结果相同；默认一次输出完整结果，
+        子类可以覆盖为调用工具的 stream 边生成边输出
+        
+        Args:
+            user_input (str): 用户输入
+            
+        Returns:
+            Iterator[str]: 处理结果片段
+        """
+        yield self.process_request(user_input)
+
+    def _cache_scope(self) -> Optional[str]:
+        return self.session.user_id if self.USER_SCOPED_CACHE else None
+
+    def cacheable(self, user_input: str) -> bool:
+        """
+        判断请求的响应能否缓存，响应依赖会话上下文的请求子类应返回 False
+        
+        Args:
+            user_input (str): 用户输入
+            
+        Returns:
+            bool: 能否缓存
+        """
+        return True
+
+    def cached_response(self, user_input: str) -> Optional[str]:
+        """
+        查找当前用户可见的缓存响应
+        
+        Args:
+            user_input (str): 用户输入
+            
+        Returns:
+            Optional[str]: 缓存的响应，未启用缓存或未命中时返回 None
+        """
+        return self._lookup_cache(user_input)[0]
+
+    def _lookup_cache(self, user_input: str) -> Tuple[Optional[str], Optional[Probe]]:
+        # 未启用缓存或请求不能缓存时签名等为 None，响应也不必写入缓存
+        if self.response_cache is None or not self.cacheable(user_input):
+            return None, None
+        with instrumentation.span("agent.cache", self.intent_namespace) as span:
+            response, probe = self.response_cache.lookup(user_input, self._cache_scope())
+            span.set("hit", response is not None)
+        return response, probe
+
+    def cache_response(self, user_input: str, response: str, probe: Optional[Probe] = None) -> None:
+        """
+        缓存响应，错误提示不缓存
+        
+        Args:
+            user_input (str): 用户输入
+            response (str): 响应
+            probe (Optional[Probe]): 查找缓存时算出的签名等，传入时视为已确认能缓存
+        """
+        if self.response_cache is None or (probe is None and not self.cacheable(user_input)) \
+                or any(marker in response for marker in ERROR_MARKERS):
+            return
+        self.response_cache.set(user_input, response, self._cache_scope(), probe)
+
+    def get_response(self, user_input: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> str:
         """
         获取 Agent 的响应
         
         Args:
             user_input (str): 用户输入
+            session_id (Optional[str]): 会话ID，默认沿用当前上下文的会话
+            user_id (Optional[str]): 会话所属用户ID，默认沿用会话已记录的用户
+            
+        Returns:
+            str: Agent 响应
+        """
+        tracer = instrumentation.tracer
+        if tracer is None:
+            return self._respond(user_input, session_id, user_id)
+        with tracer.start("agent.get_response", self.intent_namespace):
+            return self._respond(user_input, session_id, user_id)
+
+    def _respond(self, user_input: str, session_id: Optional[str], user_id: Optional[str]) -> str:
+        token = current_session.set(session_id) if session_id is not None else None
+        try:
+            session = self.session
+            if user_id is not None:
+                session.user_id = user_id
+            session.add("user", user_input)
+            response, probe = self._lookup_cache(user_input)
+            if response is None:
+                response = self.process_request(user_input)
+                if probe is not None:
+                    self.cache_response(user_input, response, probe)
+            session.add("assistant", response)
+            return response
+        finally:
+            if token is not None:
+                current_session.reset(token)
+
+    async def aget_response(self, user_input: str, session_id: Optional[str] = None,
+                            user_id: Optional[str] = None) -> str:
+        """
+        异步获取 Agent 的响应，不同会话的请求可以在同一个 Agent 实例上并发执行
+        
+        Args:
+            user_input (str): 用户输入
+            session_id (Optional[str]): 会话ID，默认沿用当前上下文的会话
+            user_id (Optional[str]): 会话所属用户ID，默认沿用会话已记录的用户
             
         Returns:
             str: Agent 响应
         """
-        self.memory.append({"role": "user", "content": user_input})
-        response = self.process_request(user_input)
-        self.memory.append({"role": "assistant", "content": response})
-        return response
\ No newline at end of file
+        tracer = instrumentation.tracer
+        if tracer is None:
+            return await self._arespond(user_input, session_id, user_id)
+        with tracer.start("agent.get_response", self.intent_namespace):
+            return await self._arespond(user_input, session_id, user_id)
+
+    async def _arespond(self, user_input: str, session_id: Optional[str], user_id: Optional[str]) -> str:
+        token = current_session.set(session_id) if session_id is not None else None
+        try:
+            session = self.session
+            if user_id is not None:
+                session.user_id = user_id
+            session.add("user", user_input)
+            response, probe = self._lookup_cache(user_input)
+            if response is None:
+                response = await self.aprocess_request(user_input)
+                if probe is not None:
+                    self.cache_response(user_input, response, probe)
+            session.add("assistant", response)
+            return response
+        finally:
+            if token is not None:
+                current_session.reset(token)
+
+    def _stream(self, user_input: str, user_id: Optional[str], max_length: Optional[int]) -> Iterator[str]:
+        session = self.session
+        if user_id is not None:
+            session.user_id = user_id
+        session.add("user", user_input)
+        cached, probe = self._lookup_cache(user_input)
+        chunks = []
+        for chunk in truncate_stream((cached,) if cached is not None else self.stream_request(user_input), max_length):
+            chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
+        # 截断后的响应不完整，不写入缓存
+        if cached is None and probe is not None and (max_length is None or len(response) <= max_length):
+            self.cache_response(user_input, response, probe)
+        session.add("assistant", response)
+
+    def _stream_context(self, session_id: Optional[str]) -> contextvars.Context:
+        # 流式响应在调用方多次取值之间挂起，会话ID放在独立的上下文中，不影响调用方的上下文
+        context = contextvars.copy_context()
+        if session_id is not None:
+            context.run(current_session.set, session_id)
+        return context
+
+    def stream_response(self, user_input: str, session_id: Optional[str] = None, user_id: Optional[str] = None,
+                        max_length: Optional[int] = None) -> Iterator[str]:
+        """
+        逐段获取 Agent 的响应，首个片段生成后即可输出；完整响应在输出结束后记入会话历史
+        
+        Args:
+            user_input (str): 用户输入
+            session_id (Optional[str]): 会话ID，默认沿用当前上下文的会话
+            user_id (Optional[str]): 会话所属用户ID，默认沿用会话已记录的用户
+            max_length (Optional[int]): 响应最大长度，超出时截断并停止生成，None 表示不限制
+            
+        Returns:
+            Iterator[str]: 响应片段
+        """
+        context = self._stream_context(session_id)
+        chunks = context.run(self._stream, user_input, user_id, max_length)
+        done = object()
+        try:
+            while True:
+                chunk = context.run(next, chunks, done)
+                if chunk is done:
+                    return
+                yield chunk
+        finally:
+            context.run(chunks.close)
+
+    async def astream_response(self, user_input: str, session_id: Optional[str] = None,
+                               user_id: Optional[str] = None, max_length: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        异步逐段获取 Agent 的响应，各片段在共享线程池中生成，不阻塞事件循环
+        
+        Args:
+            user_input (str): 用户输入
+            session_id (Optional[str]): 会话ID，默认沿用当前上下文的会话
+            user_id (Optional[str]): 会话所属用户ID，默认沿用会话已记录的用户
+            max_length (Optional[int]): 响应最大长度，超出时截断并停止生成，None 表示不限制
+            
+        Returns:
+            AsyncIterator[str]: 响应片段
+        """
+        context = self._stream_context(session_id)
+        async for chunk in iterate_sync(context.run(self._stream, user_input, user_id, max_length), context):
+            yield chunk
\ No newline at end of file
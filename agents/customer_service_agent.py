@@ -2,12 +2,23 @@ from agents.base_agent import BaseAgent
 from tools.customer_service_tool import CustomerInfoTool
 from tools.knowledge_base_tool import KnowledgeBaseTool
 from core.config import Config
+from core.entities import extract_entity
+from typing import Iterator
 
 
 class CustomerServiceAgent(BaseAgent):
     """
     智能客服机器人 Agent，处理客户咨询、查询用户信息和知识库
     """
+
+    INTENTS = {
+        "order": ["订单", "购买", "订单号", "order", "购买记录"],
+        "profile": ["个人信息", "账户", "资料", "profile", "信息"],
+        "help": ["怎么办", "怎么解决", "如何", "help", "帮助", "问题"],
+    }
+    # 订单、个人信息因用户而异，缓存按用户隔离；订单状态会变化，有效期较短
+    RESPONSE_CACHE_TTL = 60
+    USER_SCOPED_CACHE = True
     
     def __init__(self, config: Config):
         """
@@ -17,8 +28,10 @@ class CustomerServiceAgent(BaseAgent):
             config (Config): 配置对象
         """
         super().__init__(config)
-        self.add_tool(CustomerInfoTool())
-        self.add_tool(KnowledgeBaseTool())
+        self.add_tool(CustomerInfoTool, db_path=config.get("customer_db_path"))
+        # 配置 kb_index_dir 时使用磁盘持久化索引，启动时只映射已有的索引文件
+        self.add_tool(KnowledgeBaseTool, index_dir=config.get("kb_index_dir"),
+                      vector_search=config.get("kb_vector_search", True), vector_dim=config.get("kb_vector_dim", 1024))
 
     def process_request(self, user_input: str) -> str:
         """
@@ -30,58 +43,50 @@ class CustomerServiceAgent(BaseAgent):
         Returns:
             str: 客服机器人的响应
         """
-        import re
+        return "".join(self.stream_request(user_input))
+
+    def stream_request(self, user_input: str) -> Iterator[str]:
+        """
+        逐段处理客户服务请求，知识库条目逐条输出
         
-        # 检测用户ID（模拟从认证系统获取）
-        user_id = getattr(self, 'current_user_id', 'guest')
+        Args:
+            user_input (str): 用户输入的客服请求
+            
+        Returns:
+            Iterator[str]: 客服机器人的响应片段
+        """
+        # 检测用户ID（模拟从认证系统获取），按会话隔离
+        user_id = self.current_user_id or 'guest'
+        identified = user_id != 'guest'
         
         # 识别请求类型
-        if any(keyword in user_input.lower() for keyword in ["订单", "购买", "订单号", "order", "购买记录"]):
-            # 处理订单查询请求
-            # 改进的正则表达式以匹配更广泛的订单号格式
-            possible_matches = [
-                re.search(r'订单号[:：\s]*(\w+)', user_input),
-                re.search(r'order[ \w]*[:：\s]*(\w+)', user_input, re.IGNORECASE),
-                re.search(r'订单[:：\s]*(\w+)', user_input)
-            ]
-            
-            order_match = None
-            order_id = None
-            
-            # 查找第一个有效的匹配
-            for match in possible_matches:
-                if match:
-                    order_match = match
-                    order_id = match.group(1)
-                    break
-            
-            # 如果没有通过上述方式匹配到，尝试从整个输入中提取可能的订单号
-            if not order_id:
-                # 查找形如 ORD001 的模式
-                alt_match = re.search(r'([A-Z]{2,}[0-9]{2,})', user_input.upper())
-                if alt_match:
-                    order_id = alt_match.group(1)
+        intent = self.classify(user_input)
+        if intent == "order":
+            # 处理订单查询请求：依次尝试“订单号”、“order”、“订单”前缀，最后兜底匹配形如 ORD001 的编号
+            order_id = extract_entity(user_input, "order_id")
             
             if order_id:
-                info_tool = self.tools[0]  # CustomerInfoTool
-                result = info_tool.execute({"query_type": "order", "order_id": order_id, "user_id": user_id})
-                return result
+                info_tool = self.get_tool(CustomerInfoTool.name)
+                params = {"query_type": "order", "order_id": order_id}
+                # 会话用户未知时不传用户ID，直接走订单号索引
+                if identified:
+                    params["user_id"] = user_id
+                yield info_tool.execute(params)
             else:
-                return "请提供订单号以便查询订单信息。"
+                yield "请提供订单号以便查询订单信息。"
         
-        elif any(keyword in user_input for keyword in ["个人信息", "账户", "资料", "profile", "信息"]):
+        elif intent == "profile":
             # 处理个人信息查询请求
-            info_tool = self.tools[0]  # CustomerInfoTool
-            result = info_tool.execute({"query_type": "profile", "user_id": user_id})
-            return result
+            info_tool = self.get_tool(CustomerInfoTool.name)
+            yield info_tool.execute({"query_type": "profile", "user_id": user_id})
+        
+        elif intent == "help" or self.llm is None:
+            # 求助及其他请求查询知识库
+            kb_tool = self.get_tool(KnowledgeBaseTool.name)
+            yield from kb_tool.stream({"query": user_input})
         
-        elif any(keyword in user_input.lower() for keyword in ["怎么办", "怎么解决", "如何", "help", "帮助", "怎么办", "问题"]):
-            # 处理知识库查询请求
-            kb_tool = self.tools[1]  # KnowledgeBaseTool
-            result = kb_tool.execute({"query": user_input})
-            return result
         else:
-            # 默认查询知识库
-            kb_tool = self.tools[1]  # KnowledgeBaseTool
-            result = kb_tool.execute({"query": user_input})
-            return result
\ No newline at end of file
+            # 配置了大模型时，其他请求以知识库检索结果为参考生成回答，调用失败时直接返回检索结果
+            context = self.get_tool(KnowledgeBaseTool.name).execute({"query": user_input})
+            answer = self.generate_answer(user_input, context)
+            yield answer if answer is not None else context
\ No newline at end of file
@@ -1,12 +1,18 @@
 from agents.base_agent import BaseAgent
-from tools.data_analysis_tool import DataAnalysisTool
+from tools.data_analysis_tool import DEFAULT_ARROW_CACHE_DIR, DataAnalysisTool
 from core.config import Config
+from core.entities import extract_entity
+from typing import Iterator
 
 
 class DataAnalystAgent(BaseAgent):
     """
     数据分析师 Agent，专门处理数据分析相关的请求
     """
+
+    INTENTS = {
+        "analyze": ["分析", "analyze", "统计", "statistics", "数据", "data"],
+    }
     
     def __init__(self, config: Config):
         """
@@ -16,7 +22,12 @@ class DataAnalystAgent(BaseAgent):
             config (Config): 配置对象
         """
         super().__init__(config)
-        self.add_tool(DataAnalysisTool())
+        self.add_tool(
+            DataAnalysisTool,
+            chunk_size=config.get("data_chunk_size", 100000),
+            stream_threshold=config.get("data_stream_threshold", 256 * 1024 * 1024),
+            arrow_cache_dir=config.get("data_arrow_cache_dir", DEFAULT_ARROW_CACHE_DIR),
+        )
 
     def process_request(self, user_input: str) -> str:
         """
@@ -28,21 +39,28 @@ class DataAnalystAgent(BaseAgent):
         Returns:
             str: 数据分析结果
         """
+        return "".join(self.stream_request(user_input))
+
+    def stream_request(self, user_input: str) -> Iterator[str]:
+        """
+        逐段处理数据分析请求：标题、统计报告、图表信息依次输出
+        
+        Args:
+            user_input (str): 用户输入的数据分析请求
+            
+        Returns:
+            Iterator[str]: 数据分析结果片段
+        """
         # 检查输入是否包含数据分析相关关键词
-        if any(keyword in user_input.lower() for keyword in ["分析", "analyze", "统计", "statistics", "数据", "data"]):
+        if self.classify(user_input) == "analyze":
             # 检查是否包含数据源信息
-            import re
-            path_match = re.search(r'数据路径[:：]\s*([^\s,;]+)', user_input) or \
-                            re.search(r'data path[:：]\s*([^\s,;]+)', user_input) or \
-                            re.search(r'([^\s,;]+\.(csv|xlsx|json))', user_input)
+            data_path = extract_entity(user_input, "data_path")
             
-            if path_match:
-                data_path = path_match.group(1)
+            if data_path:
                 # 使用数据分析工具
-                analysis_tool = self.tools[0]  # 假设数据分析工具是第一个
-                result = analysis_tool.execute({"data_path": data_path, "query": user_input})
-                return result
+                analysis_tool = self.get_tool(DataAnalysisTool.name)
+                yield from analysis_tool.stream({"data_path": data_path, "query": user_input})
             else:
-                return "请提供数据分析的路径或文件名。"
+                yield "请提供数据分析的路径或文件名。"
         else:
-            return "我是数据分析助手，可以帮您分析数据文件并提供洞察。"
\ No newline at end of file
+            yield "我是数据分析助手，可以帮您分析数据文件并提供洞察。"
\ No newline at end of file
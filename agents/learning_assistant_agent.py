@@ -1,12 +1,19 @@
 from agents.base_agent import BaseAgent
 from tools.learning_tool import LearningResourceTool
 from core.config import Config
+from core.entities import extract_entity
 
 
 class LearningAssistantAgent(BaseAgent):
     """
     个性化学习助手 Agent，根据用户的学习进度和兴趣提供学习资源和解答疑问
     """
+
+    INTENTS = {
+        "learn": ["学习", "课程", "教程", "推荐", "练习", "题目", "question", "learn", "study", "education"],
+    }
+    # 推荐的资源和练习题有意随机挑选，响应不缓存
+    RESPONSE_CACHE_TTL = 0
     
     def __init__(self, config: Config):
         """
@@ -16,7 +23,7 @@ class LearningAssistantAgent(BaseAgent):
             config (Config): 配置对象
         """
         super().__init__(config)
-        self.add_tool(LearningResourceTool())
+        self.add_tool(LearningResourceTool)
         # 初始化用户学习档案（简单使用内存存储，实际应使用数据库）
         self.user_profiles = {}
 
@@ -30,19 +37,16 @@ class LearningAssistantAgent(BaseAgent):
         Returns:
             str: 学习助手的响应
         """
-        import re
-        
         # 检测是否是学习相关请求
-        learning_keywords = ["学习", "课程", "教程", "推荐", "练习", "题目", "question", "learn", "study", "education"]
-        if any(keyword in user_input.lower() for keyword in learning_keywords):
+        if self.classify(user_input) == "learn":
             # 检测用户ID（在真实场景中，这将来自用户认证系统）
-            user_id = getattr(self, 'current_user_id', 'default_user')
+            user_id = self.current_user_id or 'default_user'
             
             # 解析用户请求以获取主题
             subject = self._extract_subject(user_input)
             
             # 使用学习工具
-            learning_tool = self.tools[0]  # 假设学习工具是第一个
+            learning_tool = self.get_tool(LearningResourceTool.name)
             params = {
                 "query": user_input,
                 "subject": subject,
@@ -56,29 +60,6 @@ class LearningAssistantAgent(BaseAgent):
     
     def _extract_subject(self, user_input):
         """
-        从用户输入中提取学习主题
+        从用户输入中提取学习主题：优先使用关键词匹配，失败时尝试正则匹配
         """
-        import re
-        
-        user_lower = user_input.lower()
-        
-        # 优先使用关键词匹配
-        if 'python' in user_lower:
-            return 'python'
-        elif 'ai' in user_lower or '人工智能' in user_lower or '机器学习' in user_lower or 'ml' in user_lower:
-            return 'ai'
-        elif 'web' in user_lower or '前端' in user_lower or 'react' in user_lower or 'javascript' in user_lower or 'js' in user_lower:
-            return 'web'
-        
-        # 如果关键词匹配失败，尝试正则匹配
-        topic_match = re.search(r'学习(.+?)|推荐(.+?)学习|学习(.+?)资源|tutorial on ([^|]+)|learn ([^|]+)|练习(.+?)|(.+?)练习|(.+?)题目', user_input)
-        subject = None
-        if topic_match:
-            # 提取第一个非空匹配组
-            groups = topic_match.groups()
-            subject = next((group for group in groups if group is not None and group.strip()), None)
-            
-            if subject:
-                subject = subject.strip()
-        
-        return subject
\ No newline at end of file
+        return extract_entity(user_input, "subject")
\ No newline at end of file
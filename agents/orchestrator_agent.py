@@ -0,0 +1,263 @@
+import contextvars
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+from agents.base_agent import BaseAgent
+from agents.weather_agent import WeatherAgent
+from agents.data_analyst_agent import DataAnalystAgent
+from agents.learning_assistant_agent import LearningAssistantAgent
+from agents.customer_service_agent import CustomerServiceAgent
+from core.config import Config
+from core.entities import extract_entities
+from core.lazy import lazy_import
+from core.runtime import current_session
+from core.templates import Template
+
+# 只有异步调用方和分支出错时会用到 asyncio，异步调用方已经导入过它
+asyncio = lazy_import("asyncio")
+
+
+# 复合请求按标点和连接词切分为子句，各子句分别打分
+_CLAUSE_SEPARATOR = re.compile(r"[，,。；;！!？?\n]+|还有|另外|顺便|同时|并且")
+
+TIMEOUT_TEMPLATE = Template("{agent}暂时没有响应，请稍后再试。")
+ERROR_TEMPLATE = Template("{agent}处理出错：{error}")
+# 多个分支的结果按子句顺序用空行拼接
+BRANCH_SEPARATOR = "\n\n"
+
+
+class Branch(NamedTuple):
+    """
+    一个分支：交给某个 Agent 处理的那部分输入
+    """
+    agent: str
+    text: str
+
+
+class OrchestratorAgent(BaseAgent):
+    """
+    编排 Agent：为每条输入给各个 Agent 打分并转交给最相关的 Agent；
+    复合请求（如同时问天气和订单）拆成多个分支并发处理，总耗时取决于最慢的分支而不是各分支之和
+    """
+
+    # 实体类型 -> 处理该实体的 Agent，抽取到该实体时为对应 Agent 加分
+    ENTITY_HINTS = {
+        "city": "WeatherAgent",
+        "order_id": "CustomerServiceAgent",
+        "data_path": "DataAnalystAgent",
+        "subject": "LearningAssistantAgent",
+    }
+    ENTITY_WEIGHT = 2.0
+    # 超时和出错提示中使用的 Agent 名称
+    LABELS = {
+        "WeatherAgent": "天气查询",
+        "CustomerServiceAgent": "客服",
+        "DataAnalystAgent": "数据分析",
+        "LearningAssistantAgent": "学习助手",
+    }
+
+    def __init__(self, config: Config, agents: Optional[Iterable[BaseAgent]] = None):
+        """
+        初始化编排 Agent
+
+        Args:
+            config (Config): 配置对象
+            agents (Optional[Iterable[BaseAgent]]): 参与编排的 Agent，默认用同一配置创建全部内置 Agent；
+                得分相同时排在前面的优先
+        """
+        super().__init__(config)
+        if agents is None:
+            agents = [cls(config) for cls in (WeatherAgent, CustomerServiceAgent, DataAnalystAgent,
+                                              LearningAssistantAgent)]
+        self.agents: Dict[str, BaseAgent] = {agent.intent_namespace: agent for agent in agents}
+        # 没有任何 Agent 得分时交给该 Agent，默认为能检索知识库的客服
+        fallback = config.get("orchestrator_fallback", "CustomerServiceAgent")
+        self.fallback = fallback if fallback in self.agents else next(iter(self.agents))
+        # 分支超时（秒），可以是秒数，或 Agent 类名 -> 秒数
+        self.timeouts = config.get("orchestrator_timeout", 10.0)
+        self.max_branches = config.get("orchestrator_max_branches", 4)
+        self.max_workers = config.get("orchestrator_workers", 8)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # 独立的线程池：分支在共享工具线程池中执行时，不会占满线程池后互相等待
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="orchestrator")
+        return self._executor
+
+    def timeout(self, agent: str) -> Optional[float]:
+        """
+        某个 Agent 分支的超时时间
+
+        Args:
+            agent (str): Agent 类名
+
+        Returns:
+            Optional[float]: 超时时间（秒），None 表示不限制
+        """
+        if isinstance(self.timeouts, dict):
+            return self.timeouts.get(agent, self.timeouts.get("default"))
+        return self.timeouts
+
+    def score(self, text: str) -> Dict[str, float]:
+        """
+        为各个 Agent 打分：命中关键词覆盖的字符数，抽取到相关实体时再加分
+
+        Args:
+            text (str): 用户输入（或其中的一个子句）
+
+        Returns:
+            Dict[str, float]: Agent 类名 -> 得分，只包含得分为正的 Agent，按 agents 的顺序排列
+        """
+        route = self.route(text)
+        hinted = {self.ENTITY_HINTS[kind] for kind in extract_entities(text, self.ENTITY_HINTS)}
+        scores = {}
+        for name in self.agents:
+            score = route.coverage(name) + (self.ENTITY_WEIGHT if name in hinted else 0.0)
+            if score > 0:
+                scores[name] = score
+        return scores
+
+    def plan(self, user_input: str) -> List[Branch]:
+        """
+        把输入切分为子句，每个子句交给得分最高的 Agent，同一 Agent 的子句合为一个分支；
+        没有得分的子句跟随前一个子句
+
+        Args:
+            user_input (str): 用户输入
+
+        Returns:
+            List[Branch]: 按子句顺序排列的分支，只有一个 Agent 时分支内容为完整输入
+        """
+        clauses = [clause.strip() for clause in _CLAUSE_SEPARATOR.split(user_input) if clause.strip()]
+        owners: List[Optional[str]] = []
+        for clause in clauses:
+            scores = self.score(clause)
+            owners.append(max(scores, key=scores.get) if scores else None)
+
+        assigned = [owner for owner in owners if owner is not None]
+        if not assigned:
+            return [Branch(self.fallback, user_input)]
+        # 开头没有得分的子句跟随第一个有得分的子句
+        previous = assigned[0]
+        grouped: Dict[str, List[str]] = {}
+        for clause, owner in zip(clauses, owners):
+            previous = owner or previous
+            grouped.setdefault(previous, []).append(clause)
+        if len(grouped) == 1:
+            return [Branch(previous, user_input)]
+        return [Branch(agent, "，".join(parts)) for agent, parts in list(grouped.items())[:self.max_branches]]
+
+    def process_request(self, user_input: str) -> str:
+        """
+        处理请求：单个分支直接转交，多个分支并发处理后按子句顺序合并
+
+        Args:
+            user_input (str): 用户输入
+
+        Returns:
+            str: 合并后的响应
+        """
+        return BRANCH_SEPARATOR.join(self._branch_results(self.plan(user_input)))
+
+    def stream_request(self, user_input: str) -> Iterator[str]:
+        """
+        逐段处理请求：单个分支直接使用该 Agent 的流式响应，多个分支按子句顺序在各自完成后输出
+
+        Args:
+            user_input (str): 用户输入
+
+        Returns:
+            Iterator[str]: 响应片段
+        """
+        branches = self.plan(user_input)
+        if len(branches) == 1:
+            branch = branches[0]
+            yield from self.agents[branch.agent].stream_response(
+                branch.text, session_id=current_session.get(), user_id=self.current_user_id)
+            return
+        for index, result in enumerate(self._branch_results(branches)):
+            yield BRANCH_SEPARATOR + result if index else result
+
+    async def aprocess_request(self, user_input: str) -> str:
+        """
+        异步处理请求：各分支作为独立任务并发执行，超时的任务被取消
+
+        Args:
+            user_input (str): 用户输入
+
+        Returns:
+            str: 合并后的响应
+        """
+        branches = self.plan(user_input)
+        user_id = self.current_user_id
+        tasks = [asyncio.ensure_future(asyncio.wait_for(self.agents[branch.agent].aget_response(
+            branch.text, user_id=user_id), self.timeout(branch.agent))) for branch in branches]
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            # 调用方取消本请求时一并取消尚未完成的分支
+            for task in tasks:
+                task.cancel()
+        return BRANCH_SEPARATOR.join(self._merge(branch, result) for branch, result in zip(branches, results))
+
+    def _branch_results(self, branches: List[Branch]) -> Iterator[str]:
+        """
+        执行各分支并按顺序输出结果；单个分支在调用线程中执行，多个分支提交到线程池并发执行，
+        每个分支在各自的超时时间内等待，超时后取消尚未开始的分支并输出超时提示
+        """
+        user_id = self.current_user_id
+        if len(branches) == 1:
+            branch = branches[0]
+            yield self.agents[branch.agent].get_response(branch.text, user_id=user_id)
+            return
+
+        start = time.monotonic()
+        executor = self._get_executor()
+        # 每个分支在复制的上下文中执行，沿用本请求的会话ID
+        futures: List[Future] = [
+            executor.submit(contextvars.copy_context().run, self.agents[branch.agent].get_response, branch.text,
+                            user_id=user_id)
+            for branch in branches
+        ]
+        try:
+            for branch, future in zip(branches, futures):
+                timeout = self.timeout(branch.agent)
+                remaining = None if timeout is None else max(0.0, start + timeout - time.monotonic())
+                try:
+                    result = future.result(timeout=remaining)
+                except FutureTimeoutError as exc:
+                    # 已在执行的分支无法中断，结果被丢弃；尚未开始的分支不再执行
+                    future.cancel()
+                    result = exc
+                except Exception as exc:
+                    result = exc
+                yield self._merge(branch, result)
+        finally:
+            # 提前结束（如流式输出被截断）时取消尚未开始的分支
+            for future in futures:
+                future.cancel()
+
+    def _merge(self, branch: Branch, result: Union[str, BaseException]) -> str:
+        label = self.LABELS.get(branch.agent, branch.agent)
+        if isinstance(result, str):
+            return result
+        # concurrent.futures 和 asyncio 的超时异常在 Python 3.11 之前是各自的异常类，3.11 起才都是内置 TimeoutError
+        if isinstance(result, (FutureTimeoutError, asyncio.TimeoutError)):
+            return TIMEOUT_TEMPLATE.render(agent=label)
+        return ERROR_TEMPLATE.render(agent=label, error=str(result) or type(result).__name__)
+
+    def close(self) -> None:
+        """
+        关闭分支线程池
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
\ No newline at end of file
@@ -1,12 +1,19 @@
 from agents.base_agent import BaseAgent
 from tools.weather_tool import WeatherTool
 from core.config import Config
+from core.entities import extract_entity
 
 
 class WeatherAgent(BaseAgent):
     """
     天气查询 Agent，专门处理天气相关的查询请求
     """
+
+    INTENTS = {
+        "weather": ["天气", "weather"],
+    }
+    # 天气数据本身在工具中另有缓存，响应缓存省去意图识别和格式化
+    RESPONSE_CACHE_TTL = 300
     
     def __init__(self, config: Config):
         """
@@ -16,7 +23,34 @@ class WeatherAgent(BaseAgent):
             config (Config): 配置对象
         """
         super().__init__(config)
-        self.add_tool(WeatherTool())
+        # 配置了 weather_api_url 时使用真实天气服务，否则返回模拟数据
+        self.add_tool(
+            WeatherTool,
+            api_url=config.get("weather_api_url"),
+            api_key=config.get("weather_api_key"),
+            timeout=config.get("weather_timeout", (3.05, 10)),
+            retries=config.get("weather_retries", 2),
+            pool_size=config.get("weather_pool_size", 10),
+            cache_ttl=config.get("weather_cache_ttl", 600),
+            stale_ttl=config.get("weather_stale_ttl", 3600),
+            bulk_url=config.get("weather_bulk_url"),
+        )
+
+    def cacheable(self, user_input: str) -> bool:
+        """
+        只缓存明确提到城市的请求，未提到城市时沿用会话中的城市，响应因会话而异
+
+        Args:
+            user_input (str): 用户输入
+
+        Returns:
+            bool: 能否缓存
+        """
+        city = extract_entity(user_input, "city")
+        if city:
+            # 命中缓存时不会执行 process_request，在这里记住城市供后续追问使用
+            self.session.remember("city", city)
+        return bool(city)
 
     def process_request(self, user_input: str) -> str:
         """
@@ -29,28 +63,19 @@ class WeatherAgent(BaseAgent):
             str: 天气查询结果
         """
         # 检查输入是否包含城市信息
-        if "天气" in user_input or "weather" in user_input.lower():
+        if self.classify(user_input) == "weather":
             # 提取城市名称（这里简化处理，实际可能需要NLP技术）
-            import re
-            city_match = re.search(r'([A-Za-z\u4e00-\u9fa5]+)的天气|weather in ([A-Za-z\u4e00-\u9fa5]+)', user_input)
-            city = None
-            if city_match:
-                city = city_match.group(1) or city_match.group(2)
+            city = extract_entity(user_input, "city")
+            session = self.session
+            if city:
+                session.remember("city", city)
             else:
-                # 如果没有明确城市，尝试从记忆中获取
-                for item in reversed(self.memory):
-                    if "city" in item.get("content", ""):
-                        import json
-                        try:
-                            content = json.loads(item["content"])
-                            city = content.get("city")
-                        except:
-                            pass
-                        break
+                # 如果没有明确城市，使用本会话最近一次查询的城市
+                city = session.recall("city")
             
             if city:
                 # 使用天气工具查询
-                weather_tool = self.tools[0]  # 假设天气工具是第一个
+                weather_tool = self.get_tool(WeatherTool.name)
                 result = weather_tool.execute({"city": city})
                 return result
             else:
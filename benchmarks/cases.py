@@ -0,0 +1,360 @@
+"""
+基准用例：覆盖每个工具的 execute 和每个 Agent 的 get_response 路径
+
+每个用例是一个准备函数，参数为规模（条目数量）和数据目录，返回被测操作（参数为调用序号）和清理函数。
+Agent 用例默认关闭响应缓存，测量完整的处理路径；带 cached 后缀的用例测量缓存命中的路径
+"""
+import json
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from benchmarks import corpora
+
+
+Operation = Callable[[int], Any]
+Setup = Callable[[int, str], Tuple[Operation, Optional[Callable[[], None]]]]
+
+
+class Case(NamedTuple):
+    """
+    基准用例
+    """
+    name: str
+    description: str
+    setup: Setup
+
+
+CASES: Dict[str, Case] = {}
+
+# 同一规模的知识库向量索引占用 4 * 维度 * 条目数 字节，百万条目时降低维度
+_VECTOR_DIMS = {1000000: 256}
+
+
+def case(name: str, description: str) -> Callable[[Setup], Setup]:
+    """
+    注册基准用例的装饰器
+
+    Args:
+        name (str): 用例名，形如 tool.knowledge_base.hit
+        description (str): 用例说明
+
+    Returns:
+        Callable[[Setup], Setup]: 装饰器
+    """
+    def register(setup: Setup) -> Setup:
+        CASES[name] = Case(name, description, setup)
+        return setup
+    return register
+
+
+def vector_dim(size: int) -> int:
+    """
+    某一规模的知识库使用的向量维度
+
+    Args:
+        size (int): 条目数量
+
+    Returns:
+        int: 向量维度
+    """
+    return _VECTOR_DIMS.get(size, 1024)
+
+
+def _config(data_dir: str, size: int, **overrides) -> "Config":
+    from core.config import Config
+
+    config = {
+        "model": "benchmark",
+        "customer_db_path": corpora.customer_db(data_dir, size),
+        "kb_index_dir": corpora.kb_index(data_dir, size, vector_dim(size)),
+        "kb_vector_dim": vector_dim(size),
+        "data_arrow_cache_dir": None,
+    }
+    config.update(overrides)
+    return Config(config)
+
+
+class _WeatherHandler(BaseHTTPRequestHandler):
+    # 本地天气服务替身，返回 OpenWeatherMap 格式的数据
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        city = parse_qs(urlparse(self.path).query)["q"][0]
+        body = json.dumps({
+            "name": city,
+            "weather": [{"description": "多云"}],
+            "main": {"temp": 18.5, "humidity": 40},
+            "wind": {"speed": 2},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _weather_server() -> Tuple[str, Callable[[], None]]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _WeatherHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+
+    def close():
+        server.shutdown()
+        server.server_close()
+    return f"http://127.0.0.1:{server.server_port}/weather", close
+
+
+def _city(i: int) -> str:
+    # 城市名轮换，模拟不同用户查询不同城市
+    return corpora.CITIES[i % len(corpora.CITIES)]
+
+
+@case("tool.weather.mock", "天气工具：未配置接口地址时的模拟数据")
+def _weather_mock(size: int, data_dir: str):
+    from tools.weather_tool import WeatherTool
+
+    tool = WeatherTool()
+    return lambda i: tool.execute({"city": _city(i)}), None
+
+
+@case("tool.weather.http", "天气工具：每次都请求本地天气服务（关闭缓存）")
+def _weather_http(size: int, data_dir: str):
+    from tools.weather_tool import WeatherTool
+
+    url, close = _weather_server()
+    tool = WeatherTool(api_url=url, api_key="benchmark", retries=0, cache_ttl=0, stale_ttl=0)
+    return lambda i: tool.execute({"city": _city(i)}), close
+
+
+@case("tool.weather.cached", "天气工具：请求本地天气服务，城市数量有限，命中缓存")
+def _weather_cached(size: int, data_dir: str):
+    from tools.weather_tool import WeatherTool
+
+    url, close = _weather_server()
+    tool = WeatherTool(api_url=url, api_key="benchmark", retries=0)
+    return lambda i: tool.execute({"city": _city(i)}), close
+
+
+@case("tool.customer_info.profile", "客户信息工具：按用户ID查询资料")
+def _customer_profile(size: int, data_dir: str):
+    from tools.customer_service_tool import CustomerInfoTool
+
+    tool = CustomerInfoTool(db_path=corpora.customer_db(data_dir, size))
+    ids = [random.Random(0).randrange(size) for _ in range(10000)]
+    return lambda i: tool.execute({"query_type": "profile", "user_id": f"user{ids[i % len(ids)]}"}), tool.store.close
+
+
+@case("tool.customer_info.order", "客户信息工具：按用户ID和订单号查询订单")
+def _customer_order(size: int, data_dir: str):
+    from tools.customer_service_tool import CustomerInfoTool
+
+    tool = CustomerInfoTool(db_path=corpora.customer_db(data_dir, size))
+    ids = [random.Random(1).randrange(size) for _ in range(10000)]
+
+    def operation(i):
+        n = ids[i % len(ids)]
+        return tool.execute({"query_type": "order", "user_id": f"user{n}", "order_id": f"ORD{n:09d}"})
+    return operation, tool.store.close
+
+
+@case("tool.customer_info.order_guest", "客户信息工具：未知用户只凭订单号查询订单")
+def _customer_order_guest(size: int, data_dir: str):
+    from tools.customer_service_tool import CustomerInfoTool
+
+    tool = CustomerInfoTool(db_path=corpora.customer_db(data_dir, size))
+    ids = [random.Random(2).randrange(size) for _ in range(10000)]
+    return lambda i: tool.execute({"query_type": "order", "order_id": f"ORD{ids[i % len(ids)]:09d}"}), tool.store.close
+
+
+def _kb_tool(size: int, data_dir: str):
+    from tools.knowledge_base_tool import KnowledgeBaseTool
+
+    return KnowledgeBaseTool(index_dir=corpora.kb_index(data_dir, size, vector_dim(size)),
+                             vector_dim=vector_dim(size))
+
+
+@case("tool.knowledge_base.hit", "知识库工具：关键词命中倒排索引")
+def _kb_hit(size: int, data_dir: str):
+    tool = _kb_tool(size, data_dir)
+    queries, _ = corpora.kb_queries(1000)
+    return lambda i: tool.execute({"query": queries[i % len(queries)]}), None
+
+
+@case("tool.knowledge_base.vector", "知识库工具：倒排索引没有命中，退回向量检索")
+def _kb_vector(size: int, data_dir: str):
+    tool = _kb_tool(size, data_dir)
+    _, queries = corpora.kb_queries(1000)
+    return lambda i: tool.execute({"query": queries[i % len(queries)]}), None
+
+
+@case("tool.learning.resources", "学习资源工具：推荐学习资源")
+def _learning_resources(size: int, data_dir: str):
+    from tools.learning_tool import LearningResourceTool
+
+    tool = LearningResourceTool()
+    subjects = ["python", "ai", "web"]
+    return lambda i: tool.execute({"query": "推荐学习资源", "subject": subjects[i % 3]}), None
+
+
+@case("tool.learning.exercise", "学习资源工具：生成练习题")
+def _learning_exercise(size: int, data_dir: str):
+    from tools.learning_tool import LearningResourceTool
+
+    tool = LearningResourceTool()
+    subjects = ["python", "ai"]
+    return lambda i: tool.execute({"query": "给我出一道练习题", "subject": subjects[i % 2]}), None
+
+
+@case("tool.data_analysis.cached", "数据分析工具：分析同一个 CSV，命中已解析数据的缓存")
+def _analysis_cached(size: int, data_dir: str):
+    from core.charts import ChartRenderer
+    from tools.data_analysis_tool import DataAnalysisTool
+
+    renderer = ChartRenderer()
+    tool = DataAnalysisTool(arrow_cache_dir=None, chart_renderer=renderer)
+    path = corpora.rows_csv(data_dir, size)
+    return lambda i: tool.execute({"data_path": path, "query": "统计"}), renderer.close
+
+
+@case("tool.data_analysis.cold", "数据分析工具：每次重新读取并解析 CSV")
+def _analysis_cold(size: int, data_dir: str):
+    from core.charts import ChartRenderer
+    from core.frame_cache import FrameCache
+    from tools.data_analysis_tool import DataAnalysisTool
+
+    renderer = ChartRenderer()
+    path = corpora.rows_csv(data_dir, size)
+
+    def operation(i):
+        tool = DataAnalysisTool(frame_cache=FrameCache(), arrow_cache_dir=None, chart_renderer=renderer)
+        return tool.execute({"data_path": path, "query": "统计"})
+    return operation, renderer.close
+
+
+@case("agent.weather", "天气 Agent：识别意图、抽取城市并查询")
+def _agent_weather(size: int, data_dir: str):
+    from agents.weather_agent import WeatherAgent
+
+    agent = WeatherAgent(_config(data_dir, size))
+    return lambda i: agent.get_response(f"{_city(i)}的天气怎么样？", session_id=f"s{i % 1000}"), None
+
+
+@case("agent.customer_service.order", "客服 Agent：查询订单")
+def _agent_order(size: int, data_dir: str):
+    from agents.customer_service_agent import CustomerServiceAgent
+
+    agent = CustomerServiceAgent(_config(data_dir, size))
+    ids = [random.Random(3).randrange(size) for _ in range(10000)]
+
+    def operation(i):
+        n = ids[i % len(ids)]
+        return agent.get_response(f"我想查询订单 ORD{n:09d} 的状态", session_id=f"s{n}", user_id=f"user{n}")
+    return operation, None
+
+
+@case("agent.customer_service.profile", "客服 Agent：查询个人信息")
+def _agent_profile(size: int, data_dir: str):
+    from agents.customer_service_agent import CustomerServiceAgent
+
+    agent = CustomerServiceAgent(_config(data_dir, size))
+    ids = [random.Random(4).randrange(size) for _ in range(10000)]
+
+    def operation(i):
+        n = ids[i % len(ids)]
+        return agent.get_response("查看我的个人信息", session_id=f"s{n}", user_id=f"user{n}")
+    return operation, None
+
+
+@case("agent.customer_service.kb", "客服 Agent：检索知识库")
+def _agent_kb(size: int, data_dir: str):
+    from agents.customer_service_agent import CustomerServiceAgent
+
+    agent = CustomerServiceAgent(_config(data_dir, size))
+    queries, _ = corpora.kb_queries(1000)
+    return lambda i: agent.get_response(queries[i % len(queries)], session_id=f"s{i % 1000}"), None
+
+
+@case("agent.customer_service.kb.uncached", "客服 Agent：关闭响应缓存时检索知识库，与默认配置对比")
+def _agent_kb_uncached(size: int, data_dir: str):
+    from agents.customer_service_agent import CustomerServiceAgent
+
+    agent = CustomerServiceAgent(_config(data_dir, size, response_cache_ttl=0))
+    queries, _ = corpora.kb_queries(1000)
+    return lambda i: agent.get_response(queries[i % len(queries)], session_id=f"s{i % 1000}"), None
+
+
+@case("agent.customer_service.llm", "客服 Agent：关键词未命中，由本地大模型服务替身判断意图并生成回答")
+def _agent_llm(size: int, data_dir: str):
+    from agents.customer_service_agent import CustomerServiceAgent
+    from core.llm import close_clients
+    from core.mock_llm import MockLLMServer
+
+    server = MockLLMServer().start()
+    agent = CustomerServiceAgent(_config(data_dir, size, llm_base_url=server.base_url, llm_retries=0))
+
+    def close():
+        close_clients()
+        server.close()
+    return lambda i: agent.get_response(f"你们第{i}家店几点关门", session_id=f"s{i % 1000}"), close
+
+
+@case("agent.data_analyst", "数据分析 Agent：抽取数据路径并分析")
+def _agent_analyst(size: int, data_dir: str):
+    from agents.data_analyst_agent import DataAnalystAgent
+
+    agent = DataAnalystAgent(_config(data_dir, size))
+    path = corpora.rows_csv(data_dir, size)
+    return lambda i: agent.get_response(f"请分析数据，数据路径: {path}"), None
+
+
+@case("agent.learning", "学习助手 Agent：推荐资源和生成练习题")
+def _agent_learning(size: int, data_dir: str):
+    from agents.learning_assistant_agent import LearningAssistantAgent
+
+    agent = LearningAssistantAgent(_config(data_dir, size))
+    queries = ["推荐一些Python学习资源", "我想学习人工智能，有什么课程吗？", "给我出一道Python练习题"]
+    return lambda i: agent.get_response(queries[i % 3], session_id=f"s{i % 1000}"), None
+
+
+@case("agent.orchestrator.single", "编排 Agent：单一请求转交给一个 Agent")
+def _agent_orchestrator_single(size: int, data_dir: str):
+    from agents.orchestrator_agent import OrchestratorAgent
+
+    agent = OrchestratorAgent(_config(data_dir, size))
+    return lambda i: agent.get_response(f"{_city(i)}的天气怎么样？", session_id=f"s{i % 1000}"), agent.close
+
+
+@case("agent.orchestrator.compound", "编排 Agent：天气加订单的复合请求，两个分支并发处理")
+def _agent_orchestrator_compound(size: int, data_dir: str):
+    from agents.orchestrator_agent import OrchestratorAgent
+
+    agent = OrchestratorAgent(_config(data_dir, size))
+    ids = [random.Random(5).randrange(size) for _ in range(10000)]
+
+    def operation(i):
+        n = ids[i % len(ids)]
+        return agent.get_response(f"{_city(i)}的天气怎么样，还有订单 ORD{n:09d} 到哪了",
+                                  session_id=f"s{n}", user_id=f"user{n}")
+    return operation, agent.close
+
+@case("agent.customer_service.order.traced", "客服 Agent：开启埋点（内存导出器）时查询订单")
+def _agent_order_traced(size: int, data_dir: str):
+    from agents.customer_service_agent import CustomerServiceAgent
+    from core import instrumentation
+
+    agent = CustomerServiceAgent(_config(data_dir, size))
+    ids = [random.Random(3).randrange(size) for _ in range(10000)]
+    instrumentation.enable([instrumentation.InMemoryExporter(max_spans=1000)])
+
+    def operation(i):
+        n = ids[i % len(ids)]
+        return agent.get_response(f"我想查询订单 ORD{n:09d} 的状态", session_id=f"s{n}", user_id=f"user{n}")
+    return operation, instrumentation.disable
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""
+基准测试用的合成语料：知识库条目、客户与订单、数据分析用的 CSV 行
+
+语料由固定的随机种子生成，同一规模每次生成的内容相同；构建结果放在数据目录中，
+同一规模的语料只构建一次，供多个基准用例（及各自的子进程）复用
+"""
+import os
+import random
+from typing import Dict, Iterator, List, Tuple
+
+
+# 规模名称 -> 条目数量
+SIZES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+
+CITIES = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安", "南京", "重庆"]
+
+_WORDS = [
+    "退货", "退款", "配送", "快递", "发票", "支付", "会员", "积分", "优惠", "保修", "维修", "售后", "安装", "换货",
+    "价格", "库存", "预售", "地址", "账户", "密码", "登录", "物流", "签收", "包装", "运费", "赠品", "评价", "投诉",
+    "客服", "电话", "门店", "营业", "时间", "节假", "活动", "抽奖", "礼品", "卡券", "充值", "余额", "提现", "银行",
+    "信用", "分期", "利息", "合同", "协议", "隐私", "安全", "认证", "实名", "手机", "邮箱", "短信", "通知", "订阅",
+]
+
+
+def size_of(name: str) -> int:
+    """
+    将规模名称（1k、100k、1m）或数字字符串转换为条目数量
+
+    Args:
+        name (str): 规模名称
+
+    Returns:
+        int: 条目数量
+    """
+    return SIZES[name] if name in SIZES else int(name)
+
+
+def _ready(directory: str) -> bool:
+    return os.path.exists(os.path.join(directory, ".complete"))
+
+
+def _mark_ready(directory: str) -> None:
+    open(os.path.join(directory, ".complete"), "w").close()
+
+
+def kb_entries(count: int, seed: int = 0) -> Iterator[Tuple[str, Dict[str, object]]]:
+    """
+    生成知识库条目
+
+    Args:
+        count (int): 条目数量
+        seed (int): 随机种子
+
+    Returns:
+        Iterator[Tuple[str, Dict[str, object]]]: (条目ID, 条目内容)
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        words = rng.sample(_WORDS, 8)
+        yield f"kb{i}", {
+            "title": f"{words[0]}{words[1]}说明{i}",
+            "content": "，".join(words[2:]) + "。",
+            "keywords": words[:3],
+        }
+
+
+def kb_queries(count: int, seed: int = 1) -> Tuple[List[str], List[str]]:
+    """
+    生成知识库查询：关键词能命中倒排索引的查询，以及只能靠向量检索命中的查询（逐字用空格隔开，没有双字词元）
+
+    Args:
+        count (int): 每类查询的数量
+        seed (int): 随机种子
+
+    Returns:
+        Tuple[List[str], List[str]]: (关键词查询, 向量检索查询)
+    """
+    rng = random.Random(seed)
+    hits = [f"请问{rng.choice(_WORDS)}{rng.choice(_WORDS)}怎么办" for _ in range(count)]
+    fuzzy = [" ".join(rng.choice(_WORDS) + rng.choice(_WORDS)) for _ in range(count)]
+    return hits, fuzzy
+
+
+def kb_index(data_dir: str, count: int, vector_dim: int = 1024) -> str:
+    """
+    构建（或复用）持久化的知识库索引目录，包含倒排索引和向量索引
+
+    Args:
+        data_dir (str): 数据目录
+        count (int): 条目数量
+        vector_dim (int): 向量维度
+
+    Returns:
+        str: 索引目录，可作为 KnowledgeBaseTool 的 index_dir 或配置项 kb_index_dir
+    """
+    from core.disk_index import SegmentedIndex
+    from core.vector_index import HashingEmbedder, VectorIndex
+    from tools.knowledge_base_tool import INDEX_FIELDS
+
+    directory = os.path.join(data_dir, f"kb-{count}-{vector_dim}")
+    if _ready(directory):
+        return directory
+    index = SegmentedIndex(directory, fields=INDEX_FIELDS, background_merge=False)
+    vectors = VectorIndex(fields=INDEX_FIELDS, embedder=HashingEmbedder(dim=vector_dim),
+                          directory=os.path.join(directory, "vectors"))
+    batch: List[Tuple[str, Dict[str, object]]] = []
+    for entry in kb_entries(count):
+        batch.append(entry)
+        if len(batch) == 100000:
+            index.add_documents(batch)
+            vectors.add_documents(batch)
+            batch = []
+    index.add_documents(batch)
+    vectors.add_documents(batch)
+    index.close()
+    vectors.save()
+    _mark_ready(directory)
+    return directory
+
+
+def customers(count: int) -> Iterator[Tuple[str, ...]]:
+    """
+    生成客户行：(user_id, name, email, phone, level)
+
+    Args:
+        count (int): 客户数量
+
+    Returns:
+        Iterator[Tuple[str, ...]]: 客户行
+    """
+    for i in range(count):
+        yield f"user{i}", f"用户{i}", f"user{i}@example.com", "138****8888", "VIP" if i % 10 == 0 else "普通会员"
+
+
+def orders(count: int) -> Iterator[Tuple[str, ...]]:
+    """
+    生成订单行：(order_id, user_id, product, status, tracking_number, delivery_date)，每个客户一个订单
+
+    Args:
+        count (int): 订单数量
+
+    Returns:
+        Iterator[Tuple[str, ...]]: 订单行
+    """
+    for i in range(count):
+        yield f"ORD{i:09d}", f"user{i}", "无线耳机", "已发货", f"SF{i:010d}", "2023-10-15"
+
+
+def customer_db(data_dir: str, count: int) -> str:
+    """
+    构建（或复用）客户数据库文件
+
+    Args:
+        data_dir (str): 数据目录
+        count (int): 客户数量
+
+    Returns:
+        str: 数据库文件路径，可作为 CustomerInfoTool 的 db_path 或配置项 customer_db_path
+    """
+    from core.customer_store import CustomerStore
+
+    directory = os.path.join(data_dir, f"customers-{count}")
+    path = os.path.join(directory, "customers.db")
+    if _ready(directory):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    store = CustomerStore(path)
+    store.bulk_load(customers(count), orders(count))
+    store.close()
+    _mark_ready(directory)
+    return path
+
+
+def rows_csv(data_dir: str, count: int, seed: int = 0) -> str:
+    """
+    构建（或复用）数据分析用的 CSV 文件，包含三个数值列和一个类别列
+
+    Args:
+        data_dir (str): 数据目录
+        count (int): 行数
+        seed (int): 随机种子
+
+    Returns:
+        str: CSV 文件路径
+    """
+    import numpy as np
+    import pandas as pd
+
+    directory = os.path.join(data_dir, f"rows-{count}")
+    path = os.path.join(directory, "sales.csv")
+    if _ready(directory):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        "price": rng.gamma(2.0, 50.0, count).round(2),
+        "amount": rng.integers(1, 100, count),
+        "score": rng.normal(4.0, 0.5, count).round(3),
+        "region": rng.choice(CITIES, count),
+    }).to_csv(path, index=False)
+    _mark_ready(directory)
+    return path
\ No newline at end of file
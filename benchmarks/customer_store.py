@@ -0,0 +1,66 @@
+"""
+客户存储基准：批量导入 N 个用户的数据，测量随机查询用户资料和订单的延迟
+
+用法（在仓库根目录运行）：
+    python -m benchmarks.customer_store              # 默认 10 万用户
+    python -m benchmarks.customer_store 10000000     # 1000 万用户（需要数 GB 磁盘空间和较长的导入时间）
+"""
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict
+from benchmarks import corpora
+from core.customer_store import CustomerStore
+
+
+def _percentile(samples, fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def run(users: int = 100000, lookups: int = 20000, cached: bool = False) -> Dict[str, float]:
+    """
+    导入数据后随机查询，输出导入耗时和查询延迟
+
+    Args:
+        users (int): 用户数量，每个用户一个订单
+        lookups (int): 查询次数
+        cached (bool): 是否启用用户资料缓存；关闭时每次查询都落到 SQLite
+
+    Returns:
+        Dict[str, float]: 导入耗时（秒）和各项查询延迟（微秒）
+    """
+    directory = tempfile.mkdtemp()
+    store = CustomerStore(os.path.join(directory, "customers.db"), profile_cache_size=10000 if cached else 0)
+    try:
+        start = time.perf_counter()
+        store.bulk_load(corpora.customers(users), corpora.orders(users))
+        results = {"load_s": time.perf_counter() - start}
+
+        rng = random.Random(0)
+        ids = [rng.randrange(users) for _ in range(lookups)]
+        for name, lookup in (("profile", lambda i: store.get_customer(f"user{i}")),
+                             ("order", lambda i: store.get_order(f"user{i}", f"ORD{i:09d}"))):
+            timings = []
+            for i in ids:
+                start = time.perf_counter()
+                lookup(i)
+                timings.append((time.perf_counter() - start) * 1e6)
+            timings.sort()
+            results[f"{name}_p50_us"] = statistics.median(timings)
+            results[f"{name}_p99_us"] = _percentile(timings, 0.99)
+    finally:
+        store.close()
+        shutil.rmtree(directory)
+
+    print(f"{users} 个用户导入耗时 {results['load_s']:.2f}s")
+    for name in ("profile", "order"):
+        print(f"{name:<8} p50 {results[f'{name}_p50_us']:8.1f} us   p99 {results[f'{name}_p99_us']:8.1f} us")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
\ No newline at end of file
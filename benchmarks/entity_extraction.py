@@ -0,0 +1,132 @@
+"""
+实体抽取微基准：对比原先各 Agent 内联 re.search 的实现与 core.entities 按优先级预编译规则的实现
+
+用法（在仓库根目录运行）：
+    python -m benchmarks.entity_extraction
+"""
+import random
+import re
+import timeit
+from core.entities import extract_entities, extract_entity
+
+
+SAMPLES = {
+    "order_id": ["我想查询订单 ORD001 的状态", "订单号：ORD002 什么时候发货", "帮我看看 ord003 到哪了"],
+    "city": ["北京的天气怎么样？", "what is the weather in Shanghai", "明天上海天气如何？"],
+    "data_path": ["请分析数据，数据路径: sample.csv", "data path: /tmp/sales.xlsx", "统计一下 report.json 的数据"],
+    "subject": ["推荐一些Python学习资源", "我想学习人工智能，有什么课程吗？", "学习数学的资源"],
+}
+
+
+def legacy_order_id(user_input):
+    import re
+    possible_matches = [
+        re.search(r'订单号[:：\s]*(\w+)', user_input),
+        re.search(r'order[ \w]*[:：\s]*(\w+)', user_input, re.IGNORECASE),
+        re.search(r'订单[:：\s]*(\w+)', user_input)
+    ]
+    for match in possible_matches:
+        if match:
+            return match.group(1)
+    alt_match = re.search(r'([A-Z]{2,}[0-9]{2,})', user_input.upper())
+    return alt_match.group(1) if alt_match else None
+
+
+def legacy_city(user_input):
+    import re
+    city_match = re.search(r'([A-Za-z一-龥]+)的天气|weather in ([A-Za-z一-龥]+)', user_input)
+    return (city_match.group(1) or city_match.group(2)) if city_match else None
+
+
+def legacy_data_path(user_input):
+    import re
+    path_match = re.search(r'数据路径[:：]\s*([^\s,;]+)', user_input) or \
+        re.search(r'data path[:：]\s*([^\s,;]+)', user_input) or \
+        re.search(r'([^\s,;]+\.(csv|xlsx|json))', user_input)
+    return path_match.group(1) if path_match else None
+
+
+def legacy_subject(user_input):
+    import re
+    user_lower = user_input.lower()
+    if 'python' in user_lower:
+        return 'python'
+    elif 'ai' in user_lower or '人工智能' in user_lower or '机器学习' in user_lower or 'ml' in user_lower:
+        return 'ai'
+    elif 'web' in user_lower or '前端' in user_lower or 'react' in user_lower or 'javascript' in user_lower or 'js' in user_lower:
+        return 'web'
+    topic_match = re.search(r'学习(.+?)|推荐(.+?)学习|学习(.+?)资源|tutorial on ([^|]+)|learn ([^|]+)|练习(.+?)|(.+?)练习|(.+?)题目', user_input)
+    if topic_match:
+        subject = next((group for group in topic_match.groups() if group is not None and group.strip()), None)
+        return subject.strip() if subject else None
+    return None
+
+
+LEGACY = {
+    "order_id": legacy_order_id,
+    "city": legacy_city,
+    "data_path": legacy_data_path,
+    "subject": legacy_subject,
+}
+
+
+# 随机拼接的片段，覆盖各规则的前缀、分隔符以及规则之间互相包含的情况
+FRAGMENTS = [
+    "订单", "订单号", "订单号：", "order", "order ", "ORDER", "Order No ", "ORD001", "ord002", "ab12", "12", "abc",
+    ":", "：", " ", ",", ";", "数据路径:", "数据路径：", "data path:", "x.csv", "y.json", "z.xlsx", "a/b.csv",
+    "北京", "的天气", "weather in ", "paris", "python", "PYTHON", "ai", "AI", "人工智能", "web", "Web", "js",
+    "学习", "推荐", "练习", "题目", "资源", "learn ", "查询", "İ",
+]
+
+
+def check_parity(rounds: int = 20000, seed: int = 0) -> None:
+    """
+    用随机拼接的输入校验新旧实现结果一致
+
+    新实现的规则不区分大小写（原实现中 "weather in"、"data path" 和文件扩展名区分），
+    片段只包含两者结果相同的写法。原实现对兜底订单号先做 upper()，"ß" 等大写后长度
+    变化的字符会产生原文中不存在的 "SS" 前缀，这类字符同样不在片段中。
+
+    Args:
+        rounds (int): 随机输入数量
+        seed (int): 随机种子
+    """
+    rng = random.Random(seed)
+    for _ in range(rounds):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 7)))
+        entities = extract_entities(text)
+        for kind, legacy in LEGACY.items():
+            expected = legacy(text)
+            assert expected == extract_entity(text, kind), (kind, text)
+            assert expected == (entities[kind].value if kind in entities else None), (kind, text)
+
+
+def run(number: int = 20000) -> None:
+    """
+    逐类实体输出单次调用耗时（微秒），并校验新旧实现结果一致
+
+    Args:
+        number (int): 每个样本的调用次数
+    """
+    print(f"{'实体类型':<10}{'原实现(us)':>12}{'新实现(us)':>12}{'加速比':>8}")
+    for kind, samples in SAMPLES.items():
+        legacy = LEGACY[kind]
+        for sample in samples:
+            assert legacy(sample) == extract_entity(sample, kind), (kind, sample)
+
+        before = timeit.timeit(lambda: [legacy(sample) for sample in samples], number=number)
+        after = timeit.timeit(lambda: [extract_entity(sample, kind) for sample in samples], number=number)
+        calls = number * len(samples)
+        print(f"{kind:<12}{before / calls * 1e6:>12.2f}{after / calls * 1e6:>12.2f}{before / after:>9.2f}x")
+
+    # 一次抽取全部实体类型：原实现每次调用重新查找编译缓存，新实现直接使用预编译的规则
+    samples = [sample for group in SAMPLES.values() for sample in group]
+    before = timeit.timeit(lambda: [[legacy(sample) for legacy in LEGACY.values()] for sample in samples], number=number)
+    after = timeit.timeit(lambda: [extract_entities(sample) for sample in samples], number=number)
+    calls = number * len(samples)
+    print(f"{'all':<12}{before / calls * 1e6:>12.2f}{after / calls * 1e6:>12.2f}{before / after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    check_parity()
+    run()
@@ -0,0 +1,203 @@
+"""
+基准测试的计时、统计与结果比较
+
+每个用例的结果包含延迟分位数（毫秒）、吞吐（次/秒）和进程的峰值常驻内存（MB），
+结果文件为 JSON，compare 按阈值找出比基线变差的指标
+"""
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+# 指标名称 -> 数值越大越好时为 True
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "ops_per_s": True,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+    最近秩法计算分位数
+
+    Args:
+        samples (List[float]): 已升序排列的样本
+        fraction (float): 分位（0~1）
+
+    Returns:
+        float: 分位数，没有样本时为 0
+    """
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, math.ceil(fraction * len(samples)) - 1))]
+
+
+def peak_rss_mb() -> float:
+    """
+    当前进程的峰值常驻内存
+
+    Returns:
+        float: 峰值常驻内存（MB）
+    """
+    # Linux 上的 ru_maxrss 会继承 fork 时父进程的内存，优先读取只属于本进程地址空间的 VmHWM
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(operation: Callable[[int], Any], iterations: int = 1000, warmup: int = 20,
+            max_seconds: float = 10.0) -> Dict[str, float]:
+    """
+    逐次调用并计时：先预热，再调用 iterations 次（总耗时超过 max_seconds 时提前结束）
+
+    Args:
+        operation (Callable[[int], Any]): 被测操作，参数为调用序号，用于轮换输入
+        iterations (int): 调用次数
+        warmup (int): 预热调用次数，不计入统计
+        max_seconds (float): 计时阶段的最长耗时（秒）
+
+    Returns:
+        Dict[str, float]: 各项指标及实际调用次数
+    """
+    for i in range(warmup):
+        operation(i)
+    timings = []
+    clock = time.perf_counter
+    start = clock()
+    deadline = start + max_seconds
+    for i in range(iterations):
+        begin = clock()
+        operation(i)
+        end = clock()
+        timings.append((end - begin) * 1000)
+        if end > deadline:
+            break
+    elapsed = clock() - start
+    timings.sort()
+    return {
+        "p50_ms": percentile(timings, 0.50),
+        "p95_ms": percentile(timings, 0.95),
+        "p99_ms": percentile(timings, 0.99),
+        "ops_per_s": len(timings) / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "iterations": len(timings),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """
+    记录运行环境，比较不同环境下的结果时作为参考
+
+    Returns:
+        Dict[str, Any]: Python 版本、平台、CPU 数量、代码版本和时间
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def save_results(path: str, results: Dict[str, Any]) -> None:
+    """
+    写出结果文件
+
+    Args:
+        path (str): 文件路径
+        results (Dict[str, Any]): {"environment": ..., "size": ..., "cases": {用例名: 指标}}
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """
+    读取结果文件
+
+    Args:
+        path (str): 文件路径
+
+    Returns:
+        Dict[str, Any]: 结果
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Change(NamedTuple):
+    """
+    一项指标相对基线的变化
+    """
+    case: str
+    metric: str
+    baseline: float
+    current: float
+    # 变差的比例，正数表示变差
+    worse_by: float
+    regressed: bool
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10,
+            metrics: Optional[List[str]] = None, min_delta_ms: float = 0.05) -> List[Change]:
+    """
+    逐个用例、逐项指标比较两次结果
+
+    延迟指标（及吞吐换算的平均耗时）变差的绝对值小于 min_delta_ms 时不算回退，避免亚毫秒级的抖动被放大成比例
+
+    Args:
+        baseline (Dict[str, Any]): 基线结果
+        current (Dict[str, Any]): 本次结果
+        threshold (float): 变差超过该比例时视为回退
+        metrics (Optional[List[str]]): 参与比较的指标，默认为全部
+        min_delta_ms (float): 延迟指标视为回退的最小绝对变化（毫秒）
+
+    Returns:
+        List[Change]: 两次结果都有的用例的各项指标变化
+    """
+    changes = []
+    for case, base in baseline["cases"].items():
+        now = current["cases"].get(case)
+        if now is None or "error" in base or "error" in now:
+            continue
+        for metric in metrics or METRICS:
+            if metric not in base or metric not in now:
+                continue
+            before, after = float(base[metric]), float(now[metric])
+            if METRICS[metric]:
+                worse_by = (before - after) / before if before else 0.0
+            else:
+                worse_by = (after - before) / before if before else 0.0
+            regressed = worse_by > threshold
+            if regressed and metric.endswith("_ms") and after - before < min_delta_ms:
+                regressed = False
+            # 吞吐换算为每次调用的平均耗时，同样按绝对变化过滤
+            if regressed and metric == "ops_per_s" and after and 1000 / after - 1000 / before < min_delta_ms:
+                regressed = False
+            changes.append(Change(case, metric, before, after, worse_by, regressed))
+    return changes
\ No newline at end of file
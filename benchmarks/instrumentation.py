@@ -0,0 +1,64 @@
+"""
+埋点开销基准：对比工具 execute 未加埋点、埋点关闭和埋点开启时的单次耗时，以及 Agent 完整请求在埋点关闭和开启时的耗时
+
+用法（在仓库根目录运行）：
+    python -m benchmarks.instrumentation
+"""
+import statistics
+import time
+from typing import Callable, Dict
+from core import instrumentation
+from core.config import Config
+from agents.customer_service_agent import CustomerServiceAgent
+from tools.customer_service_tool import CustomerInfoTool
+
+
+def _per_call_ns(operation: Callable[[], object], calls: int, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            operation()
+        timings.append((time.perf_counter_ns() - start) / calls)
+    return statistics.median(timings)
+
+
+def run(calls: int = 20000) -> Dict[str, float]:
+    """
+    分别测量未加埋点、埋点关闭和埋点开启（内存导出器）时的单次耗时
+
+    Args:
+        calls (int): 每轮调用次数
+
+    Returns:
+        Dict[str, float]: 各场景的单次耗时（纳秒）
+    """
+    tool = CustomerInfoTool()
+    params = {"query_type": "order", "user_id": "user123", "order_id": "ORD001"}
+    # 子类的 execute 被埋点包装，__wrapped__ 为原始实现
+    raw = type(tool).execute.__wrapped__
+    agent = CustomerServiceAgent(Config({"response_cache_ttl": 0}))
+    request = "我想查询订单 ORD001 的状态"
+
+    instrumentation.disable()
+    results = {
+        "tool_raw_ns": _per_call_ns(lambda: raw(tool, params), calls),
+        "tool_disabled_ns": _per_call_ns(lambda: tool.execute(params), calls),
+        "agent_disabled_ns": _per_call_ns(lambda: agent.get_response(request, user_id="user123"), calls // 4),
+    }
+    instrumentation.enable([instrumentation.InMemoryExporter(max_spans=1000)])
+    try:
+        results["tool_enabled_ns"] = _per_call_ns(lambda: tool.execute(params), calls)
+        results["agent_enabled_ns"] = _per_call_ns(lambda: agent.get_response(request, user_id="user123"),
+                                                   calls // 4)
+    finally:
+        instrumentation.disable()
+
+    for key, value in results.items():
+        print(f"{key:<22}{value:>12.1f}")
+    print(f"{'disabled_overhead':<22}{results['tool_disabled_ns'] - results['tool_raw_ns']:>12.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+大模型客户端基准：在本地服务替身（固定推理耗时）上并发提交提示词，对比逐个请求与合并请求的吞吐和延迟
+
+用法（在仓库根目录运行）：
+    python -m benchmarks.llm_batching
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from core.llm import LLMClient
+from core.mock_llm import MockLLMServer
+
+
+def measure(base_url: str, max_batch_size: int, prompts: int, concurrency: int) -> Dict[str, float]:
+    """
+    并发提交提示词并统计
+
+    Args:
+        base_url (str): 接口地址
+        max_batch_size (int): 合并发送的最大提示词数量
+        prompts (int): 提示词数量
+        concurrency (int): 并发提交的线程数
+
+    Returns:
+        Dict[str, float]: 吞吐、延迟分位数、HTTP 调用次数和 token 用量
+    """
+    client = LLMClient(base_url, max_batch_size=max_batch_size, batch_window=0.005, pool_size=concurrency)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda i: client.generate(f"用户问题 {i}"), range(prompts)))
+        elapsed = time.perf_counter() - start
+    finally:
+        client.close()
+    latencies = sorted(result.latency * 1000 for result in results)
+    snapshot = client.metrics.snapshot()
+    return {
+        "prompts_per_s": prompts / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "http_calls": snapshot["calls"],
+        "tokens": snapshot["prompt_tokens"] + snapshot["completion_tokens"],
+    }
+
+
+def run(prompts: int = 256, concurrency: int = 32, delay: float = 0.05) -> Dict[int, Dict[str, float]]:
+    """
+    对比不同合并大小
+
+    Args:
+        prompts (int): 提示词数量
+        concurrency (int): 并发提交的线程数
+        delay (float): 服务替身每个请求的推理耗时（秒）
+
+    Returns:
+        Dict[int, Dict[str, float]]: 合并大小 -> 统计结果
+    """
+    results = {}
+    with MockLLMServer(delay=delay) as server:
+        print(f"{'合并大小':<8}{'提示词/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'HTTP 调用':>10}{'tokens':>8}")
+        for max_batch_size in (1, 8, 32):
+            result = results[max_batch_size] = measure(server.base_url, max_batch_size, prompts, concurrency)
+            print(f"{max_batch_size:<8}{result['prompts_per_s']:>10.1f}{result['p50_ms']:>10.1f}"
+                  f"{result['p95_ms']:>10.1f}{result['http_calls']:>10}{result['tokens']:>8}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
\ No newline at end of file
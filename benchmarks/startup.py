@@ -0,0 +1,117 @@
+"""
+启动耗时基准：在全新的子进程中（python -X importtime）导入并创建各 Agent，记录冷启动耗时和最重的依赖
+
+用法（在仓库根目录运行）：
+    python -m benchmarks.startup
+"""
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+
+AGENTS = {
+    "WeatherAgent": "agents.weather_agent",
+    "DataAnalystAgent": "agents.data_analyst_agent",
+    "LearningAssistantAgent": "agents.learning_assistant_agent",
+    "CustomerServiceAgent": "agents.customer_service_agent",
+}
+
+# 子进程中执行的代码：计时导入 Agent 模块并创建实例，耗时（秒）输出到 stdout
+_SCRIPT = """
+import sys
+import time
+sys.stderr.write("{marker}\\n")
+start = time.perf_counter()
+from core.config import Config
+from {module} import {name}
+{name}(Config())
+print(time.perf_counter() - start)
+"""
+
+# 子进程开始计时前写入标准错误的标记，此前的导入属于解释器启动（如 site 及 .pth 文件）
+MARKER = "-- agent startup --"
+
+# 本仓库的包，统计依赖耗时时排除
+PROJECT_PACKAGES = ("agents", "tools", "core")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    解析 -X importtime 的输出，按顶层包汇总累计耗时
+
+    Args:
+        stderr (str): 子进程的标准错误输出
+
+    Returns:
+        Dict[str, int]: 顶层包名 -> 累计导入耗时（微秒），不包含本仓库的包和解释器启动时的导入
+    """
+    packages: Dict[str, int] = {}
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            # 表头行
+            continue
+        package = fields[2].strip().split(".")[0]
+        if package in PROJECT_PACKAGES:
+            continue
+        # 同一个包的子模块嵌套在包的导入之内，取最大的累计耗时即为整个包的耗时
+        packages[package] = max(packages.get(package, 0), int(fields[1]))
+    return packages
+
+
+def measure(name: str, module: str) -> Tuple[float, Dict[str, int]]:
+    """
+    在全新的子进程中导入并创建一个 Agent
+
+    Args:
+        name (str): Agent 类名
+        module (str): Agent 所在模块
+
+    Returns:
+        (导入并创建实例的耗时（秒）, 各依赖包的累计导入耗时)
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT.format(marker=MARKER, module=module, name=name)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(completed.stdout.strip().splitlines()[-1]), parse_importtime(completed.stderr)
+
+
+def run(repeat: int = 5, top: int = 3) -> Dict[str, float]:
+    """
+    逐个 Agent 输出冷启动耗时（多次测量的中位数）和导入耗时最高的依赖包
+
+    Args:
+        repeat (int): 每个 Agent 的测量次数
+        top (int): 列出的依赖包数量
+
+    Returns:
+        Dict[str, float]: Agent 类名 -> 冷启动耗时中位数（毫秒）
+    """
+    results = {}
+    print(f"{'Agent':<24}{'冷启动(ms)':>12}  最重的依赖(累计 ms)")
+    for name, module in AGENTS.items():
+        timings = []
+        packages = {}
+        for _ in range(repeat):
+            seconds, packages = measure(name, module)
+            timings.append(seconds * 1000)
+        results[name] = statistics.median(timings)
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        summary = ", ".join(f"{package} {cumulative / 1000:.1f}" for package, cumulative in heaviest)
+        print(f"{name:<24}{results[name]:>12.1f}  {summary}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+基准套件：运行 cases 中注册的全部用例，结果写为 JSON，并与基线比较找出回退
+
+用法（在仓库根目录运行）：
+    python -m benchmarks.suite list
+    python -m benchmarks.suite run --size 1k --out results.json
+    python -m benchmarks.suite run --size 100k --filter agent. --out current.json
+    python -m benchmarks.suite compare baseline.json current.json --threshold 0.10
+
+run 默认让每个用例在独立的子进程中运行，峰值常驻内存只反映该用例本身；
+同一规模的语料在数据目录中只构建一次。compare 发现回退时以状态码 1 退出，可用于部署前的检查
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+from benchmarks import corpora, harness
+from benchmarks.cases import CASES, vector_dim
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "agent-benchmarks")
+
+
+def select(pattern: Optional[str] = None) -> List[str]:
+    """
+    按名称筛选用例
+
+    Args:
+        pattern (Optional[str]): 用例名包含的子串，None 表示全部
+
+    Returns:
+        List[str]: 用例名
+    """
+    return [name for name in CASES if not pattern or pattern in name]
+
+
+def run_case(name: str, size: int, data_dir: str, iterations: int = 1000, warmup: int = 20,
+             max_seconds: float = 10.0) -> Dict[str, Any]:
+    """
+    在当前进程中运行一个用例
+
+    Args:
+        name (str): 用例名
+        size (int): 语料规模（条目数量）
+        data_dir (str): 数据目录
+        iterations (int): 调用次数
+        warmup (int): 预热调用次数
+        max_seconds (float): 计时阶段的最长耗时（秒）
+
+    Returns:
+        Dict[str, Any]: 各项指标；准备或运行出错时为 {"error": 错误信息}
+    """
+    close = None
+    try:
+        operation, close = CASES[name].setup(size, data_dir)
+        return harness.measure(operation, iterations=iterations, warmup=warmup, max_seconds=max_seconds)
+    except Exception as exc:
+        return {"error": f"{type(exc).__name__}: {exc}"}
+    finally:
+        if close is not None:
+            close()
+
+
+def _run_isolated(name: str, size: int, data_dir: str, iterations: int, warmup: int,
+                  max_seconds: float) -> Dict[str, Any]:
+    command = [sys.executable, "-m", "benchmarks.suite", "case", name, "--size", str(size),
+               "--data-dir", data_dir, "--iterations", str(iterations), "--warmup", str(warmup),
+               "--max-seconds", str(max_seconds)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run(command, capture_output=True, text=True, cwd=root)
+    lines = process.stdout.strip().splitlines()
+    if process.returncode != 0 or not lines:
+        message = process.stderr.strip().splitlines()
+        return {"error": message[-1] if message else f"exit code {process.returncode}"}
+    # 用例本身可能有输出，结果在最后一行
+    return json.loads(lines[-1])
+
+
+def prepare(size: int, data_dir: str) -> None:
+    """
+    预先构建该规模的全部语料，构建耗时和内存不计入任何用例
+
+    Args:
+        size (int): 语料规模（条目数量）
+        data_dir (str): 数据目录
+    """
+    corpora.kb_index(data_dir, size, vector_dim(size))
+    corpora.customer_db(data_dir, size)
+    corpora.rows_csv(data_dir, size)
+
+
+def run(size: int, names: List[str], data_dir: str = DEFAULT_DATA_DIR, iterations: int = 1000,
+        warmup: int = 20, max_seconds: float = 10.0, isolate: bool = True) -> Dict[str, Any]:
+    """
+    运行多个用例
+
+    Args:
+        size (int): 语料规模（条目数量）
+        names (List[str]): 用例名
+        data_dir (str): 数据目录
+        iterations (int): 每个用例的调用次数
+        warmup (int): 每个用例的预热调用次数
+        max_seconds (float): 每个用例计时阶段的最长耗时（秒）
+        isolate (bool): 是否让每个用例在独立的子进程中运行
+
+    Returns:
+        Dict[str, Any]: {"environment": ..., "size": ..., "cases": {用例名: 指标}}
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    prepare(size, data_dir)
+    results = {"environment": harness.environment(), "size": size, "cases": {}}
+    for name in names:
+        if isolate:
+            metrics = _run_isolated(name, size, data_dir, iterations, warmup, max_seconds)
+        else:
+            metrics = run_case(name, size, data_dir, iterations, warmup, max_seconds)
+        results["cases"][name] = metrics
+        print(_format_metrics(name, metrics), flush=True)
+    return results
+
+
+def _format_metrics(name: str, metrics: Dict[str, Any]) -> str:
+    if "error" in metrics:
+        return f"{name:<36}ERROR {metrics['error']}"
+    return (f"{name:<36}p50 {metrics['p50_ms']:>9.3f} ms  p95 {metrics['p95_ms']:>9.3f} ms  "
+            f"p99 {metrics['p99_ms']:>9.3f} ms  {metrics['ops_per_s']:>10.1f} ops/s  "
+            f"rss {metrics['peak_rss_mb']:>7.1f} MB")
+
+
+def report(changes: List[harness.Change]) -> str:
+    """
+    把比较结果格式化为表格，回退的指标标记为 REGRESSION
+
+    Args:
+        changes (List[harness.Change]): 指标变化
+
+    Returns:
+        str: 表格文本
+    """
+    lines = [f"{'case':<36}{'metric':<14}{'baseline':>12}{'current':>12}{'change':>9}"]
+    for change in changes:
+        # 显示的变化方向统一为“正数表示变差”
+        mark = "  REGRESSION" if change.regressed else ""
+        lines.append(f"{change.case:<36}{change.metric:<14}{change.baseline:>12.3f}{change.current:>12.3f}"
+                     f"{change.worse_by:>+9.1%}{mark}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+
+    Args:
+        argv (Optional[List[str]]): 命令行参数，默认为 sys.argv[1:]
+
+    Returns:
+        int: 退出状态码，compare 发现回退时为 1
+    """
+    parser = argparse.ArgumentParser(description="Agent 与工具的基准套件")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="列出全部用例")
+
+    def add_run_arguments(command):
+        command.add_argument("--size", default="1k", help="语料规模：1k、100k、1m 或条目数量")
+        command.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="语料的数据目录，可在多次运行间复用")
+        command.add_argument("--iterations", type=int, default=1000)
+        command.add_argument("--warmup", type=int, default=20)
+        command.add_argument("--max-seconds", type=float, default=10.0, help="每个用例计时阶段的最长耗时（秒）")
+
+    run_parser = commands.add_parser("run", help="运行用例并写出结果")
+    add_run_arguments(run_parser)
+    run_parser.add_argument("--filter", help="只运行名称包含该子串的用例")
+    run_parser.add_argument("--out", default="benchmark-results.json", help="结果文件路径")
+    run_parser.add_argument("--no-isolate", action="store_true", help="在同一进程中运行全部用例（峰值内存会累积）")
+
+    case_parser = commands.add_parser("case", help="运行单个用例，结果以 JSON 输出到标准输出")
+    case_parser.add_argument("name", choices=sorted(CASES))
+    add_run_arguments(case_parser)
+
+    compare_parser = commands.add_parser("compare", help="与基线比较，发现回退时以状态码 1 退出")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="变差超过该比例视为回退")
+    compare_parser.add_argument("--metrics", nargs="+", choices=sorted(harness.METRICS), help="参与比较的指标")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                                help="延迟指标视为回退的最小绝对变化（毫秒）")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for case in CASES.values():
+            print(f"{case.name:<36}{case.description}")
+        return 0
+    if args.command == "case":
+        metrics = run_case(args.name, corpora.size_of(args.size), args.data_dir, args.iterations, args.warmup,
+                           args.max_seconds)
+        print(json.dumps(metrics))
+        return 0
+    if args.command == "run":
+        names = select(args.filter)
+        if not names:
+            parser.error(f"没有名称包含 {args.filter} 的用例")
+        results = run(corpora.size_of(args.size), names, args.data_dir, args.iterations, args.warmup,
+                      args.max_seconds, isolate=not args.no_isolate)
+        harness.save_results(args.out, results)
+        print(f"结果已写入 {args.out}")
+        return 1 if any("error" in metrics for metrics in results["cases"].values()) else 0
+
+    baseline, current = harness.load_results(args.baseline), harness.load_results(args.current)
+    if baseline.get("size") != current.get("size"):
+        print(f"警告：两次结果的语料规模不同（{baseline.get('size')} / {current.get('size')}）")
+    missing = [name for name in baseline["cases"] if name not in current["cases"]]
+    if missing:
+        print(f"本次结果缺少用例：{', '.join(missing)}")
+    changes = harness.compare(baseline, current, threshold=args.threshold, metrics=args.metrics,
+                              min_delta_ms=args.min_delta_ms)
+    print(report(changes))
+    regressions = [change for change in changes if change.regressed]
+    print(f"{len(regressions)} 项指标回退超过 {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存，支持 stale-while-revalidate：过期后的一段时间内仍可返回旧值，
+    由调用方在后台刷新
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0, max_size: int = 1024):
+        """
+        初始化缓存
+
+        Args:
+            ttl (float): 缓存新鲜期（秒）
+            stale_ttl (float): 过期后仍可返回旧值的时长（秒）
+            max_size (int): 最多缓存的条目数量
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        """
+        查询缓存
+
+        Args:
+            key (Hashable): 缓存键
+
+        Returns:
+            Tuple[Optional[Any], str]: (缓存值, 状态)，状态为 FRESH、STALE 或 MISS
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, MISS
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age <= self.ttl:
+                self._entries.move_to_end(key)
+                return value, FRESH
+            if age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                return value, STALE
+            del self._entries[key]
+            return None, MISS
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        写入缓存
+
+        Args:
+            key (Hashable): 缓存键
+            value (Any): 缓存值
+        """
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        删除缓存条目
+
+        Args:
+            key (Hashable): 缓存键
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._entries.clear()
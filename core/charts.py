@@ -0,0 +1,114 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Hashable, Optional, Tuple
+from core.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+class ChartRenderer:
+    """
+    后台图表渲染器：在独立线程池中用 Agg 后端的面向对象 API 绘图，不使用 pyplot 的全局状态，
+    与进程配置的 matplotlib 后端无关
+
+    已渲染的图表按 (数据指纹, 列名, 分箱数) 缓存，相同数据的重复请求不再调用 matplotlib
+    """
+
+    def __init__(self, max_workers: int = 2, cache_size: int = 256):
+        """
+        初始化图表渲染器
+
+        Args:
+            max_workers (int): 渲染线程数
+            cache_size (int): 记录的已渲染图表数量上限
+        """
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 图表键 -> 已渲染的文件路径
+        self._rendered: "OrderedDict[Hashable, str]" = OrderedDict()
+        # (图表键, 文件路径) -> 渲染中的任务，同一图表的并发请求共用一次渲染
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, key: Hashable, path: str, counts: "np.ndarray", edges: "np.ndarray",
+                  column: str) -> Tuple["Future[str]", bool]:
+        """
+        提交直方图渲染任务，立即返回
+
+        Args:
+            key (Hashable): 图表键，如 (数据指纹, 列名, 分箱数)
+            path (str): 图表保存路径
+            counts (np.ndarray): 各分箱的频次（numpy.histogram 的结果）
+            edges (np.ndarray): 分箱边界
+            column (str): 列名
+
+        Returns:
+            (完成后结果为图表路径的 Future, 是否命中已渲染的图表)
+        """
+        with self._lock:
+            rendered = self._rendered.get(key)
+            if rendered is not None and os.path.exists(rendered):
+                self._rendered.move_to_end(key)
+            else:
+                future = self._pending.get((key, path))
+                if future is None:
+                    future = self._get_executor().submit(self._render, key, path, counts, edges, column)
+                    self._pending[(key, path)] = future
+                return future, False
+
+        # 相同数据的图表已经渲染过，只需要复制到新路径
+        if rendered != path:
+            shutil.copyfile(rendered, path)
+        future = Future()
+        future.set_result(path)
+        return future, True
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="chart-render")
+        return self._executor
+
+    def _render(self, key: Hashable, path: str, counts: "np.ndarray", edges: "np.ndarray", column: str) -> str:
+        # 先写临时文件再原子替换，读取方不会看到写了一半的图片
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            # matplotlib 导入耗时较长，在渲染线程中首次绘图时才导入
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+            figure = Figure(figsize=(10, 6))
+            FigureCanvasAgg(figure)
+            axes = figure.subplots()
+            axes.stairs(counts, edges, fill=True)
+            axes.set_title(f'{column} 分布直方图')
+            axes.set_xlabel(column)
+            axes.set_ylabel('频次')
+            figure.savefig(tmp, format="png")
+            os.replace(tmp, path)
+            with self._lock:
+                self._rendered[key] = path
+                self._rendered.move_to_end(key)
+                while len(self._rendered) > self.cache_size:
+                    self._rendered.popitem(last=False)
+            return path
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            with self._lock:
+                self._pending.pop((key, path), None)
+
+    def close(self) -> None:
+        """
+        关闭渲染线程池并等待进行中的渲染结束，之后的请求会重新创建线程池
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# 进程内共享的图表渲染器
+default_chart_renderer = ChartRenderer()
\ No newline at end of file
@@ -0,0 +1,178 @@
+import hashlib
+import importlib
+import importlib.util
+import os
+import threading
+from typing import Any, List, NamedTuple, Optional
+
+
+# 按列存储的文件格式，读取时只解码需要的列
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.feather', '.arrow', '.ipc')
+COLUMNAR_EXTENSIONS = PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+
+class TableInfo(NamedTuple):
+    """
+    列式文件的元数据，读取时不需要解码任何数据列
+    """
+    columns: List[str]
+    numeric_columns: List[str]
+    num_rows: int
+
+    @property
+    def shape(self):
+        return self.num_rows, len(self.columns)
+
+
+def pyarrow_available() -> bool:
+    """
+    pyarrow 是可选依赖，只在读取列式文件时才导入
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _import(name: str) -> Any:
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise ImportError("读取 Parquet/Arrow 文件需要安装 pyarrow：pip install pyarrow") from e
+
+
+def is_columnar(path: str) -> bool:
+    return path.lower().endswith(COLUMNAR_EXTENSIONS)
+
+
+def _is_numeric(data_type) -> bool:
+    # 与 DataFrame.select_dtypes(include=['number']) 保持一致：布尔和 decimal 不算数值列
+    types = _import("pyarrow.types")
+    return types.is_integer(data_type) or types.is_floating(data_type)
+
+
+def _open(path: str):
+    """
+    打开列式文件，返回 (Parquet 文件, Arrow 表) 中的一个，另一个为 None
+
+    Arrow IPC / Feather 文件通过内存映射读取，数据列在被转换前不会复制到内存
+    """
+    if path.lower().endswith(PARQUET_EXTENSIONS):
+        parquet = _import("pyarrow.parquet")
+        return parquet.ParquetFile(path, memory_map=True), None
+    feather = _import("pyarrow.feather")
+    return None, feather.read_table(path, memory_map=True)
+
+
+def read_info(path: str) -> TableInfo:
+    """
+    只读取列式文件的 schema 和行数
+
+    Args:
+        path (str): Parquet / Feather / Arrow IPC 文件路径
+
+    Returns:
+        TableInfo: 列名、数值列和行数
+    """
+    parquet_file, table = _open(path)
+    if parquet_file is not None:
+        schema, num_rows = parquet_file.schema_arrow, parquet_file.metadata.num_rows
+    else:
+        schema, num_rows = table.schema, table.num_rows
+    columns = list(schema.names)
+    numeric = [field.name for field in schema if _is_numeric(field.type)]
+    return TableInfo(columns, numeric, num_rows)
+
+
+def empty_frame(path: str):
+    """
+    生成与列式文件列名、类型一致但没有数据行的 DataFrame
+
+    Args:
+        path (str): Parquet / Feather / Arrow IPC 文件路径
+
+    Returns:
+        pd.DataFrame: 空数据
+    """
+    parquet_file, table = _open(path)
+    schema = parquet_file.schema_arrow if parquet_file is not None else table.schema
+    return schema.empty_table().to_pandas()
+
+
+def read_columns(path: str, columns: List[str]):
+    """
+    只读取指定列并转换为 DataFrame（投影下推）
+
+    Args:
+        path (str): Parquet / Feather / Arrow IPC 文件路径
+        columns (List[str]): 需要读取的列
+
+    Returns:
+        pd.DataFrame: 只包含指定列的数据
+    """
+    parquet_file, table = _open(path)
+    if parquet_file is not None:
+        table = parquet_file.read(columns=columns)
+    else:
+        table = table.select(columns)
+    return table.to_pandas()
+
+
+def cached_arrow_path(csv_path: str, cache_dir: str) -> str:
+    """
+    CSV 对应的 Arrow 缓存文件路径，文件名包含 CSV 的修改时间和大小，CSV 变化后自动失效
+
+    Args:
+        csv_path (str): CSV 文件路径
+        cache_dir (str): 缓存目录
+
+    Returns:
+        str: Arrow 缓存文件路径
+    """
+    stat = os.stat(csv_path)
+    prefix = hashlib.sha1(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{prefix}-{stat.st_mtime_ns}-{stat.st_size}.arrow")
+
+
+def csv_to_arrow(csv_path: str, cache_dir: str) -> Optional[str]:
+    """
+    首次访问时将 CSV 分批转换为 Arrow IPC 文件，之后直接复用缓存文件
+
+    转换按批流式写入，内存占用与文件大小无关。pyarrow 无法按首批推断的类型解析
+    后续数据时返回 None，由调用方回退到 pandas 读取
+
+    Args:
+        csv_path (str): CSV 文件路径
+        cache_dir (str): 缓存目录
+
+    Returns:
+        Optional[str]: Arrow 缓存文件路径，无法转换时返回 None
+    """
+    target = cached_arrow_path(csv_path, cache_dir)
+    if os.path.exists(target):
+        return target
+
+    pa = _import("pyarrow")
+    csv = _import("pyarrow.csv")
+    os.makedirs(cache_dir, exist_ok=True)
+    # 先写临时文件再原子替换，并发转换或转换中断都不会留下不完整的缓存
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        reader = csv.open_csv(csv_path)
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        os.replace(tmp, target)
+    except pa.ArrowInvalid:
+        return None
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    # 同一 CSV 旧版本的缓存文件已失效
+    prefix = os.path.basename(target).split("-", 1)[0] + "-"
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name.endswith(".arrow") and name != os.path.basename(target):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+    return target
\ No newline at end of file
@@ -0,0 +1,235 @@
+import contextlib
+import itertools
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from core.cache import FRESH, TTLCache
+
+
+CUSTOMER_FIELDS = ("name", "email", "phone", "level")
+ORDER_FIELDS = ("product", "status", "tracking_number", "delivery_date")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS customers ("
+    "user_id TEXT PRIMARY KEY, name TEXT, email TEXT, phone TEXT, level TEXT) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS orders ("
+    "order_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, product TEXT, status TEXT, "
+    "tracking_number TEXT, delivery_date TEXT) WITHOUT ROWID",
+)
+# 按用户统计、列出订单使用的二级索引；订单号和用户ID的主键本身就是索引
+_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_orders_user ON orders (user_id)",
+)
+
+# 语句文本固定，sqlite3 按连接缓存编译后的语句（预编译语句）
+_SELECT_CUSTOMER = "SELECT name, email, phone, level FROM customers WHERE user_id = ?"
+_COUNT_ORDERS = "SELECT COUNT(*) FROM orders WHERE user_id = ?"
+_SELECT_ORDER = ("SELECT product, status, tracking_number, delivery_date FROM orders "
+                 "WHERE order_id = ? AND user_id = ?")
+# 订单号是 orders 表的主键，即全局的 订单号 -> (用户ID, 订单) 索引，随订单写入同步更新
+_FIND_ORDER = ("SELECT user_id, product, status, tracking_number, delivery_date FROM orders "
+               "WHERE order_id = ?")
+_ORDER_OWNER = "SELECT user_id FROM orders WHERE order_id = ?"
+_UPSERT_CUSTOMER = "INSERT OR REPLACE INTO customers (user_id, name, email, phone, level) VALUES (?, ?, ?, ?, ?)"
+_UPSERT_ORDER = ("INSERT OR REPLACE INTO orders "
+                 "(order_id, user_id, product, status, tracking_number, delivery_date) VALUES (?, ?, ?, ?, ?, ?)")
+
+_memory_ids = itertools.count()
+
+
+class CustomerStore:
+    """
+    基于 SQLite 的客户与订单存储
+
+    文件数据库使用 WAL 模式，读写互不阻塞；每个线程复用自己的连接（线程本地连接池），
+    热点用户的资料经过一层读穿透 LRU 缓存。内存数据库的各连接通过共享缓存访问同一个库，
+    共享缓存按表加锁，冲突时直接报 SQLITE_LOCKED 而不按 busy timeout 等待，因此所有语句串行执行
+    """
+
+    def __init__(self, path: Optional[str] = None, profile_cache_size: int = 10000, profile_cache_ttl: float = 60):
+        """
+        初始化存储
+
+        Args:
+            path (Optional[str]): 数据库文件路径，None 表示进程内的内存数据库
+            profile_cache_size (int): 缓存的用户资料数量
+            profile_cache_ttl (float): 用户资料的缓存时长（秒），其他进程写入的数据最多延迟这么久可见
+        """
+        if path is None:
+            # 同一进程内的多个连接通过共享缓存访问同一个内存数据库
+            self._uri = f"file:customer-store-{next(_memory_ids)}?mode=memory&cache=shared"
+        else:
+            self._uri = Path(os.path.abspath(path)).as_uri()
+        self.path = path
+        self.profiles = TTLCache(profile_cache_ttl, max_size=profile_cache_size)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._statement_lock = threading.Lock() if path is None else contextlib.nullcontext()
+
+        connection = self._connection()
+        with self._statement_lock:
+            for statement in _SCHEMA + _INDEXES:
+                connection.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None：单条语句自动提交，批量写入时显式开启事务
+        connection = sqlite3.connect(self._uri, uri=True, check_same_thread=False, isolation_level=None,
+                                     cached_statements=256, timeout=5)
+        if self.path is not None:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA mmap_size=268435456")
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def get_customer(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询用户资料（包含订单数量），优先读取缓存
+
+        Args:
+            user_id (str): 用户ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 用户资料，用户不存在时返回 None
+        """
+        profile, state = self.profiles.get(user_id)
+        if state == FRESH:
+            return profile
+
+        connection = self._connection()
+        with self._statement_lock:
+            row = connection.execute(_SELECT_CUSTOMER, (user_id,)).fetchone()
+            if row is None:
+                return None
+            profile = dict(zip(CUSTOMER_FIELDS, row))
+            profile["order_count"] = connection.execute(_COUNT_ORDERS, (user_id,)).fetchone()[0]
+        self.profiles.set(user_id, profile)
+        return profile
+
+    def get_order(self, user_id: str, order_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询用户的订单
+
+        Args:
+            user_id (str): 用户ID
+            order_id (str): 订单号
+
+        Returns:
+            Optional[Dict[str, Any]]: 订单信息，订单不存在或不属于该用户时返回 None
+        """
+        connection = self._connection()
+        with self._statement_lock:
+            row = connection.execute(_SELECT_ORDER, (order_id, user_id)).fetchone()
+        return dict(zip(ORDER_FIELDS, row)) if row is not None else None
+
+    def find_order(self, order_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        只凭订单号查询订单，用于尚未确认用户身份时的查询
+
+        Args:
+            order_id (str): 订单号
+
+        Returns:
+            Optional[Tuple[str, Dict[str, Any]]]: (所属用户ID, 订单信息)，订单不存在时返回 None
+        """
+        connection = self._connection()
+        with self._statement_lock:
+            row = connection.execute(_FIND_ORDER, (order_id,)).fetchone()
+        return (row[0], dict(zip(ORDER_FIELDS, row[1:]))) if row is not None else None
+
+    def upsert_customer(self, user_id: str, **fields: Any) -> None:
+        """
+        新增或更新用户
+
+        Args:
+            user_id (str): 用户ID
+            **fields: name、email、phone、level
+        """
+        connection = self._connection()
+        with self._statement_lock:
+            connection.execute(_UPSERT_CUSTOMER, (user_id, *(fields.get(name) for name in CUSTOMER_FIELDS)))
+        self.profiles.invalidate(user_id)
+
+    def upsert_order(self, user_id: str, order_id: str, **fields: Any) -> None:
+        """
+        新增或更新订单
+
+        Args:
+            user_id (str): 用户ID
+            order_id (str): 订单号
+            **fields: product、status、tracking_number、delivery_date
+        """
+        connection = self._connection()
+        with self._statement_lock:
+            owner = connection.execute(_ORDER_OWNER, (order_id,)).fetchone()
+            connection.execute(_UPSERT_ORDER, (order_id, user_id, *(fields.get(name) for name in ORDER_FIELDS)))
+        # 订单数量是用户资料的一部分；订单换了所属用户时，原用户的订单数量也变了
+        self.profiles.invalidate(user_id)
+        if owner is not None and owner[0] != user_id:
+            self.profiles.invalidate(owner[0])
+
+    def bulk_load(self, customers: Iterable[Sequence[Any]], orders: Iterable[Sequence[Any]] = (),
+                  batch_size: int = 50000) -> None:
+        """
+        批量导入数据，用于初始导入：全部数据在一个事务中分批写入；
+        订单表为空时先删除二级索引，导入完成后一次性重建
+
+        Args:
+            customers (Iterable[Sequence[Any]]): (user_id, name, email, phone, level) 行
+            orders (Iterable[Sequence[Any]]): (order_id, user_id, product, status, tracking_number, delivery_date) 行
+            batch_size (int): 每批写入的行数
+        """
+        connection = self._connection()
+        with self._statement_lock:
+            rebuild = connection.execute("SELECT 1 FROM orders LIMIT 1").fetchone() is None
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if rebuild:
+                    connection.execute("DROP INDEX IF EXISTS idx_orders_user")
+                for statement, rows in ((_UPSERT_CUSTOMER, customers), (_UPSERT_ORDER, orders)):
+                    rows = iter(rows)
+                    while True:
+                        batch = list(itertools.islice(rows, batch_size))
+                        if not batch:
+                            break
+                        connection.executemany(statement, batch)
+                for statement in _INDEXES:
+                    connection.execute(statement)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        self.profiles.clear()
+
+    def load_nested(self, data: Dict[str, Dict[str, Any]]) -> None:
+        """
+        导入嵌套字典格式的数据：{user_id: {name, email, phone, level, orders: {order_id: {...}}}}
+
+        Args:
+            data (Dict[str, Dict[str, Any]]): 客户数据
+        """
+        customers = [(user_id, *(customer.get(name) for name in CUSTOMER_FIELDS)) for user_id, customer in data.items()]
+        orders = [(order_id, user_id, *(order.get(name) for name in ORDER_FIELDS))
+                  for user_id, customer in data.items()
+                  for order_id, order in customer.get("orders", {}).items()]
+        self.bulk_load(customers, orders)
+
+    def close(self) -> None:
+        """
+        关闭所有线程的连接
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
\ No newline at end of file
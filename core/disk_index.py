@@ -0,0 +1,527 @@
+import heapq
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from core.search_index import BaseIndex, bm25_idf, document_text, tokenize
+
+
+_MAGIC = b"KBSEG001"
+# 段文件各分区，按顺序写入
+_SECTIONS = ("docs", "doc_offsets", "ids", "id_offsets", "lengths", "terms", "term_offsets", "posting_offsets", "postings")
+# 魔数、文档总长度（词元数），以及每个分区的 (偏移, 长度)
+_HEADER = struct.Struct("<8sQ" + "QQ" * len(_SECTIONS))
+
+
+def _align(data: bytes) -> bytes:
+    """
+    将分区补齐到 8 字节边界，保证 memoryview.cast 可以直接映射
+    """
+    return data + b"\0" * (-len(data) % 8)
+
+
+def _blob(items: List[bytes]) -> Tuple[bytes, bytes]:
+    """
+    将变长字节串拼接为数据区与偏移表（长度为 n + 1）
+    """
+    offsets = array("Q", [0])
+    for item in items:
+        offsets.append(offsets[-1] + len(item))
+    return b"".join(items), offsets.tobytes()
+
+
+class Segment:
+    """
+    不可变的索引段：一个内存映射文件，包含文档表、词典和倒排列表
+
+    文档按ID排序存放，段内文档序号即排序后的位置；数值数组使用本机字节序。
+    """
+
+    def __init__(self, path: str, generation: int):
+        """
+        打开索引段，仅做内存映射，不读取内容
+
+        Args:
+            path (str): 段文件路径
+            generation (int): 段的代数，越新越大
+        """
+        self.path = path
+        self.generation = generation
+        # 被删除或被新版本覆盖的段内文档序号
+        self.dead = set()
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = _HEADER.unpack_from(self._mmap, 0)
+        if header[0] != _MAGIC:
+            raise ValueError(f"无效的索引段文件: {path}")
+
+        view = memoryview(self._mmap)
+        sections = {}
+        self.total_length = header[1]
+        for i, name in enumerate(_SECTIONS):
+            offset, length = header[2 + 2 * i], header[3 + 2 * i]
+            sections[name] = view[offset:offset + length]
+
+        self._docs = sections["docs"]
+        self._doc_offsets = sections["doc_offsets"].cast("Q")
+        self._ids = sections["ids"]
+        self._id_offsets = sections["id_offsets"].cast("Q")
+        self._lengths = sections["lengths"].cast("I")
+        self._terms = sections["terms"]
+        self._term_offsets = sections["term_offsets"].cast("Q")
+        self._posting_offsets = sections["posting_offsets"].cast("Q")
+        self._postings = sections["postings"].cast("I")
+
+        self.doc_count = len(self._id_offsets) - 1
+        self.term_count = len(self._term_offsets) - 1
+
+    @staticmethod
+    def write(path: str, documents: List[Tuple[str, Dict[str, Any]]], fields: Iterable[str]) -> None:
+        """
+        将一批文档写为新的索引段文件（先写临时文件再原子替换）
+
+        Args:
+            path (str): 段文件路径
+            documents (List[Tuple[str, Dict[str, Any]]]): (文档ID, 文档内容) 列表，ID 不可重复
+            fields (Iterable[str]): 参与索引的文档字段
+        """
+        fields = tuple(fields)
+        documents = sorted(documents, key=lambda item: item[0].encode("utf-8"))
+
+        lengths = array("I")
+        postings: Dict[bytes, List[int]] = {}
+        for local_id, (doc_id, document) in enumerate(documents):
+            tokens = tokenize(document_text(document, fields))
+            lengths.append(len(tokens))
+            frequencies: Dict[str, int] = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, tf in frequencies.items():
+                postings.setdefault(token.encode("utf-8"), []).extend((local_id, tf))
+
+        docs, doc_offsets = _blob([json.dumps(document, ensure_ascii=False).encode("utf-8") for _, document in documents])
+        ids, id_offsets = _blob([doc_id.encode("utf-8") for doc_id, _ in documents])
+        terms = sorted(postings)
+        term_blob, term_offsets = _blob(terms)
+        posting_offsets = array("Q", [0])
+        posting_data = array("I")
+        for term in terms:
+            posting_data.extend(postings[term])
+            posting_offsets.append(len(posting_data) * posting_data.itemsize)
+
+        sections = {
+            "docs": docs,
+            "doc_offsets": doc_offsets,
+            "ids": ids,
+            "id_offsets": id_offsets,
+            "lengths": lengths.tobytes(),
+            "terms": term_blob,
+            "term_offsets": term_offsets,
+            "posting_offsets": posting_offsets.tobytes(),
+            "postings": posting_data.tobytes(),
+        }
+
+        header_values = []
+        body = []
+        position = _HEADER.size + (-_HEADER.size % 8)
+        for name in _SECTIONS:
+            data = sections[name]
+            header_values.extend((position, len(data)))
+            body.append(_align(data))
+            position += len(body[-1])
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_align(_HEADER.pack(_MAGIC, sum(lengths), *header_values)))
+            for data in body:
+                f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def find(self, doc_id: str) -> Optional[int]:
+        """
+        二分查找文档ID对应的段内序号
+
+        Args:
+            doc_id (str): 文档ID
+
+        Returns:
+            Optional[int]: 段内序号，不存在时返回 None
+        """
+        target = doc_id.encode("utf-8")
+        low, high = 0, self.doc_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._ids[self._id_offsets[mid]:self._id_offsets[mid + 1]].tobytes() < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.doc_count and self.doc_id(low) == doc_id:
+            return low
+        return None
+
+    def doc_id(self, local_id: int) -> str:
+        return self._ids[self._id_offsets[local_id]:self._id_offsets[local_id + 1]].tobytes().decode("utf-8")
+
+    def document(self, local_id: int) -> Dict[str, Any]:
+        return json.loads(self._docs[self._doc_offsets[local_id]:self._doc_offsets[local_id + 1]].tobytes())
+
+    def length(self, local_id: int) -> int:
+        return self._lengths[local_id]
+
+    def postings(self, token: str) -> Optional[memoryview]:
+        """
+        二分查找词元的倒排列表
+
+        Args:
+            token (str): 词元
+
+        Returns:
+            Optional[memoryview]: 交替排列的 (段内序号, 词频)，词元不存在时返回 None
+        """
+        target = token.encode("utf-8")
+        low, high = 0, self.term_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._terms[self._term_offsets[mid]:self._term_offsets[mid + 1]].tobytes() < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low == self.term_count or self._terms[self._term_offsets[low]:self._term_offsets[low + 1]].tobytes() != target:
+            return None
+        start = self._posting_offsets[low] // 4
+        end = self._posting_offsets[low + 1] // 4
+        return self._postings[start:end]
+
+    def live_documents(self) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        for local_id in range(self.doc_count):
+            if local_id not in self.dead:
+                yield self.doc_id(local_id), self.document(local_id)
+
+
+class SegmentedIndex(BaseIndex):
+    """
+    基于文件的持久化倒排索引
+
+    每次写入追加一个不可变段，删除和更新通过墓碑日志标记旧版本；段数量超过阈值时
+    在后台线程中合并。冷启动只读取清单和墓碑日志并映射段文件，与语料规模无关。
+
+    墓碑记录 ``doc_id -> generation`` 表示代数不大于该值的段中的同ID文档已失效。
+    """
+
+    MANIFEST = "manifest.json"
+    TOMBSTONES = "tombstones.log"
+
+    def __init__(self, directory: str, fields: Iterable[str] = ("title", "content"), k1: float = 1.5,
+                 b: float = 0.75, max_segments: int = 8, background_merge: bool = True):
+        """
+        打开（或创建）索引目录
+
+        Args:
+            directory (str): 索引目录
+            fields (Iterable[str]): 参与索引的文档字段
+            k1 (float): BM25 词频饱和参数
+            b (float): BM25 文档长度归一化参数
+            max_segments (int): 段数量超过该值时触发合并
+            background_merge (bool): 是否在后台线程中合并
+        """
+        self.directory = directory
+        self.fields = tuple(fields)
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self.background_merge = background_merge
+
+        self._lock = threading.RLock()
+        self._merge_lock = threading.Lock()
+        self._merge_thread: Optional[threading.Thread] = None
+        self._tombstones: Dict[str, int] = {}
+        os.makedirs(directory, exist_ok=True)
+
+        manifest_path = os.path.join(directory, self.MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            # 已有段按建立时的字段分词，字段不一致时检索结果会静默缺失
+            stored_fields = tuple(manifest.get("fields", self.fields))
+            if stored_fields != self.fields:
+                raise ValueError(f"索引目录 {directory} 的字段为 {stored_fields}，与指定的 {self.fields} 不一致")
+        else:
+            manifest = {"next_generation": 1, "segments": []}
+        self._next_generation = manifest["next_generation"]
+        # 段列表只整体替换不原地修改，读操作无需加锁
+        self._segments: List[Segment] = [
+            Segment(os.path.join(directory, item["name"]), item["generation"]) for item in manifest["segments"]
+        ]
+
+        tombstone_path = os.path.join(directory, self.TOMBSTONES)
+        if os.path.exists(tombstone_path):
+            with open(tombstone_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    generation, doc_id = line.rstrip("\n").split("\t", 1)
+                    self._apply_tombstone(json.loads(doc_id), int(generation), self._segments)
+
+    def __len__(self) -> int:
+        return sum(segment.doc_count - len(segment.dead) for segment in self._segments)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self._locate(doc_id) is not None
+
+    def _apply_tombstone(self, doc_id: str, generation: int, segments: List[Segment]) -> None:
+        """
+        记录墓碑并在受影响段中标记失效文档
+        """
+        if generation <= self._tombstones.get(doc_id, 0):
+            return
+        self._tombstones[doc_id] = generation
+        for segment in segments:
+            if segment.generation <= generation:
+                local_id = segment.find(doc_id)
+                if local_id is not None:
+                    segment.dead.add(local_id)
+
+    def _write_tombstones(self, entries: List[Tuple[str, int]]) -> None:
+        with open(os.path.join(self.directory, self.TOMBSTONES), "a", encoding="utf-8") as f:
+            for doc_id, generation in entries:
+                f.write(f"{generation}\t{json.dumps(doc_id, ensure_ascii=False)}\n")
+        for doc_id, generation in entries:
+            self._apply_tombstone(doc_id, generation, self._segments)
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "fields": list(self.fields),
+            "next_generation": self._next_generation,
+            "segments": [
+                {"name": os.path.basename(segment.path), "generation": segment.generation}
+                for segment in self._segments
+            ],
+        }
+        path = os.path.join(self.directory, self.MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _locate(self, doc_id: str) -> Optional[Tuple[Segment, int]]:
+        """
+        从最新的段开始查找文档的有效版本
+        """
+        for segment in reversed(self._segments):
+            local_id = segment.find(doc_id)
+            if local_id is not None and local_id not in segment.dead:
+                return segment, local_id
+        return None
+
+    def add_document(self, doc_id: str, document: Dict[str, Any]) -> None:
+        """
+        添加或覆盖一篇文档（写入一个新段）
+
+        Args:
+            doc_id (str): 文档ID
+            document (Dict[str, Any]): 文档内容
+        """
+        self.add_documents([(doc_id, document)])
+
+    def add_documents(self, documents: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        将一批文档写为一个新段，同ID的旧版本通过墓碑失效
+
+        Args:
+            documents (Iterable[Tuple[str, Dict[str, Any]]]): (文档ID, 文档内容) 序列
+        """
+        # 同一批次中后出现的版本生效
+        batch = list(dict(documents).items())
+        if not batch:
+            return
+
+        with self._lock:
+            generation = self._next_generation
+            name = f"seg_{generation:08d}"
+            Segment.write(os.path.join(self.directory, name), batch, self.fields)
+            replaced = [(doc_id, generation - 1) for doc_id, _ in batch if self._locate(doc_id) is not None]
+
+            self._segments = self._segments + [Segment(os.path.join(self.directory, name), generation)]
+            self._next_generation = generation + 1
+            self._write_manifest()
+            if replaced:
+                self._write_tombstones(replaced)
+
+        self._maybe_merge()
+
+    def remove_document(self, doc_id: str) -> None:
+        """
+        通过追加墓碑删除一篇文档
+
+        Args:
+            doc_id (str): 文档ID
+        """
+        with self._lock:
+            if self._locate(doc_id) is not None:
+                self._write_tombstones([(doc_id, self._next_generation - 1)])
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取文档内容
+
+        Args:
+            doc_id (str): 文档ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 文档内容，不存在时返回 None
+        """
+        location = self._locate(doc_id)
+        if location is None:
+            return None
+        segment, local_id = location
+        return segment.document(local_id)
+
+    def doc_ids(self, limit: Optional[int] = None) -> List[str]:
+        """
+        列出索引中的文档ID
+
+        Args:
+            limit (Optional[int]): 最多返回的数量
+
+        Returns:
+            List[str]: 文档ID列表
+        """
+        segments = self._segments
+        live = (
+            segment.doc_id(local_id)
+            for segment in segments
+            for local_id in range(segment.doc_count)
+            if local_id not in segment.dead
+        )
+        return list(itertools.islice(live, limit))
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        跨所有段使用 BM25 检索
+
+        文档总数与平均长度按段统计（包含尚未合并掉的失效文档），合并后自动收敛。
+
+        Args:
+            query (str): 查询文本
+            top_k (int): 返回结果数量
+
+        Returns:
+            List[Tuple[str, float]]: 按得分降序排列的 (文档ID, 得分) 列表
+        """
+        segments = self._segments
+        doc_count = sum(segment.doc_count for segment in segments)
+        if not doc_count:
+            return []
+        avg_length = sum(segment.total_length for segment in segments) / doc_count
+
+        scores: Dict[Tuple[int, int], float] = {}
+        for token in set(tokenize(query, unigrams=True)):
+            token_postings = [(index, segment.postings(token)) for index, segment in enumerate(segments)]
+            token_postings = [(index, posting) for index, posting in token_postings if posting is not None]
+            if not token_postings:
+                continue
+            idf = bm25_idf(doc_count, sum(len(posting) // 2 for _, posting in token_postings))
+            for index, posting in token_postings:
+                segment = segments[index]
+                dead = segment.dead
+                for i in range(0, len(posting), 2):
+                    local_id, tf = posting[i], posting[i + 1]
+                    if local_id in dead:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * segment.length(local_id) / avg_length)
+                    key = (index, local_id)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(segments[index].doc_id(local_id), score) for (index, local_id), score in best]
+
+    def _maybe_merge(self) -> None:
+        if len(self._segments) <= self.max_segments:
+            return
+        if not self.background_merge:
+            self.merge()
+            return
+        with self._lock:
+            if self._merge_thread is not None:
+                return
+            self._merge_thread = threading.Thread(target=self._background_merge, name="kb-index-merge", daemon=True)
+            self._merge_thread.start()
+
+    def _background_merge(self) -> None:
+        # 合并期间追加的段可能再次超过阈值，持续合并直到满足上限；
+        # 在锁内判断并清除线程标记，之后的写入会重新触发合并
+        try:
+            while True:
+                self.merge()
+                with self._lock:
+                    if len(self._segments) <= self.max_segments:
+                        self._merge_thread = None
+                        return
+        except BaseException:
+            with self._lock:
+                self._merge_thread = None
+            raise
+
+    def merge(self) -> None:
+        """
+        将当前所有段合并为一个段，丢弃失效文档并压缩墓碑日志
+
+        合并期间的新写入追加在合并结果之后，不会被阻塞。
+        """
+        with self._merge_lock:
+            self._merge()
+
+    def _merge(self) -> None:
+        snapshot = self._segments
+        if len(snapshot) < 2:
+            return
+
+        generation = max(segment.generation for segment in snapshot)
+        live = [item for segment in snapshot for item in segment.live_documents()]
+        with self._lock:
+            name = f"seg_{self._next_generation:08d}"
+            # 合并结果的代数沿用输入中的最大值，文件名使用新序号避免冲突
+            self._next_generation += 1
+        path = os.path.join(self.directory, name)
+        Segment.write(path, live, self.fields)
+
+        with self._lock:
+            merged = Segment(path, generation)
+            # 合并期间产生的墓碑同样作用于合并结果
+            for doc_id, tombstone in self._tombstones.items():
+                if tombstone >= generation:
+                    local_id = merged.find(doc_id)
+                    if local_id is not None:
+                        merged.dead.add(local_id)
+            self._segments = [merged] + self._segments[len(snapshot):]
+            self._write_manifest()
+
+            oldest = min(segment.generation for segment in self._segments)
+            self._tombstones = {
+                doc_id: tombstone for doc_id, tombstone in self._tombstones.items() if tombstone >= oldest
+            }
+            tombstone_path = os.path.join(self.directory, self.TOMBSTONES)
+            with open(tombstone_path + ".tmp", "w", encoding="utf-8") as f:
+                for doc_id, tombstone in self._tombstones.items():
+                    f.write(f"{tombstone}\t{json.dumps(doc_id, ensure_ascii=False)}\n")
+            os.replace(tombstone_path + ".tmp", tombstone_path)
+
+        # 已映射的旧段在没有读者引用后由 GC 释放，这里只删除文件
+        for segment in snapshot:
+            try:
+                os.remove(segment.path)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        """
+        等待后台合并结束
+        """
+        thread = self._merge_thread
+        while thread is not None:
+            thread.join()
+            thread = self._merge_thread
@@ -0,0 +1,212 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple
+from core import instrumentation
+
+
+class Entity(NamedTuple):
+    """
+    从用户输入中抽取的实体
+    """
+    kind: str
+    value: str
+    span: Tuple[int, int]
+
+
+# 实体规则：(分组名, 实体类型, 优先级, 正则表达式)
+# 规则在小写化后的文本上匹配，实体值按位置从原文截取；同类实体取优先级最小的命中，
+# 优先级相同时取位置最靠前的命中
+_RULES = (
+    ("order_no", "order_id", 0, r'订单号[:：\s]*(?P<order_no>\w+)'),
+    ("order_en", "order_id", 1, r'order[ \w]*[:：\s]*(?P<order_en>\w+)'),
+    ("order_cn", "order_id", 2, r'订单[:：\s]*(?P<order_cn>\w+)'),
+    # 兜底：形如 ORD001 的订单号
+    ("order_code", "order_id", 3, r'(?P<order_code>[a-z]{2,}[0-9]{2,})'),
+    # 只从连续字母或汉字的开头匹配，理由同 path_file
+    ("city_cn", "city", 0, r'(?<![a-z\u4e00-\u9fa5])(?P<city_cn>[a-z\u4e00-\u9fa5]+)的天气'),
+    ("city_en", "city", 0, r'weather in (?P<city_en>[a-z\u4e00-\u9fa5]+)'),
+    ("path_cn", "data_path", 0, r'数据路径[:：]\s*(?P<path_cn>[^\s,;]+)'),
+    ("path_en", "data_path", 1, r'data path[:：]\s*(?P<path_en>[^\s,;]+)'),
+    # 只从分隔符之后开始匹配，结果与从左到右的最长匹配相同但避免逐字符回溯
+    ("path_file", "data_path", 2, r'(?<![^\s,;])(?P<path_file>[^\s,;]+\.(?:csv|xlsx|json|parquet|feather|arrow))'),
+    # 以 / 结尾的目录，分析目录下的全部分片文件
+    ("path_dir", "data_path", 3, r'(?<![^\s,;])(?P<path_dir>[^\s,;]*/)(?![^\s,;])'),
+    ("subject_python", "subject", 0, r'(?P<subject_python>python)'),
+    ("subject_ai", "subject", 1, r'(?P<subject_ai>ai|人工智能|机器学习|ml)'),
+    ("subject_web", "subject", 2, r'(?P<subject_web>web|前端|react|javascript|js)'),
+)
+
+ENTITY_KINDS = tuple(dict.fromkeys(kind for _, kind, _, _ in _RULES))
+
+# 值需要规范化的分组
+_NORMALIZERS = {
+    "order_code": str.upper,
+    "subject_python": lambda value: "python",
+    "subject_ai": lambda value: "ai",
+    "subject_web": lambda value: "web",
+}
+
+# 主题关键词都未命中时使用的宽松规则，取第一个非空分组
+_SUBJECT_FALLBACK = re.compile(r'学习(.+?)|推荐(.+?)学习|学习(.+?)资源|tutorial on ([^|]+)|learn ([^|]+)|练习(.+?)|(.+?)练习|(.+?)题目')
+
+
+def _value(text: str, group: str, start: int, end: int) -> str:
+    value = text[start:end]
+    normalize = _NORMALIZERS.get(group)
+    return normalize(value) if normalize else value
+
+
+# 只由字面量分支组成的规则，如 (?P<subject_ai>ai|人工智能|机器学习|ml)
+_LITERAL_RULE = re.compile(r'\(\?P<(\w+)>([^\\()\[\]{}.*+?^$]+)\)')
+
+
+def _kind_levels(kind: str) -> List[Tuple[Pattern, Optional[str], Optional[Tuple[Tuple[str, str], ...]]]]:
+    """
+    按优先级预编译一类实体的规则，同一优先级的规则合为一个带命名分组的分支表达式，命中的分组即 lastgroup
+
+    Returns:
+        List[Tuple[Pattern, Optional[str], Optional[Tuple[Tuple[str, str], ...]]]]: 每层的 (分支表达式, 分组名,
+            (字面量, 实体值) 列表)；只由一个字面量分支分组组成的层用子串查找代替正则搜索，其余层的后两项为 None
+    """
+    levels: Dict[int, List[str]] = {}
+    for _, rule_kind, priority, pattern in _RULES:
+        if rule_kind == kind:
+            levels.setdefault(priority, []).append(pattern)
+    compiled = []
+    for priority in sorted(levels):
+        patterns = levels[priority]
+        literal = _LITERAL_RULE.fullmatch(patterns[0]) if len(patterns) == 1 else None
+        if literal:
+            group = literal.group(1)
+            literals = tuple((value, _value(value, group, 0, len(value))) for value in literal.group(2).split("|"))
+            compiled.append((re.compile(patterns[0]), group, literals))
+        else:
+            compiled.append((re.compile("|".join(patterns)), None, None))
+    return compiled
+
+
+# 导入时预编译，抽取时按优先级逐层搜索，命中即停止
+_KIND_LEVELS = {kind: _kind_levels(kind) for kind in ENTITY_KINDS}
+
+
+def _lower(text: str) -> str:
+    """
+    逐字符小写化并保持长度不变，使匹配位置可直接用于截取原文
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return _lower_keep_length(text)
+
+
+def _lower_keep_length(text: str) -> str:
+    # 少数字符（如 "İ"）小写后长度会变化，这些字符保留原样
+    return "".join(lower if len(lower) == 1 else char for char, lower in ((char, char.lower()) for char in text))
+
+
+def _search(kind: str, lowered: str) -> Optional[Tuple[str, int, int]]:
+    """
+    返回优先级最高的层中位置最靠前的命中 (分组名, 起始位置, 结束位置)
+    """
+    for pattern, group, literals in _KIND_LEVELS[kind]:
+        if literals is None:
+            match = pattern.search(lowered)
+            if match is not None:
+                group = match.lastgroup
+                return (group,) + match.span(group)
+            continue
+        # 与分支表达式一致：取位置最靠前的字面量，位置相同时取排在前面的
+        best = None
+        for literal, _ in literals:
+            start = lowered.find(literal)
+            if start >= 0 and (best is None or start < best[0]):
+                best = (start, start + len(literal))
+        if best is not None:
+            return (group,) + best
+    return None
+
+
+def _subject_fallback(text: str) -> Optional[Tuple[str, Tuple[int, int]]]:
+    match = _SUBJECT_FALLBACK.search(text)
+    if match:
+        for index, group in enumerate(match.groups(), 1):
+            if group is not None and group.strip():
+                return group.strip(), match.span(index)
+    return None
+
+
+def extract_entities(text: str, kinds: Optional[Iterable[str]] = None) -> Dict[str, Entity]:
+    """
+    抽取订单号、城市、数据路径、学习主题等实体
+
+    每类实体的规则各自预编译，按优先级逐条搜索，命中即停止。
+
+    Args:
+        text (str): 用户输入
+        kinds (Optional[Iterable[str]]): 需要抽取的实体类型，默认全部
+
+    Returns:
+        Dict[str, Entity]: 实体类型 -> 实体
+    """
+    tracer = instrumentation.tracer
+    if tracer is None:
+        return _extract_entities(text, kinds)
+    with tracer.start("entities.extract"):
+        return _extract_entities(text, kinds)
+
+
+def _extract_entities(text: str, kinds: Optional[Iterable[str]]) -> Dict[str, Entity]:
+    kinds = ENTITY_KINDS if kinds is None else tuple(sorted(set(kinds), key=ENTITY_KINDS.index))
+    lowered = _lower(text)
+    entities = {}
+    for kind in kinds:
+        hit = _search(kind, lowered)
+        if hit is not None:
+            group, start, end = hit
+            entities[kind] = Entity(kind, _value(text, group, start, end), (start, end))
+
+    if "subject" in kinds and "subject" not in entities:
+        fallback = _subject_fallback(text)
+        if fallback:
+            entities["subject"] = Entity("subject", *fallback)
+
+    return entities
+
+
+def extract_entity(text: str, kind: str) -> Optional[str]:
+    """
+    抽取单一类型的实体值
+
+    Args:
+        text (str): 用户输入
+        kind (str): 实体类型
+
+    Returns:
+        Optional[str]: 实体值，未命中时返回 None
+    """
+    tracer = instrumentation.tracer
+    if tracer is None:
+        return _extract_entity(text, kind)
+    with tracer.start("entities.extract"):
+        return _extract_entity(text, kind)
+
+
+def _extract_entity(text: str, kind: str) -> Optional[str]:
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        lowered = _lower_keep_length(text)
+    for pattern, group, literals in _KIND_LEVELS[kind]:
+        if literals is None:
+            match = pattern.search(lowered)
+            if match is not None:
+                group = match.lastgroup
+                start, end = match.span(group)
+                return _value(text, group, start, end)
+        else:
+            # 只需判断是否命中，字面量分组的值与位置无关
+            for literal, value in literals:
+                if literal in lowered:
+                    return value
+    if kind == "subject":
+        fallback = _subject_fallback(text)
+        return fallback[0] if fallback else None
+    return None
\ No newline at end of file
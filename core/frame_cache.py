@@ -0,0 +1,169 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class CachedFrame:
+    """
+    缓存的已解析数据及其派生统计结果
+    """
+
+    __slots__ = ("key", "frame", "nbytes", "_memo", "_lock")
+
+    def __init__(self, key: Hashable, frame: Any, nbytes: int):
+        """
+        初始化缓存条目
+
+        Args:
+            key (Hashable): 缓存键
+            frame (Any): 已解析的数据（如 pandas.DataFrame）
+            nbytes (int): 数据占用的内存字节数
+        """
+        self.key = key
+        self.frame = frame
+        self.nbytes = nbytes
+        self._memo: Dict[Hashable, Any] = {}
+        # 派生结果可能依赖其他派生结果，使用可重入锁
+        self._lock = threading.RLock()
+
+    def memo(self, name: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        获取派生结果，首次访问时计算并缓存
+
+        Args:
+            name (Hashable): 结果名称，如 "describe"
+            compute (Callable[[], Any]): 计算函数
+
+        Returns:
+            Any: 派生结果
+        """
+        try:
+            return self._memo[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._memo:
+                self._memo[name] = compute()
+            return self._memo[name]
+
+
+def file_signature(path: str) -> Tuple[str, int, int]:
+    """
+    生成文件签名 (绝对路径, 修改时间, 文件大小)，文件变化后签名随之变化
+
+    Args:
+        path (str): 文件路径
+
+    Returns:
+        Tuple[str, int, int]: 文件签名
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+class FrameCache:
+    """
+    按内存预算淘汰的 LRU 数据缓存，键为文件签名，文件修改后自动失效
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        """
+        初始化数据缓存
+
+        Args:
+            max_bytes (int): 缓存数据占用内存的上限（字节）
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[Hashable, CachedFrame]" = OrderedDict()
+        # 每个文件路径当前缓存的签名，用于在文件变化时淘汰旧版本
+        self._paths: Dict[str, Hashable] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CachedFrame]:
+        """
+        查询缓存
+
+        Args:
+            key (Hashable): 缓存键
+
+        Returns:
+            Optional[CachedFrame]: 缓存条目，未命中时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def load(self, path: str, loader: Callable[[str], Any], sizeof: Callable[[Any], int],
+             variant: Hashable = None) -> CachedFrame:
+        """
+        读取文件，文件未变化时直接返回缓存的解析结果
+
+        Args:
+            path (str): 文件路径
+            loader (Callable[[str], Any]): 解析函数
+            sizeof (Callable[[Any], int]): 计算解析结果占用内存的函数
+            variant (Hashable): 同一文件的不同读取方式（如只读取部分列）
+
+        Returns:
+            CachedFrame: 缓存条目
+        """
+        signature = file_signature(path)
+        key = (signature, variant)
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        frame = loader(path)
+        entry = CachedFrame(key, frame, sizeof(frame))
+        self.put(entry)
+        return entry
+
+    def put(self, entry: CachedFrame) -> None:
+        """
+        写入缓存条目，并按内存预算淘汰最久未使用的条目
+
+        Args:
+            entry (CachedFrame): 缓存条目
+        """
+        (path, _, _), variant = entry.key
+        with self._lock:
+            # 同一路径的旧签名条目已失效
+            stale = self._paths.get((path, variant))
+            if stale is not None and stale != entry.key:
+                self._remove(stale)
+            if entry.key in self._entries:
+                self._remove(entry.key)
+            if entry.nbytes > self.max_bytes:
+                # 超出整个预算的数据不缓存
+                return
+            self._entries[entry.key] = entry
+            self._paths[(path, variant)] = entry.key
+            self.total_bytes += entry.nbytes
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.nbytes
+        (path, _, _), variant = key
+        if self._paths.get((path, variant)) == key:
+            del self._paths[(path, variant)]
+
+    def clear(self) -> None:
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
+            self.total_bytes = 0
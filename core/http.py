@@ -0,0 +1,61 @@
+import threading
+from typing import Dict, Tuple
+from core.lazy import lazy_import
+
+# requests / urllib3 在首次创建会话时才导入
+requests = lazy_import("requests")
+
+
+_sessions: Dict[Tuple[int, int, float], "requests.Session"] = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(pool_size: int = 10, retries: int = 2, backoff_factor: float = 0.2) -> "requests.Session":
+    """
+    创建带连接池和重试策略的 HTTP 会话
+
+    Args:
+        pool_size (int): 每个主机保持的最大连接数
+        retries (int): 连接失败或 5xx/429 时的重试次数（仅幂等请求）
+        backoff_factor (float): 重试退避系数
+
+    Returns:
+        requests.Session: HTTP 会话
+    """
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def shared_session(pool_size: int = 10, retries: int = 2, backoff_factor: float = 0.2) -> "requests.Session":
+    """
+    获取进程内共享的 HTTP 会话，相同参数复用同一个连接池，避免每次请求重新握手
+
+    Args:
+        pool_size (int): 每个主机保持的最大连接数
+        retries (int): 重试次数
+        backoff_factor (float): 重试退避系数
+
+    Returns:
+        requests.Session: HTTP 会话
+    """
+    key = (pool_size, retries, backoff_factor)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = create_session(pool_size, retries, backoff_factor)
+    return session
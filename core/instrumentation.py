@@ -0,0 +1,663 @@
+import contextvars
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# 热路径埋点默认关闭：埋点处只读取模块变量 tracer，为 None 时直接执行原逻辑，不创建任何对象。
+# enable() 之后每个 span 记录单调时钟的起止时间，结束时更新按 (span 名称, 标签) 聚合的计数器和延迟直方图，
+# 并交给各个导出器
+
+# Prometheus 直方图的桶上界（秒）
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Prometheus 摘要和 JSON 快照中输出的分位
+QUANTILES = (0.5, 0.95, 0.99)
+
+_span_ids = itertools.count(1)
+
+
+class Histogram:
+    """
+    HDR 风格的对数线性直方图：每个 2 的幂区间均分为 2^(bits-1) 个桶，记录的值与所在桶的上下界
+    相差不超过 1/2^(bits-1)（bits=8 时约 0.8%），桶按需增加，内存与记录数量无关
+    """
+
+    def __init__(self, bits: int = 8):
+        """
+        初始化直方图
+
+        Args:
+            bits (int): 精度位数，小于 2^bits 的值精确记录
+        """
+        self.bits = bits
+        self._half = 1 << (bits - 1)
+        self._linear = 1 << bits
+        self.counts: List[int] = []
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        shift = max(0, value.bit_length() - self.bits)
+        return (shift << (self.bits - 1)) + (value >> shift)
+
+    def bounds(self, index: int) -> Tuple[int, int]:
+        """
+        桶内可能出现的最小值和最大值
+
+        Args:
+            index (int): 桶序号
+
+        Returns:
+            Tuple[int, int]: (最小值, 最大值)
+        """
+        if index < self._linear:
+            return index, index
+        shift = index // self._half - 1
+        mantissa = index - shift * self._half
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        """
+        记录一个值
+
+        Args:
+            value (int): 非负整数（如纳秒）
+        """
+        if value < 0:
+            value = 0
+        # 与 _index 相同，内联以减少热路径上的函数调用
+        shift = value.bit_length() - self.bits
+        index = value if shift <= 0 else (shift << (self.bits - 1)) + (value >> shift)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        if value > self.max:
+            self.max = value
+        if value < self.min or not self.count:
+            self.min = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "Histogram") -> None:
+        """
+        合并另一个精度相同的直方图
+
+        Args:
+            other (Histogram): 另一个直方图
+        """
+        if other.bits != self.bits:
+            raise ValueError("直方图精度不同，无法合并")
+        if not other.count:
+            return
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.min = min(self.min, other.min) if self.count else other.min
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def buckets(self) -> Iterator[Tuple[int, int]]:
+        """
+        按值从小到大遍历非空的桶
+
+        Returns:
+            Iterator[Tuple[int, int]]: (桶内最大值, 数量)
+        """
+        for index, count in enumerate(self.counts):
+            if count:
+                yield self.bounds(index)[1], count
+
+    def percentile(self, fraction: float) -> int:
+        """
+        分位数（最近秩法），返回所在桶的上界，不超过记录过的最大值
+
+        Args:
+            fraction (float): 分位（0~1）
+
+        Returns:
+            int: 分位数，没有记录时为 0
+        """
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return max(self.min, min(self.bounds(index)[1], self.max))
+        return self.max
+
+    def count_at_or_below(self, value: int) -> int:
+        """
+        不超过 value 的记录数量；桶跨过 value 时整个桶计入，误差不超过桶宽
+
+        Args:
+            value (int): 上界
+
+        Returns:
+            int: 记录数量
+        """
+        end = min(len(self.counts), self._index(max(0, value)) + 1)
+        return sum(self.counts[:end])
+
+
+class SpanStats:
+    """
+    同一 (span 名称, 标签) 的聚合指标：调用次数、出错次数和耗时（纳秒）直方图
+    """
+    __slots__ = ("calls", "errors", "histogram")
+
+    def __init__(self, bits: int = 8):
+        self.calls = 0
+        self.errors = 0
+        self.histogram = Histogram(bits)
+
+
+class Metrics:
+    """
+    按 (span 名称, 标签) 聚合的计数器和延迟直方图，线程安全
+    """
+
+    def __init__(self, bits: int = 8):
+        """
+        初始化指标
+
+        Args:
+            bits (int): 直方图精度位数
+        """
+        self.bits = bits
+        self.stats: Dict[Tuple[str, Optional[str]], SpanStats] = {}
+        self.lock = threading.Lock()
+
+    def record(self, name: str, label: Optional[str], duration_ns: int, error: bool = False) -> None:
+        """
+        记录一次调用
+
+        Args:
+            name (str): span 名称
+            label (Optional[str]): 标签（工具名、Agent 类名等）
+            duration_ns (int): 耗时（纳秒）
+            error (bool): 是否出错
+        """
+        key = (name, label)
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = SpanStats(self.bits)
+            stats.calls += 1
+            if error:
+                stats.errors += 1
+            stats.histogram.record(duration_ns)
+
+    def get(self, name: str, label: Optional[str] = None) -> Optional[SpanStats]:
+        """
+        某个 (span 名称, 标签) 的聚合指标
+
+        Args:
+            name (str): span 名称
+            label (Optional[str]): 标签
+
+        Returns:
+            Optional[SpanStats]: 聚合指标，没有记录时返回 None
+        """
+        return self.stats.get((name, label))
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        指标快照，耗时单位为毫秒
+
+        Returns:
+            List[Dict[str, Any]]: 每个 (span 名称, 标签) 一项
+        """
+        with self.lock:
+            items = [(name, label, stats.calls, stats.errors, _copy(stats.histogram))
+                     for (name, label), stats in self.stats.items()]
+        result = []
+        for name, label, calls, errors, histogram in items:
+            entry = {"name": name, "label": label, "calls": calls, "errors": errors,
+                     "mean_ms": histogram.total / histogram.count / 1e6 if histogram.count else 0.0,
+                     "max_ms": histogram.max / 1e6}
+            for fraction in QUANTILES:
+                entry[f"p{round(fraction * 100)}_ms"] = histogram.percentile(fraction) / 1e6
+            result.append(entry)
+        return result
+
+    def clear(self) -> None:
+        """
+        清空指标
+        """
+        with self.lock:
+            self.stats.clear()
+
+
+def _copy(histogram: Histogram) -> Histogram:
+    copied = Histogram(histogram.bits)
+    copied.merge(histogram)
+    return copied
+
+
+class Span:
+    """
+    一次计时：名称、标签、父子关系和单调时钟的起止时间（纳秒）；
+    可用作上下文管理器，离开时结束并记录异常类型
+    """
+    __slots__ = ("tracer", "name", "label", "span_id", "parent_id", "trace_id", "start_ns", "end_ns", "error",
+                 "attributes", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, label: Optional[str], parent: Optional["Span"],
+                 activate: bool = True):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = next(_span_ids)
+        if parent is None:
+            self.label = label
+            self.parent_id = None
+            self.trace_id = self.span_id
+        else:
+            # 未指定标签时沿用父 span 的标签，如模板渲染归属于调用它的工具
+            self.label = parent.label if label is None else label
+            self.parent_id = parent.span_id
+            self.trace_id = parent.trace_id
+        self.error: Optional[str] = None
+        self.attributes: Optional[Dict[str, Any]] = None
+        self.end_ns: Optional[int] = None
+        self._token = current_span.set(self) if activate else None
+        self.start_ns = time.perf_counter_ns()
+
+    @property
+    def duration_ns(self) -> int:
+        """
+        耗时（纳秒），尚未结束时为到目前为止的耗时
+        """
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        设置附加属性
+
+        Args:
+            key (str): 属性名
+            value (Any): 属性值，需可序列化为 JSON
+        """
+        if self.attributes is None:
+            self.attributes = {}
+        self.attributes[key] = value
+
+    def end(self, error: Optional[str] = None) -> None:
+        """
+        结束计时并交给 Tracer 记录，重复调用无效
+
+        Args:
+            error (Optional[str]): 出错时的异常类型名
+        """
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.perf_counter_ns()
+        if error is not None:
+            self.error = error
+        if self._token is not None:
+            try:
+                current_span.reset(self._token)
+            except ValueError:
+                # 在其他上下文中结束（如生成器被另一个线程关闭），此时不恢复父 span
+                pass
+        self.tracer.finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为字典
+
+        Returns:
+            Dict[str, Any]: span 的各项字段
+        """
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "label": self.label,
+            "start_ns": self.start_ns,
+            "duration_ns": self.duration_ns,
+            "error": self.error,
+            "attributes": self.attributes or {},
+        }
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        # 提前关闭的生成器（如被截断的流式输出）不算出错
+        failed = exc_type is not None and not issubclass(exc_type, GeneratorExit)
+        self.end(exc_type.__name__ if failed else None)
+        return False
+
+
+class _NoopSpan:
+    """
+    未启用埋点时 span() 返回的共享空对象
+    """
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def end(self, error: Optional[str] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+# 当前上下文中尚未结束的 span，随 asyncio 任务和复制的上下文一起传递，作为新 span 的父 span
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Exporter(ABC):
+    """
+    导出器基类：接收结束的 span，以及 flush 时的聚合指标
+    """
+
+    @abstractmethod
+    def export_span(self, span: Span) -> None:
+        """
+        导出一个结束的 span，在结束 span 的线程中同步调用，实现应尽量轻量
+
+        Args:
+            span (Span): 结束的 span
+        """
+        pass
+
+    def export_metrics(self, metrics: Metrics) -> None:
+        """
+        导出聚合指标，默认忽略
+
+        Args:
+            metrics (Metrics): 聚合指标
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        释放资源
+        """
+        pass
+
+
+class InMemoryExporter(Exporter):
+    """
+    内存导出器：保留最近的 span 和最近一次导出的指标快照，用于测试和调试
+    """
+
+    def __init__(self, max_spans: int = 10000):
+        """
+        初始化内存导出器
+
+        Args:
+            max_spans (int): 最多保留的 span 数量
+        """
+        self.spans: deque = deque(maxlen=max_spans)
+        self.metrics: List[Dict[str, Any]] = []
+
+    def export_span(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def export_metrics(self, metrics: Metrics) -> None:
+        self.metrics = metrics.snapshot()
+
+    def find(self, name: str, label: Optional[str] = None) -> List[Span]:
+        """
+        按名称（和标签）查找 span
+
+        Args:
+            name (str): span 名称
+            label (Optional[str]): 标签，None 表示不限
+
+        Returns:
+            List[Span]: 按结束顺序排列的 span
+        """
+        return [span for span in list(self.spans) if span.name == name and (label is None or span.label == label)]
+
+    def clear(self) -> None:
+        """
+        清空已保留的 span 和指标
+        """
+        self.spans.clear()
+        self.metrics = []
+
+
+class JsonLinesExporter(Exporter):
+    """
+    JSON Lines 导出器：每个 span 一行 {"type": "span", ...}，flush 时追加一行 {"type": "metrics", ...}
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化 JSON Lines 导出器
+
+        Args:
+            path (str): 输出文件路径，追加写入
+        """
+        self.path = path
+        self._file: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+
+    def _write(self, record: Dict[str, Any], flush: bool = False) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            if flush:
+                self._file.flush()
+
+    def export_span(self, span: Span) -> None:
+        self._write({"type": "span", **span.to_dict()})
+
+    def export_metrics(self, metrics: Metrics) -> None:
+        self._write({"type": "metrics", "timestamp": time.time(), "metrics": metrics.snapshot()}, flush=True)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus(metrics: Metrics, prefix: str = "agent", buckets: Sequence[float] = DEFAULT_BUCKETS) -> str:
+    """
+    按 Prometheus 文本格式输出指标：调用和出错计数器、耗时直方图（固定桶），以及由 HDR 直方图计算的分位数摘要
+
+    Args:
+        metrics (Metrics): 聚合指标
+        prefix (str): 指标名前缀
+        buckets (Sequence[float]): 直方图的桶上界（秒）
+
+    Returns:
+        str: 文本格式的指标
+    """
+    with metrics.lock:
+        items = sorted(((name, label or "", stats.calls, stats.errors, _copy(stats.histogram))
+                        for (name, label), stats in metrics.stats.items()))
+    calls = [f"# HELP {prefix}_span_calls_total 调用次数", f"# TYPE {prefix}_span_calls_total counter"]
+    errors = [f"# HELP {prefix}_span_errors_total 抛出异常的次数", f"# TYPE {prefix}_span_errors_total counter"]
+    histogram = [f"# HELP {prefix}_span_duration_seconds 耗时", f"# TYPE {prefix}_span_duration_seconds histogram"]
+    summary = [f"# HELP {prefix}_span_latency_seconds 耗时分位数", f"# TYPE {prefix}_span_latency_seconds summary"]
+    for name, label, call_count, error_count, hist in items:
+        labels = f'span="{_escape(name)}",label="{_escape(label)}"'
+        calls.append(f"{prefix}_span_calls_total{{{labels}}} {call_count}")
+        errors.append(f"{prefix}_span_errors_total{{{labels}}} {error_count}")
+        for bound in buckets:
+            count = hist.count_at_or_below(int(bound * 1e9))
+            histogram.append(f'{prefix}_span_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        histogram.append(f'{prefix}_span_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+        histogram.append(f"{prefix}_span_duration_seconds_sum{{{labels}}} {hist.total / 1e9}")
+        histogram.append(f"{prefix}_span_duration_seconds_count{{{labels}}} {hist.count}")
+        for fraction in QUANTILES:
+            summary.append(f'{prefix}_span_latency_seconds{{{labels},quantile="{fraction}"}} '
+                           f"{hist.percentile(fraction) / 1e9}")
+        summary.append(f"{prefix}_span_latency_seconds_sum{{{labels}}} {hist.total / 1e9}")
+        summary.append(f"{prefix}_span_latency_seconds_count{{{labels}}} {hist.count}")
+    return "\n".join(calls + errors + histogram + summary) + "\n"
+
+
+class PrometheusExporter(Exporter):
+    """
+    Prometheus 文本格式导出器：flush 时渲染聚合指标，可写入文件供 node_exporter 的 textfile 收集器读取
+    """
+
+    def __init__(self, path: Optional[str] = None, prefix: str = "agent", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        初始化 Prometheus 导出器
+
+        Args:
+            path (Optional[str]): 输出文件路径，None 表示只保留在 text 属性中
+            prefix (str): 指标名前缀
+            buckets (Sequence[float]): 直方图的桶上界（秒）
+        """
+        self.path = path
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.text = ""
+
+    def export_span(self, span: Span) -> None:
+        # 指标由 Tracer 聚合，单个 span 无需处理
+        pass
+
+    def export_metrics(self, metrics: Metrics) -> None:
+        self.text = render_prometheus(metrics, self.prefix, self.buckets)
+        if self.path is not None:
+            # 先写临时文件再替换，读取方不会读到写了一半的文件
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(self.text)
+            os.replace(self.path + ".tmp", self.path)
+
+
+class Tracer:
+    """
+    创建 span，span 结束时更新聚合指标并交给导出器
+    """
+
+    def __init__(self, exporters: Iterable[Exporter] = (), bits: int = 8):
+        """
+        初始化 Tracer
+
+        Args:
+            exporters (Iterable[Exporter]): 导出器
+            bits (int): 延迟直方图的精度位数
+        """
+        self.exporters: List[Exporter] = list(exporters)
+        self.metrics = Metrics(bits)
+
+    def start(self, name: str, label: Optional[str] = None, activate: bool = True) -> Span:
+        """
+        开始一个 span
+
+        Args:
+            name (str): span 名称，如 tool.execute
+            label (Optional[str]): 标签，如工具名；None 表示沿用父 span 的标签
+            activate (bool): 是否设为当前上下文的父 span；跨越多次 yield 的 span（如流式输出）应为 False，
+                否则生成器挂起期间调用方新建的 span 会挂在它下面
+
+        Returns:
+            Span: 新的 span，用 with 语句或 end() 结束
+        """
+        return Span(self, name, label, current_span.get(), activate)
+
+    def finish(self, span: Span) -> None:
+        """
+        记录结束的 span，由 Span.end 调用
+
+        Args:
+            span (Span): 结束的 span
+        """
+        self.metrics.record(span.name, span.label, span.end_ns - span.start_ns, span.error is not None)
+        for exporter in self.exporters:
+            exporter.export_span(span)
+
+    def flush(self) -> None:
+        """
+        把当前的聚合指标交给各个导出器
+        """
+        for exporter in self.exporters:
+            exporter.export_metrics(self.metrics)
+
+    def close(self) -> None:
+        """
+        导出最后一次指标并关闭导出器
+        """
+        self.flush()
+        for exporter in self.exporters:
+            exporter.close()
+
+
+# 当前启用的 Tracer，None 表示关闭埋点；热路径上只读取这一个变量
+tracer: Optional[Tracer] = None
+
+
+def enable(exporters: Iterable[Exporter] = (), bits: int = 8) -> Tracer:
+    """
+    启用埋点，替换并关闭已启用的 Tracer
+
+    Args:
+        exporters (Iterable[Exporter]): 导出器
+        bits (int): 延迟直方图的精度位数
+
+    Returns:
+        Tracer: 新启用的 Tracer
+    """
+    global tracer
+    previous, tracer = tracer, Tracer(exporters, bits)
+    if previous is not None:
+        previous.close()
+    return tracer
+
+
+def disable() -> None:
+    """
+    关闭埋点，导出最后一次指标并关闭导出器
+    """
+    global tracer
+    previous, tracer = tracer, None
+    if previous is not None:
+        previous.close()
+
+
+def span(name: str, label: Optional[str] = None):
+    """
+    开始一个 span；未启用埋点时返回共享的空对象，不分配内存。
+    调用频繁的热路径应直接判断 tracer 是否为 None，省去函数调用
+
+    Args:
+        name (str): span 名称
+        label (Optional[str]): 标签，None 表示沿用父 span 的标签
+
+    Returns:
+        Span 或空对象，均可用作上下文管理器
+    """
+    active = tracer
+    if active is None:
+        return NOOP_SPAN
+    return active.start(name, label)
\ No newline at end of file
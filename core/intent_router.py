@@ -0,0 +1,182 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class RouteResult:
+    """
+    一次意图识别的结果，记录每个命中意图的关键词位置
+    """
+
+    def __init__(self, text: str, spans: Dict[str, List[Tuple[int, int]]], priorities: Dict[str, int]):
+        """
+        初始化识别结果
+
+        Args:
+            text (str): 原始输入
+            spans (Dict[str, List[Tuple[int, int]]]): 意图全名 -> 命中关键词的 (起始, 结束) 位置
+            priorities (Dict[str, int]): 意图全名 -> 注册顺序（越小越优先）
+        """
+        self.text = text
+        self.spans = spans
+        self._priorities = priorities
+
+    def __bool__(self) -> bool:
+        return bool(self.spans)
+
+    def intents(self, namespace: Optional[str] = None) -> List[str]:
+        """
+        按优先级列出命中的意图
+
+        Args:
+            namespace (Optional[str]): 只列出该命名空间下的意图，返回不带命名空间前缀的名称
+
+        Returns:
+            List[str]: 意图名称列表
+        """
+        names = sorted(self.spans, key=self._priorities.__getitem__)
+        if namespace is None:
+            return names
+        prefix = namespace + "."
+        return [name[len(prefix):] for name in names if name.startswith(prefix)]
+
+    def best(self, namespace: str) -> Optional[str]:
+        """
+        获取某个命名空间下优先级最高的意图
+
+        Args:
+            namespace (str): 命名空间（通常是 Agent 名称）
+
+        Returns:
+            Optional[str]: 意图名称，未命中时返回 None
+        """
+        intents = self.intents(namespace)
+        return intents[0] if intents else None
+
+    def coverage(self, namespace: str) -> int:
+        """
+        某个命名空间下所有命中关键词覆盖的字符数，重叠部分只计一次，用于比较各 Agent 的相关程度
+
+        Args:
+            namespace (str): 命名空间
+
+        Returns:
+            int: 覆盖的字符数，未命中时为 0
+        """
+        prefix = namespace + "."
+        spans = sorted(span for name, items in self.spans.items() if name.startswith(prefix) for span in items)
+        covered, end = 0, 0
+        for start, stop in spans:
+            if stop > end:
+                covered += stop - max(start, end)
+                end = stop
+        return covered
+
+    def matched(self, namespace: str, intent: str) -> List[str]:
+        """
+        获取命中某个意图的关键词原文
+
+        Args:
+            namespace (str): 命名空间
+            intent (str): 意图名称
+
+        Returns:
+            List[str]: 命中的关键词原文
+        """
+        return [self.text[start:end] for start, end in self.spans.get(f"{namespace}.{intent}", [])]
+
+
+class IntentRouter:
+    """
+    意图路由器，将所有 Agent 的关键词表编译为一个正则表达式，单次扫描完成分类
+
+    关键词按长度降序组成一个分支表达式；每次命中后从下一个字符继续搜索，
+    并把命中关键词的前缀关键词一并计入，因此结果与逐个关键词做子串判断一致。
+    """
+
+    def __init__(self):
+        """
+        初始化意图路由器
+        """
+        self._tables: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
+        self._compiled = None
+
+    def register(self, namespace: str, table: Dict[str, Iterable[str]]) -> None:
+        """
+        注册（或替换）一个命名空间的关键词表
+
+        Args:
+            namespace (str): 命名空间（通常是 Agent 名称）
+            table (Dict[str, Iterable[str]]): 意图名称 -> 关键词列表，按优先级排列
+        """
+        normalized = {intent: tuple(keyword.lower() for keyword in keywords) for intent, keywords in table.items()}
+        with self._lock:
+            if self._tables.get(namespace) == normalized:
+                return
+            self._tables[namespace] = normalized
+            self._compiled = None
+
+    def _compile(self):
+        with self._lock:
+            if self._compiled is not None:
+                return self._compiled
+
+            priorities: Dict[str, int] = {}
+            # 关键词 -> 命中的意图全名
+            keyword_intents: Dict[str, List[str]] = {}
+            for namespace, table in self._tables.items():
+                for intent, keywords in table.items():
+                    name = f"{namespace}.{intent}"
+                    priorities[name] = len(priorities)
+                    for keyword in keywords:
+                        intents = keyword_intents.setdefault(keyword, [])
+                        if name not in intents:
+                            intents.append(name)
+
+            # 命中较长关键词时，同一位置开始的较短关键词也必然命中；
+            # 按关键词在表达式中的分组序号（从 1 开始）存放，命中后通过 lastindex 取回
+            keywords = sorted(keyword_intents, key=len, reverse=True)
+            expansions: List[List[Tuple[int, List[str]]]] = [[]]
+            for keyword in keywords:
+                expansions.append([
+                    (len(prefix), intents)
+                    for prefix, intents in keyword_intents.items()
+                    if keyword.startswith(prefix)
+                ])
+
+            # 在小写化后的文本上匹配，与逐个关键词在 user_input.lower() 中做子串判断一致
+            pattern = re.compile("|".join(f"({re.escape(keyword)})" for keyword in keywords)) if keywords else None
+            self._compiled = (pattern, expansions, priorities)
+            return self._compiled
+
+    def route(self, text: str) -> RouteResult:
+        """
+        对输入做单次扫描，返回所有命中的意图及位置
+
+        Args:
+            text (str): 用户输入
+
+        Returns:
+            RouteResult: 识别结果
+        """
+        pattern, expansions, priorities = self._compiled or self._compile()
+        spans: Dict[str, List[Tuple[int, int]]] = {}
+        if pattern is None:
+            return RouteResult(text, spans, priorities)
+
+        lowered = text.lower()
+        search = pattern.search
+        match = search(lowered)
+        while match is not None:
+            start = match.start()
+            for length, intents in expansions[match.lastindex]:
+                for name in intents:
+                    spans.setdefault(name, []).append((start, start + length))
+            match = search(lowered, start + 1)
+        # 少数字符小写后长度会变化，此时位置对应小写化后的文本
+        return RouteResult(text if len(lowered) == len(text) else lowered, spans, priorities)
+
+
+# 所有 Agent 共享的路由器
+default_router = IntentRouter()
\ No newline at end of file
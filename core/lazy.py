@@ -0,0 +1,52 @@
+import importlib
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule:
+    """
+    延迟导入的模块代理：首次访问属性时才导入真正的模块
+
+    用于 pandas、matplotlib、requests 等导入耗时较长的依赖，只使用其他功能的进程不必承担导入开销。
+    导入由 importlib 的模块锁保护，多个线程同时首次访问时只导入一次
+    """
+
+    def __init__(self, name: str):
+        """
+        初始化模块代理
+
+        Args:
+            name (str): 模块名，如 "pandas"
+        """
+        self._name = name
+        self._module = None
+
+    def _load(self) -> ModuleType:
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        # 只有代理自身没有的属性才会走到这里
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> Any:
+    """
+    返回延迟导入的模块代理
+
+    Args:
+        name (str): 模块名
+
+    Returns:
+        Any: 模块代理，用法与模块相同
+    """
+    return LazyModule(name)
@@ -0,0 +1,382 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+from core.config import Config
+from core.http import shared_session
+from core.lazy import lazy_import
+
+# requests 在首次调用大模型时才导入
+requests = lazy_import("requests")
+
+
+# 通义千问（DashScope）的 OpenAI 兼容接口地址
+DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+
+
+class LLMError(RuntimeError):
+    """
+    调用大模型接口失败：网络错误、HTTP 错误或响应格式不正确
+    """
+
+
+class LLMCall(NamedTuple):
+    """
+    一次 HTTP 调用的记录，合并发送的多个提示词共用一次调用
+    """
+    model: str
+    # 请求耗时（秒），不包括排队等待合并的时间
+    latency: float
+    prompt_tokens: int
+    completion_tokens: int
+    batch_size: int
+    ok: bool
+
+
+class LLMResult(NamedTuple):
+    """
+    单个提示词的生成结果
+    """
+    text: str
+    # 从提交到拿到结果的耗时（秒），包括排队等待合并的时间
+    latency: float
+    call: LLMCall
+
+
+class LLMMetrics:
+    """
+    大模型调用指标：累计调用次数、错误次数、token 用量，以及最近若干次调用的记录
+    """
+
+    def __init__(self, history: int = 1024):
+        """
+        初始化指标
+
+        Args:
+            history (int): 保留的最近调用记录数量
+        """
+        self.calls = 0
+        self.errors = 0
+        self.prompts = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.recent: "deque[LLMCall]" = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def record(self, call: LLMCall) -> None:
+        """
+        记录一次调用
+
+        Args:
+            call (LLMCall): 调用记录
+        """
+        with self._lock:
+            self.calls += 1
+            self.errors += not call.ok
+            self.prompts += call.batch_size
+            self.prompt_tokens += call.prompt_tokens
+            self.completion_tokens += call.completion_tokens
+            self.recent.append(call)
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        汇总指标
+
+        Returns:
+            Dict[str, float]: 调用次数、错误次数、提示词数量、token 用量，以及最近调用的延迟分位数（毫秒）
+        """
+        with self._lock:
+            latencies = sorted(call.latency for call in self.recent)
+            result = {
+                "calls": self.calls,
+                "errors": self.errors,
+                "prompts": self.prompts,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+        for name, fraction in (("latency_p50_ms", 0.5), ("latency_p95_ms", 0.95)):
+            result[name] = latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000 if latencies else 0.0
+        return result
+
+
+# 等待合并发送的提示词：(提示词, 选项, 结果, 提交时间)
+_Pending = Tuple[str, Tuple[Optional[str], Optional[int]], Future, float]
+
+
+class LLMClient:
+    """
+    OpenAI 兼容接口的大模型客户端
+
+    请求复用进程内共享的 HTTP 连接池（keep-alive）；max_batch_size 大于 1 时，
+    batch_window 内并发提交的提示词合并为一次 /completions 请求（prompt 为列表），
+    否则每个提示词单独发送 /chat/completions 请求
+    """
+
+    def __init__(self, base_url: str, model: str = "qwen-plus", api_key: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: Optional[int] = None,
+                 timeout: Union[float, Tuple[float, float]] = (3.05, 60), retries: int = 2, pool_size: int = 10,
+                 max_batch_size: int = 1, batch_window: float = 0.005,
+                 session: Optional["requests.Session"] = None):
+        """
+        初始化客户端
+
+        Args:
+            base_url (str): 接口地址，如 DASHSCOPE_BASE_URL 或本地服务的 http://127.0.0.1:8000/v1
+            model (str): 模型名称
+            api_key (Optional[str]): API Key
+            temperature (float): 采样温度
+            max_tokens (Optional[int]): 默认的最大生成 token 数
+            timeout (Union[float, Tuple[float, float]]): 请求超时（连接超时, 读取超时）
+            retries (int): 连接失败时的重试次数（请求未发出，重试是安全的）
+            pool_size (int): 连接池大小，也是同时进行中的请求数上限
+            max_batch_size (int): 合并发送的最大提示词数量，1 表示不合并
+            batch_window (float): 等待更多提示词合并发送的最长时间（秒）
+            session (Optional[requests.Session]): 自定义 HTTP 会话，默认使用进程内共享的连接池
+        """
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = batch_window
+        self._session = session
+        self.metrics = LLMMetrics()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._batcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            self._session = shared_session(self.pool_size, self.retries)
+        return self._session
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="llm")
+        return self._executor
+
+    def chat(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> LLMResult:
+        """
+        发送一次对话请求（不参与合并）
+
+        Args:
+            messages (List[Dict[str, str]]): 对话消息，每条为 {"role": ..., "content": ...}
+            max_tokens (Optional[int]): 最大生成 token 数
+
+        Returns:
+            LLMResult: 生成结果
+        """
+        start = time.perf_counter()
+        data, call = self._post("/chat/completions", {"messages": messages}, max_tokens, 1)
+        try:
+            text = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"响应格式不正确: {e!r}") from e
+        return LLMResult(text, time.perf_counter() - start, call)
+
+    def submit(self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None) -> Future:
+        """
+        提交一个提示词，并发提交的提示词会合并发送
+
+        Args:
+            prompt (str): 提示词
+            system (Optional[str]): 系统提示
+            max_tokens (Optional[int]): 最大生成 token 数
+
+        Returns:
+            Future: 结果为 LLMResult，失败时为 LLMError
+        """
+        if self.max_batch_size == 1:
+            messages = [{"role": "user", "content": prompt}]
+            if system:
+                messages.insert(0, {"role": "system", "content": system})
+            return self._get_executor().submit(self.chat, messages, max_tokens)
+
+        future = Future()
+        self._ensure_batcher()
+        self._pending.put((prompt, (system, max_tokens), future, time.perf_counter()))
+        return future
+
+    def generate(self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None) -> LLMResult:
+        """
+        生成一个提示词的结果（阻塞等待）
+
+        Args:
+            prompt (str): 提示词
+            system (Optional[str]): 系统提示
+            max_tokens (Optional[int]): 最大生成 token 数
+
+        Returns:
+            LLMResult: 生成结果
+        """
+        return self.submit(prompt, system, max_tokens).result()
+
+    def complete(self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        """
+        生成一个提示词的文本结果（阻塞等待）
+
+        Args:
+            prompt (str): 提示词
+            system (Optional[str]): 系统提示
+            max_tokens (Optional[int]): 最大生成 token 数
+
+        Returns:
+            str: 生成的文本
+        """
+        return self.generate(prompt, system, max_tokens).text
+
+    def _ensure_batcher(self) -> None:
+        if self._batcher is None:
+            with self._lock:
+                if self._batcher is None:
+                    self._batcher = threading.Thread(target=self._batch_loop, name="llm-batcher", daemon=True)
+                    self._batcher.start()
+
+    def _batch_loop(self) -> None:
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            # 第一个提示词到达后再等待 batch_window，收集同一时间窗内的其他提示词
+            batch = [item]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # 关闭客户端：发送已收集的提示词后退出
+                    self._pending.put(None)
+                    break
+                batch.append(item)
+            # 系统提示和最大 token 数相同的提示词才能放在同一个请求中
+            groups: Dict[Hashable, List[_Pending]] = {}
+            for pending in batch:
+                groups.setdefault(pending[1], []).append(pending)
+            for group in groups.values():
+                self._get_executor().submit(self._send_batch, group)
+
+    def _send_batch(self, batch: List[_Pending]) -> None:
+        system, max_tokens = batch[0][1]
+        prompts = [f"{system}\n\n{prompt}" if system else prompt for prompt, _, _, _ in batch]
+        try:
+            data, call = self._post("/completions", {"prompt": prompts}, max_tokens, len(batch))
+            texts = [None] * len(batch)
+            for choice in data["choices"]:
+                texts[choice["index"]] = choice["text"]
+            if any(text is None for text in texts):
+                raise LLMError("响应缺少部分提示词的结果")
+        except Exception as e:
+            error = e if isinstance(e, LLMError) else LLMError(f"响应格式不正确: {e!r}")
+            for _, _, future, _ in batch:
+                future.set_exception(error)
+            return
+        now = time.perf_counter()
+        for (_, _, future, submitted), text in zip(batch, texts):
+            future.set_result(LLMResult(text, now - submitted, call))
+
+    def _post(self, path: str, payload: Dict[str, Any], max_tokens: Optional[int],
+              batch_size: int) -> Tuple[Dict[str, Any], LLMCall]:
+        payload = dict(payload, model=self.model, temperature=self.temperature)
+        max_tokens = max_tokens if max_tokens is not None else self.max_tokens
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.base_url + path, json=payload, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.metrics.record(LLMCall(self.model, time.perf_counter() - start, 0, 0, batch_size, False))
+            raise LLMError(f"调用大模型接口失败: {e}") from e
+        usage = data.get("usage") or {}
+        call = LLMCall(self.model, time.perf_counter() - start, usage.get("prompt_tokens", 0),
+                       usage.get("completion_tokens", 0), batch_size, True)
+        self.metrics.record(call)
+        return data, call
+
+    def close(self) -> None:
+        """
+        停止合并线程，等待进行中的请求结束
+        """
+        with self._lock:
+            batcher, self._batcher = self._batcher, None
+            executor, self._executor = self._executor, None
+        if batcher is not None:
+            self._pending.put(None)
+            batcher.join()
+            # 取出关闭标记，之后提交的提示词会重新启动合并线程
+            self._pending = queue.Queue()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# 进程内共享的客户端：相同配置的 Agent 共用连接池和合并队列
+_clients: Dict[Hashable, LLMClient] = {}
+_clients_lock = threading.Lock()
+
+
+def client_from_config(config: Config) -> Optional[LLMClient]:
+    """
+    根据配置获取进程内共享的大模型客户端
+
+    配置项：llm_base_url（为空时不使用大模型）、llm_api_key、model、temperature、
+    llm_max_tokens、llm_timeout、llm_retries、llm_pool_size、llm_batch_size、llm_batch_window
+
+    Args:
+        config (Config): 配置对象
+
+    Returns:
+        Optional[LLMClient]: 客户端，未配置 llm_base_url 时返回 None
+    """
+    base_url = config.get("llm_base_url")
+    if not base_url:
+        return None
+    timeout = config.get("llm_timeout", (3.05, 60))
+    options = {
+        "model": config.get("model", "qwen-plus"),
+        "api_key": config.get("llm_api_key"),
+        "temperature": config.get("temperature", 0.7),
+        "max_tokens": config.get("llm_max_tokens"),
+        # 从 JSON 读取的超时可能是列表，转为元组以便作为共享键
+        "timeout": tuple(timeout) if isinstance(timeout, list) else timeout,
+        "retries": config.get("llm_retries", 2),
+        "pool_size": config.get("llm_pool_size", 10),
+        "max_batch_size": config.get("llm_batch_size", 1),
+        "batch_window": config.get("llm_batch_window", 0.005),
+    }
+    key = (base_url, tuple(sorted(options.items())))
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = LLMClient(base_url, **options)
+    return client
+
+
+def close_clients() -> None:
+    """
+    关闭并清空进程内共享的客户端
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
\ No newline at end of file
@@ -0,0 +1,219 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Message:
+    """
+    对话消息记录
+    """
+
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role: str, content: str, timestamp: float):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"role": self.role, "content": self.content}
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content!r})"
+
+
+class RingBuffer:
+    """
+    固定容量的环形缓冲区，写满后覆盖最旧的元素
+    """
+
+    __slots__ = ("_items", "_start", "_size")
+
+    def __init__(self, capacity: int):
+        """
+        初始化环形缓冲区
+
+        Args:
+            capacity (int): 容量
+        """
+        if capacity <= 0:
+            raise ValueError("容量必须大于 0")
+        self._items: List[Any] = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._items)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, item: Any) -> None:
+        capacity = len(self._items)
+        if self._size < capacity:
+            self._items[(self._start + self._size) % capacity] = item
+            self._size += 1
+        else:
+            self._items[self._start] = item
+            self._start = (self._start + 1) % capacity
+
+    def __iter__(self) -> Iterator[Any]:
+        capacity = len(self._items)
+        for i in range(self._size):
+            yield self._items[(self._start + i) % capacity]
+
+    def __reversed__(self) -> Iterator[Any]:
+        capacity = len(self._items)
+        for i in range(self._size - 1, -1, -1):
+            yield self._items[(self._start + i) % capacity]
+
+    def last(self) -> Optional[Any]:
+        if not self._size:
+            return None
+        return self._items[(self._start + self._size - 1) % len(self._items)]
+
+
+class Session:
+    """
+    单个会话的状态：有界的消息历史、会话用户，以及每类实体最近一次出现的值
+    """
+
+    __slots__ = ("session_id", "messages", "entities", "user_id", "last_access")
+
+    def __init__(self, session_id: str, capacity: int):
+        """
+        初始化会话
+
+        Args:
+            session_id (str): 会话ID
+            capacity (int): 最多保留的消息数量
+        """
+        self.session_id = session_id
+        self.messages = RingBuffer(capacity)
+        self.entities: Dict[str, Any] = {}
+        # 会话所属用户（来自认证系统），同一 Agent 上的并发会话互不影响
+        self.user_id: Optional[str] = None
+        self.last_access = time.monotonic()
+
+    def add(self, role: str, content: str) -> None:
+        """
+        追加一条消息
+
+        Args:
+            role (str): 角色（user / assistant）
+            content (str): 消息内容
+        """
+        self.messages.append(Message(role, content, time.time()))
+
+    def remember(self, kind: str, value: Any) -> None:
+        """
+        记录某类实体最近一次出现的值
+
+        Args:
+            kind (str): 实体类型，如 city
+            value (Any): 实体值
+        """
+        self.entities[kind] = value
+
+    def recall(self, kind: str) -> Optional[Any]:
+        """
+        获取某类实体最近一次出现的值
+
+        Args:
+            kind (str): 实体类型
+
+        Returns:
+            Optional[Any]: 实体值，没有记录时返回 None
+        """
+        return self.entities.get(kind)
+
+
+class SessionMemory:
+    """
+    按会话ID存储对话状态，超过会话数上限时淘汰最久未使用的会话，闲置超过 TTL 的会话同样被淘汰
+    """
+
+    def __init__(self, capacity: int = 50, max_sessions: int = 10000, ttl: Optional[float] = 3600):
+        """
+        初始化会话存储
+
+        Args:
+            capacity (int): 每个会话最多保留的消息数量
+            max_sessions (int): 最多保留的会话数量
+            ttl (Optional[float]): 会话闲置多少秒后淘汰，None 表示不按时间淘汰
+        """
+        self.capacity = capacity
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # 按最近访问时间排序，最久未使用的在最前面
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.peek(session_id) is not None
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return self.ttl is not None and now - session.last_access > self.ttl
+
+    def get(self, session_id: str) -> Session:
+        """
+        获取会话，不存在时创建，同时淘汰过期与超出上限的会话
+
+        Args:
+            session_id (str): 会话ID
+
+        Returns:
+            Session: 会话
+        """
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or self._expired(session, now):
+                # 闲置超过 TTL 的会话视为已结束，重新开始
+                session = Session(session_id, self.capacity)
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session.last_access = now
+            self._evict(now)
+            return session
+
+    def peek(self, session_id: str) -> Optional[Session]:
+        """
+        获取会话但不创建、不更新访问时间
+
+        Args:
+            session_id (str): 会话ID
+
+        Returns:
+            Optional[Session]: 会话，不存在或已过期时返回 None
+        """
+        session = self._sessions.get(session_id)
+        if session is None or self._expired(session, time.monotonic()):
+            return None
+        return session
+
+    def discard(self, session_id: str) -> None:
+        """
+        删除会话
+
+        Args:
+            session_id (str): 会话ID
+        """
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict(self, now: float) -> None:
+        sessions = self._sessions
+        while len(sessions) > self.max_sessions:
+            sessions.popitem(last=False)
+        if self.ttl is not None:
+            # 队首是最久未访问的会话，遇到未过期的即可停止
+            while sessions:
+                if not self._expired(next(iter(sessions.values())), now):
+                    break
+                sessions.popitem(last=False)
@@ -0,0 +1,177 @@
+"""
+本地的 OpenAI 兼容大模型服务替身，测试和基准测试无需联网
+
+用法（在仓库根目录运行）：
+    python -m core.mock_llm --port 8000 --delay 0.05
+之后将配置项 llm_base_url 设为 http://127.0.0.1:8000/v1
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Tuple
+
+
+_TOKEN = re.compile(r"[一-鿿]|[A-Za-z0-9_]+|[^\sA-Za-z0-9_一-鿿]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    粗略估计 token 数：每个汉字、每个英文单词或数字、每个标点各计一个
+
+    Args:
+        text (str): 文本
+
+    Returns:
+        int: token 数
+    """
+    return len(_TOKEN.findall(text))
+
+
+def echo_responder(prompt: str) -> str:
+    """
+    默认的回复规则：原样返回提示词的最后一行
+
+    Args:
+        prompt (str): 提示词（对话请求为最后一条消息的内容）
+
+    Returns:
+        str: 回复
+    """
+    return "收到：" + prompt.strip().splitlines()[-1] if prompt.strip() else "收到"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 才能保持连接，客户端的 keep-alive 连接池因此可以复用连接
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体分两次写出，关闭 Nagle 算法避免与客户端的延迟确认叠加出约 40ms 的等待
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._send(400, {"error": {"message": "invalid json"}})
+            return
+        if self.path.endswith("/chat/completions"):
+            prompts = [payload["messages"][-1]["content"]]
+            inputs = [message["content"] for message in payload["messages"]]
+        elif self.path.endswith("/completions"):
+            prompts = payload["prompt"] if isinstance(payload["prompt"], list) else [payload["prompt"]]
+            inputs = prompts
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+            return
+
+        owner = self.server.owner
+        with owner.lock:
+            owner.requests.append((self.path, len(prompts)))
+        if owner.delay:
+            time.sleep(owner.delay)
+        texts = [owner.responder(prompt) for prompt in prompts]
+        usage = {"prompt_tokens": sum(map(count_tokens, inputs)), "completion_tokens": sum(map(count_tokens, texts))}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if self.path.endswith("/chat/completions"):
+            choices = [{"index": 0, "message": {"role": "assistant", "content": texts[0]}, "finish_reason": "stop"}]
+            kind = "chat.completion"
+        else:
+            choices = [{"index": i, "text": text, "finish_reason": "stop"} for i, text in enumerate(texts)]
+            kind = "text_completion"
+        self._send(200, {"id": f"mock-{len(owner.requests)}", "object": kind, "model": payload.get("model"),
+                         "choices": choices, "usage": usage})
+
+    def _send(self, status: int, data: dict):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    owner: "MockLLMServer"
+
+
+class MockLLMServer:
+    """
+    本地大模型服务替身，支持 /v1/chat/completions 与 /v1/completions（prompt 可为列表），
+    回复由 responder 生成，可以模拟固定的推理延迟，并记录收到的请求
+    """
+
+    def __init__(self, responder: Optional[Callable[[str], str]] = None, delay: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化服务（调用 start 后开始监听）
+
+        Args:
+            responder (Optional[Callable[[str], str]]): 提示词 -> 回复，默认为 echo_responder
+            delay (float): 每个请求的模拟推理耗时（秒），合并发送的请求也只耗时一次
+            host (str): 监听地址
+            port (int): 监听端口，0 表示随机端口
+        """
+        self.responder = responder or echo_responder
+        self.delay = delay
+        self.requests: List[Tuple[str, int]] = []
+        self.lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.owner = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """
+        客户端使用的接口地址
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        """
+        在后台线程中开始监听
+
+        Returns:
+            MockLLMServer: 服务自身
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """
+        停止服务
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容大模型服务替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0.0, help="每个请求的模拟推理耗时（秒）")
+    args = parser.parse_args()
+    server = MockLLMServer(delay=args.delay, host=args.host, port=args.port)
+    print(f"mock LLM 服务已启动: {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
\ No newline at end of file
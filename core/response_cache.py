@@ -0,0 +1,302 @@
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Hashable, List, NamedTuple, Optional, Set, Tuple
+from core.entities import extract_entities
+from core.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# MinHash 使用的哈希族 h(x) = (a * x + b) mod p，p 为梅森素数 2^31 - 1，a * x + b 不会超出 uint64
+_PRIME = (1 << 31) - 1
+_NON_WORD = re.compile(r"[\W_]+")
+# 不影响问题含义的疑问词、语气词和泛指名词，如“退货政策是什么”与“怎么退货”去掉后都是“退货”；
+# “为什么”会改变问题含义，先匹配并原样保留
+_FILLER = re.compile(r"(为什么)|是什么|什么是|什么|怎么样|怎么|怎样|如何|请问|请|一下|吗|呢|吧|的|政策|规定|流程|方法")
+# 含数字的词（订单号、日期、数量等），近似命中时必须完全相同
+_NUMBERED = re.compile(r"[a-z]*\d[a-z0-9]*")
+
+
+def normalize(text: str) -> str:
+    """
+    规范化用户输入：全角转半角、转小写、去掉空白和标点，再去掉疑问词和语气词；
+    只剩这些词时保留原样
+
+    Args:
+        text (str): 用户输入
+
+    Returns:
+        str: 规范化后的文本
+    """
+    text = _NON_WORD.sub("", unicodedata.normalize("NFKC", text).lower())
+    return _FILLER.sub(r"\1", text) or text
+
+
+def shingles(text: str, size: int = 2) -> FrozenSet[str]:
+    """
+    字符 n-gram 集合，文本短于 n 时为整个文本
+
+    Args:
+        text (str): 规范化后的文本
+        size (int): n-gram 长度
+
+    Returns:
+        FrozenSet[str]: n-gram 集合
+    """
+    if len(text) <= size:
+        return frozenset((text,)) if text else frozenset()
+    return frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+
+
+def _hash32(value: str) -> int:
+    return zlib.crc32(value.encode("utf-8"))
+
+
+class MinHasher:
+    """
+    MinHash 签名：两个集合签名中相等位置的比例是其 Jaccard 相似度的无偏估计；
+    签名按 bands 分段做局部敏感哈希，相似度高的集合至少有一段相同的概率很高
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        """
+        初始化哈希族
+
+        Args:
+            num_perm (int): 签名长度
+            bands (int): 局部敏感哈希的分段数，需整除 num_perm
+            seed (int): 生成哈希族参数的种子
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm 必须是 bands 的整数倍")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._params = ([_hash32(f"{seed}:a:{i}") % (_PRIME - 1) + 1 for i in range(num_perm)],
+                        [_hash32(f"{seed}:b:{i}") % _PRIME for i in range(num_perm)])
+        # 首次计算签名时才转为 numpy 数组，构造缓存不导入 numpy
+        self._arrays = None
+
+    def signature(self, items: FrozenSet[str]) -> Tuple[int, ...]:
+        """
+        计算集合的 MinHash 签名
+
+        Args:
+            items (FrozenSet[str]): 集合
+
+        Returns:
+            Tuple[int, ...]: 签名，空集合时为空元组
+        """
+        if not items:
+            return ()
+        # 每个元素在全部哈希函数下的取值组成一行，按列取最小值
+        if self._arrays is None:
+            self._arrays = tuple(np.array(params, dtype=np.uint64) for params in self._params)
+        a, b = self._arrays
+        hashes = np.fromiter((_hash32(item) % _PRIME for item in items), dtype=np.uint64, count=len(items))
+        return tuple(((np.outer(hashes, a) + b) % _PRIME).min(axis=0).tolist())
+
+    def band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        """
+        签名的各段，作为局部敏感哈希的桶键
+
+        Args:
+            signature (Tuple[int, ...]): 签名
+
+        Returns:
+            List[Tuple[int, Tuple[int, ...]]]: (段号, 段内容) 列表
+        """
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)] \
+            if signature else []
+
+
+class Probe(NamedTuple):
+    """
+    一次查找算出的规范化文本、n-gram、签名分段和实体守卫，未命中后写入同一输入时复用；
+    精确命中时只有规范化文本
+    """
+    normalized: str
+    shingles: Optional[FrozenSet[str]] = None
+    bands: Optional[List[Tuple[int, Tuple[int, ...]]]] = None
+    guard: Optional[Tuple[FrozenSet[Tuple[str, str]], FrozenSet[str]]] = None
+
+
+class _Entry(NamedTuple):
+    response: str
+    expires: float
+    shingles: FrozenSet[str]
+    bands: List[Tuple[int, Tuple[int, ...]]]
+    # 近似命中时必须完全一致的部分：抽取到的实体和含数字的词
+    guard: Tuple[FrozenSet[Tuple[str, str]], FrozenSet[str]]
+
+
+def _guard(text: str, normalized: str) -> Tuple[FrozenSet[Tuple[str, str]], FrozenSet[str]]:
+    entities = frozenset((kind, entity.value.lower()) for kind, entity in extract_entities(text).items())
+    return entities, frozenset(_NUMBERED.findall(normalized))
+
+
+class ResponseCache:
+    """
+    Agent 响应缓存：先按规范化后的输入精确查找，未命中时用 MinHash 局部敏感哈希找候选，
+    字符 n-gram 的 Jaccard 相似度达到阈值、且实体和含数字的词完全相同时近似命中
+
+    条目按作用域隔离（如 Agent 名称 + 用户ID），带过期时间，超过容量时淘汰最久未使用的条目
+    """
+
+    def __init__(self, ttl: float, max_size: int = 10000, threshold: float = 0.8, shingle_size: int = 2,
+                 hasher: Optional[MinHasher] = None):
+        """
+        初始化缓存
+
+        Args:
+            ttl (float): 条目有效期（秒）
+            max_size (int): 最多缓存的条目数量
+            threshold (float): 近似命中要求的 Jaccard 相似度
+            shingle_size (int): 字符 n-gram 长度
+            hasher (Optional[MinHasher]): MinHash 签名器
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.hasher = hasher or MinHasher()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Hashable, str], _Entry]" = OrderedDict()
+        # 分桶键包含守卫，实体或数字不同的条目不会成为候选
+        self._buckets: Dict[Tuple[Hashable, Tuple, int, Tuple[int, ...]], Set[Tuple[Hashable, str]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str, scope: Hashable = None) -> Optional[str]:
+        """
+        查找缓存的响应
+
+        Args:
+            text (str): 用户输入
+            scope (Hashable): 作用域，不同作用域的条目互不可见
+
+        Returns:
+            Optional[str]: 缓存的响应，未命中时返回 None
+        """
+        return self.lookup(text, scope)[0]
+
+    def lookup(self, text: str, scope: Hashable = None) -> Tuple[Optional[str], Probe]:
+        """
+        查找缓存的响应，同时返回查找时算出的签名等，未命中时传给 set 避免重复计算
+
+        Args:
+            text (str): 用户输入
+            scope (Hashable): 作用域，不同作用域的条目互不可见
+
+        Returns:
+            Tuple[Optional[str], Probe]: (缓存的响应，未命中时为 None；查找算出的签名等)
+        """
+        normalized = normalize(text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live((scope, normalized), now)
+            if entry is not None:
+                self.exact_hits += 1
+                return entry.response, Probe(normalized)
+
+        probe = self._probe(text, normalized)
+        items, guard = probe.shingles, probe.guard
+        with self._lock:
+            candidates = set()
+            for band in probe.bands:
+                candidates.update(self._buckets.get((scope, guard, *band), ()))
+            best, best_score = None, self.threshold
+            for key in candidates:
+                entry = self._live(key, now)
+                if entry is None:
+                    continue
+                score = len(items & entry.shingles) / len(items | entry.shingles)
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is not None:
+                self.similar_hits += 1
+                return best.response, probe
+            self.misses += 1
+            return None, probe
+
+    def set(self, text: str, response: str, scope: Hashable = None, probe: Optional[Probe] = None) -> None:
+        """
+        写入响应
+
+        Args:
+            text (str): 用户输入
+            response (str): 响应
+            scope (Hashable): 作用域
+            probe (Optional[Probe]): lookup 对同一输入返回的签名等，默认重新计算
+        """
+        if probe is None or probe.shingles is None:
+            probe = self._probe(text, normalize(text) if probe is None else probe.normalized)
+        entry = _Entry(response, time.monotonic() + self.ttl, probe.shingles, probe.bands, probe.guard)
+        key = (scope, probe.normalized)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            for band in entry.bands:
+                self._buckets.setdefault((scope, entry.guard, *band), set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        命中统计
+
+        Returns:
+            Dict[str, float]: 精确命中、近似命中、未命中次数，命中率和条目数量
+        """
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            total = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "size": len(self._entries),
+            }
+
+    def _probe(self, text: str, normalized: str) -> Probe:
+        items = shingles(normalized, self.shingle_size)
+        return Probe(normalized, items, self.hasher.band_keys(self.hasher.signature(items)),
+                     _guard(text, normalized))
+
+    def _live(self, key: Tuple[Hashable, str], now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires < now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Tuple[Hashable, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        scope = key[0]
+        for band in entry.bands:
+            bucket = self._buckets.get((scope, entry.guard, *band))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[(scope, entry.guard, *band)]
\ No newline at end of file
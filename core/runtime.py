@@ -0,0 +1,95 @@
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+from core.lazy import lazy_import
+
+# 只有异步调用方会用到 asyncio，此时调用方已经导入过它
+asyncio = lazy_import("asyncio")
+
+
+DEFAULT_SESSION = "default"
+
+# 当前请求所属的会话ID，随 asyncio 任务和线程池调用一起传递
+current_session: contextvars.ContextVar[str] = contextvars.ContextVar("current_session", default=DEFAULT_SESSION)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_max_workers: Optional[int] = None
+
+
+def set_max_workers(max_workers: int) -> None:
+    """
+    设置同步工具线程池的大小，需在第一次使用线程池前调用
+
+    Args:
+        max_workers (int): 最大线程数
+    """
+    global _max_workers
+    with _executor_lock:
+        if _executor is not None:
+            raise RuntimeError("线程池已创建，无法修改大小")
+        _max_workers = max_workers
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    获取用于执行同步工具的共享有界线程池
+
+    Returns:
+        ThreadPoolExecutor: 线程池
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix="agent-tool")
+    return _executor
+
+
+async def run_sync(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在共享线程池中执行同步函数，不阻塞事件循环，并保留当前上下文（如会话ID）
+
+    Args:
+        func (Callable[..., Any]): 同步函数
+        *args: 位置参数
+        **kwargs: 关键字参数
+
+    Returns:
+        Any: 函数返回值
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+async def iterate_sync(iterator: Iterator[Any], context: Optional[contextvars.Context] = None) -> AsyncIterator[Any]:
+    """
+    在共享线程池中逐个取出同步迭代器的元素，作为异步迭代器使用，每取一个元素只占用一次线程池调用
+
+    Args:
+        iterator (Iterator[Any]): 同步迭代器（如生成器）
+        context (Optional[contextvars.Context]): 取元素时使用的上下文，默认复制当前上下文
+
+    Returns:
+        AsyncIterator[Any]: 异步迭代器
+    """
+    loop = asyncio.get_running_loop()
+    context = context if context is not None else contextvars.copy_context()
+    done = object()
+    try:
+        while True:
+            item = await loop.run_in_executor(get_executor(), context.run, next, iterator, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            try:
+                context.run(close)
+            except (RuntimeError, ValueError):
+                # 任务被取消时迭代器可能仍在线程池中执行，此时交给垃圾回收关闭
+                pass
\ No newline at end of file
@@ -0,0 +1,277 @@
+import heapq
+import itertools
+import math
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# 中文字符连续片段 或 拉丁字母/数字单词
+_TOKEN_PATTERN = re.compile(r'[\u4e00-\u9fff]+|[a-z0-9]+')
+
+
+def tokenize(text: str, ngram: int = 2, unigrams: bool = False) -> List[str]:
+    """
+    CJK 感知的分词：中文按字符 n-gram 切分，拉丁文本按单词切分
+
+    文档中不超过 n 个字的中文片段（如关键词“天”）整体作为词元；查询分词时传入 unigrams=True
+    额外切出单字，使“几天能到”也能命中这类单字关键词。文档不切单字，常用字不会让无关文档命中
+
+    Args:
+        text (str): 待分词文本
+        ngram (int): 中文 n-gram 长度
+        unigrams (bool): 是否额外输出中文单字
+
+    Returns:
+        List[str]: 词元列表
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if '\u4e00' <= run[0] <= '\u9fff':
+            if len(run) <= ngram:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + ngram] for i in range(len(run) - ngram + 1))
+            if unigrams and len(run) > 1:
+                tokens.extend(run)
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def document_text(document: Dict[str, Any], fields: Iterable[str]) -> str:
+    """
+    将文档中需要索引的字段拼接为一段文本
+
+    Args:
+        document (Dict[str, Any]): 文档
+        fields (Iterable[str]): 需要索引的字段名
+
+    Returns:
+        str: 拼接后的文本
+    """
+    parts = []
+    for field in fields:
+        value = document.get(field)
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(item) for item in value)
+        elif value:
+            parts.append(str(value))
+    return "\n".join(parts)
+
+
+def bm25_idf(doc_count: int, df: int) -> float:
+    """
+    计算 BM25 逆文档频率
+
+    Args:
+        doc_count (int): 文档总数
+        df (int): 包含该词元的文档数
+
+    Returns:
+        float: 逆文档频率
+    """
+    return math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+
+class BaseIndex(ABC):
+    """
+    检索索引基类，定义了文档写入与检索的基本接口
+    """
+
+    @abstractmethod
+    def add_document(self, doc_id: str, document: Dict[str, Any]) -> None:
+        """
+        添加或覆盖一篇文档
+
+        Args:
+            doc_id (str): 文档ID
+            document (Dict[str, Any]): 文档内容
+        """
+        pass
+
+    def add_documents(self, documents: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        批量添加文档，子类可覆盖以实现更高效的批量写入
+
+        Args:
+            documents (Iterable[Tuple[str, Dict[str, Any]]]): (文档ID, 文档内容) 序列
+        """
+        for doc_id, document in documents:
+            self.add_document(doc_id, document)
+
+    @abstractmethod
+    def remove_document(self, doc_id: str) -> None:
+        """
+        删除一篇文档
+
+        Args:
+            doc_id (str): 文档ID
+        """
+        pass
+
+    @abstractmethod
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取文档内容
+
+        Args:
+            doc_id (str): 文档ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 文档内容，不存在时返回 None
+        """
+        pass
+
+    @abstractmethod
+    def doc_ids(self, limit: Optional[int] = None) -> List[str]:
+        """
+        列出索引中的文档ID
+
+        Args:
+            limit (Optional[int]): 最多返回的数量
+
+        Returns:
+            List[str]: 文档ID列表
+        """
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        检索与查询最相关的文档
+
+        Args:
+            query (str): 查询文本
+            top_k (int): 返回结果数量
+
+        Returns:
+            List[Tuple[str, float]]: 按得分降序排列的 (文档ID, 得分) 列表
+        """
+        pass
+
+
+class InvertedIndex(BaseIndex):
+    """
+    内存倒排索引，使用 BM25 对检索结果排序
+    """
+
+    def __init__(self, fields: Iterable[str] = ("title", "content"), k1: float = 1.5, b: float = 0.75):
+        """
+        初始化倒排索引
+
+        Args:
+            fields (Iterable[str]): 参与索引的文档字段
+            k1 (float): BM25 词频饱和参数
+            b (float): BM25 文档长度归一化参数
+        """
+        self.fields = tuple(fields)
+        self.k1 = k1
+        self.b = b
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        # 词元 -> {文档ID: 词频}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.documents
+
+    def add_document(self, doc_id: str, document: Dict[str, Any]) -> None:
+        """
+        添加或覆盖一篇文档
+
+        Args:
+            doc_id (str): 文档ID
+            document (Dict[str, Any]): 文档内容
+        """
+        if doc_id in self.documents:
+            self.remove_document(doc_id)
+
+        tokens = tokenize(document_text(document, self.fields))
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for token, tf in frequencies.items():
+            self.postings.setdefault(token, {})[doc_id] = tf
+
+        self.documents[doc_id] = document
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove_document(self, doc_id: str) -> None:
+        """
+        删除一篇文档
+
+        Args:
+            doc_id (str): 文档ID
+        """
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+        for token in set(tokenize(document_text(document, self.fields))):
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[token]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取文档内容
+
+        Args:
+            doc_id (str): 文档ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 文档内容，不存在时返回 None
+        """
+        return self.documents.get(doc_id)
+
+    def doc_ids(self, limit: Optional[int] = None) -> List[str]:
+        """
+        列出索引中的文档ID
+
+        Args:
+            limit (Optional[int]): 最多返回的数量
+
+        Returns:
+            List[str]: 文档ID列表
+        """
+        return list(itertools.islice(self.documents, limit))
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        使用 BM25 检索与查询最相关的文档
+
+        Args:
+            query (str): 查询文本
+            top_k (int): 返回结果数量
+
+        Returns:
+            List[Tuple[str, float]]: 按得分降序排列的 (文档ID, 得分) 列表
+        """
+        doc_count = len(self.documents)
+        if not doc_count:
+            return []
+
+        avg_length = self.total_length / doc_count
+        scores: Dict[str, float] = {}
+        for token in set(tokenize(query, unigrams=True)):
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            idf = bm25_idf(doc_count, len(posting))
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
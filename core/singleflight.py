@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    请求合并：同一个键同时只执行一次调用，并发的其他调用方等待并共享结果（或异常）
+    """
+
+    def __init__(self):
+        """
+        初始化请求合并器
+        """
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key: Hashable) -> bool:
+        """
+        判断某个键是否有正在执行的调用
+
+        Args:
+            key (Hashable): 合并键
+
+        Returns:
+            bool: 是否正在执行
+        """
+        return key in self._calls
+
+    def acquire(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        登记一次调用，由第一个登记的调用方（leader）负责执行并调用 release
+
+        Args:
+            key (Hashable): 合并键
+
+        Returns:
+            Tuple[Future, bool]: (共享结果的 Future, 是否为 leader)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def release(self, key: Hashable, result: Any = None, error: BaseException = None) -> None:
+        """
+        发布调用结果并唤醒等待方
+
+        Args:
+            key (Hashable): 合并键
+            result (Any): 调用结果
+            error (BaseException): 调用异常，不为空时等待方会收到该异常
+        """
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        执行调用；若同一个键已有调用在执行，则等待其结果
+
+        Args:
+            key (Hashable): 合并键
+            func (Callable[..., Any]): 实际执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            Any: 函数返回值
+        """
+        future, leader = self.acquire(key)
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.release(key, error=e)
+            raise
+        self.release(key, result)
+        return result
@@ -0,0 +1,339 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+
+# describe() 输出的统计项与分位点
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+DESCRIBE_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+class KLLSketch:
+    """
+    KLL 分位数草图：内存占用与数据量无关的近似分位数，可合并
+
+    每一层是一个压缩器，层 h 中的元素代表 2^h 个原始值；层超过容量时排序后隔一取一提升到上一层。
+    尚未发生压缩时保存全部数据，分位数与 pandas 的线性插值结果完全一致。
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        """
+        初始化草图
+
+        Args:
+            k (int): 精度参数，k 越大误差越小（秩误差约 1.7/k）
+            seed (Optional[int]): 压缩时选取奇偶位置的随机种子
+        """
+        self.k = k
+        self.count = 0
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def exact(self) -> bool:
+        """
+        是否仍保存全部数据（尚未发生压缩）
+        """
+        return len(self._levels) == 1
+
+    @property
+    def size(self) -> int:
+        """
+        草图中保存的元素数量
+        """
+        return sum(len(level) for level in self._levels)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values: Iterable[float]) -> None:
+        """
+        批量加入数值，NaN 会被忽略
+
+        Args:
+            values (Iterable[float]): 数值
+        """
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self._levels[0] = np.concatenate((self._levels[0], values))
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        """
+        合并另一个草图
+
+        Args:
+            other (KLLSketch): 草图
+        """
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate((self._levels[level], items))
+        self.count += other.count
+        self._compress()
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # 个数为奇数时保留最后一个元素，其余隔一取一提升到上一层
+                even = len(items) - len(items) % 2
+                promoted = items[self._rng.integers(2):even:2]
+                self._levels[level] = items[even:]
+                if level + 1 == len(self._levels):
+                    self._levels.append(promoted)
+                else:
+                    self._levels[level + 1] = np.concatenate((self._levels[level + 1], promoted))
+            level += 1
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        """
+        查询分位数
+
+        Args:
+            qs (Sequence[float]): 分位点，取值 0~1
+
+        Returns:
+            List[float]: 分位数，没有数据时为 NaN
+        """
+        if not self.count:
+            return [np.nan] * len(qs)
+        if self.exact:
+            return [float(value) for value in np.quantile(self._levels[0], qs)]
+
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self._levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        total = cumulative[-1]
+        positions = np.searchsorted(cumulative, np.asarray(qs) * total, side="left")
+        return [float(items[min(position, len(items) - 1)]) for position in positions]
+
+
+class StreamingSummary:
+    """
+    分块累积 DataFrame 的统计量，单次扫描得到与 describe()/corr() 相同格式的结果
+
+    数值列两两之间按“两列都非空”的行累积计数、均值、二阶矩和协方差（与 pandas 的成对
+    缺失值处理一致），分块结果用 Chan 等人的并行公式合并，内存只与列数有关。
+    """
+
+    def __init__(self, sketch_k: int = 1024):
+        """
+        初始化统计累积器
+
+        Args:
+            sketch_k (int): 分位数草图的精度参数
+        """
+        self.sketch_k = sketch_k
+        self.rows = 0
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, np.dtype] = {}
+        # 任一分块中出现非数值类型的列，整体读取时同样不是数值列
+        self._non_numeric = set()
+        self._index: Dict[str, int] = {}
+        self._n = np.zeros((0, 0))
+        self._mean = np.zeros((0, 0))
+        self._m2 = np.zeros((0, 0))
+        self._comoment = np.zeros((0, 0))
+        self._min = np.zeros(0)
+        self._max = np.zeros(0)
+        self._sketches: Dict[str, KLLSketch] = {}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, len(self.columns)
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        """
+        数值列（按列出现的顺序）
+        """
+        return [column for column in self.columns if column in self._sketches and column not in self._non_numeric]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        累积器占用的大致内存（字节）
+        """
+        matrices = self._n.nbytes + self._mean.nbytes + self._m2.nbytes + self._comoment.nbytes
+        return matrices + sum(sketch.size * 8 for sketch in self._sketches.values())
+
+    def _merge_dtypes(self, dtypes: Iterable) -> None:
+        for column, dtype in dtypes:
+            current = self.dtypes.get(column)
+            if current is None:
+                self.columns.append(column)
+                self.dtypes[column] = dtype
+            elif current != dtype:
+                # 各分块推断的类型不同时按整体读取的结果合并，如 int64 与 float64 合并为 float64
+                numeric = pd.api.types.is_numeric_dtype(current) and pd.api.types.is_numeric_dtype(dtype)
+                self.dtypes[column] = np.result_type(current, dtype) if numeric else np.dtype(object)
+
+    def _ensure_columns(self, columns: Iterable[str]) -> None:
+        new = [column for column in columns if column not in self._index]
+        if not new:
+            return
+        for column in new:
+            self._index[column] = len(self._index)
+        size = len(self._index)
+        old = self._n.shape[0]
+
+        def grow(matrix: np.ndarray) -> np.ndarray:
+            grown = np.zeros((size, size))
+            grown[:old, :old] = matrix
+            return grown
+
+        self._n, self._mean, self._m2, self._comoment = map(grow, (self._n, self._mean, self._m2, self._comoment))
+        self._min = np.concatenate((self._min, np.full(size - old, np.inf)))
+        self._max = np.concatenate((self._max, np.full(size - old, -np.inf)))
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        累积一个数据分块
+
+        Args:
+            chunk (pd.DataFrame): 数据分块
+        """
+        self.rows += len(chunk)
+        self._merge_dtypes(chunk.dtypes.items())
+
+        numeric = chunk.select_dtypes(include=["number"]).columns
+        self._non_numeric.update(column for column in chunk.columns if column not in numeric)
+        numeric = [column for column in numeric if column not in self._non_numeric]
+        if not numeric:
+            return
+
+        values = chunk[numeric].to_numpy(dtype="float64", na_value=np.nan)
+        self._ensure_columns(numeric)
+        positions = np.array([self._index[column] for column in numeric])
+        self._merge_moments(positions, *_chunk_moments(values))
+
+        present = ~np.isnan(values)
+        for i, column in enumerate(numeric):
+            sketch = self._sketches.get(column)
+            if sketch is None:
+                sketch = self._sketches[column] = KLLSketch(self.sketch_k)
+            sketch.update(values[present[:, i], i])
+
+    def merge(self, other: "StreamingSummary") -> None:
+        """
+        合并另一个累积器的结果（例如另一个文件或另一个进程的部分结果）
+
+        Args:
+            other (StreamingSummary): 累积器
+        """
+        self.rows += other.rows
+        self._merge_dtypes(other.dtypes.items())
+        self._non_numeric.update(other._non_numeric)
+        if not other._index:
+            return
+
+        columns = list(other._index)
+        self._ensure_columns(columns)
+        positions = np.array([self._index[column] for column in columns])
+        self._merge_moments(positions, other._n, other._mean, other._m2, other._comoment, other._min, other._max)
+        for column, sketch in other._sketches.items():
+            if column in self._sketches:
+                self._sketches[column].merge(sketch)
+            else:
+                copy = self._sketches[column] = KLLSketch(self.sketch_k)
+                copy.merge(sketch)
+
+    def _merge_moments(self, positions: np.ndarray, n: np.ndarray, mean: np.ndarray, m2: np.ndarray,
+                       comoment: np.ndarray, minimum: np.ndarray, maximum: np.ndarray) -> None:
+        block = np.ix_(positions, positions)
+        n_a, mean_a = self._n[block], self._mean[block]
+        total = n_a + n
+        delta = mean - mean_a
+        ratio = np.divide(n, total, out=np.zeros_like(total), where=total > 0)
+        weight = n_a * ratio
+        self._mean[block] = mean_a + delta * ratio
+        self._m2[block] += m2 + delta * delta * weight
+        self._comoment[block] += comoment + delta * delta.T * weight
+        self._n[block] = total
+        self._min[positions] = np.fmin(self._min[positions], minimum)
+        self._max[positions] = np.fmax(self._max[positions], maximum)
+
+    def value_range(self, column: str) -> Tuple[float, float]:
+        """
+        获取数值列的最小值与最大值
+
+        Args:
+            column (str): 列名
+
+        Returns:
+            Tuple[float, float]: (最小值, 最大值)，没有数据时为 NaN
+        """
+        position = self._index[column]
+        if not self._n[position, position]:
+            return np.nan, np.nan
+        return float(self._min[position]), float(self._max[position])
+
+    def describe(self) -> pd.DataFrame:
+        """
+        生成与 DataFrame.describe() 相同结构的统计表，分位数为草图的近似值
+
+        Returns:
+            pd.DataFrame: 统计表
+        """
+        columns = self.numeric_columns
+        positions = [self._index[column] for column in columns]
+        n = self._n[positions, positions]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(np.where(n > 1, self._m2[positions, positions] / (n - 1), np.nan))
+        mean = np.where(n > 0, self._mean[positions, positions], np.nan)
+        minimum = np.where(n > 0, self._min[positions], np.nan)
+        maximum = np.where(n > 0, self._max[positions], np.nan)
+        quantiles = np.array([self._sketches[column].quantiles(DESCRIBE_PERCENTILES) for column in columns]).reshape(-1, 3)
+        data = np.vstack([n, mean, std, minimum, quantiles.T, maximum]) if columns else np.empty((8, 0))
+        return pd.DataFrame(data, index=DESCRIBE_INDEX, columns=columns)
+
+    def corr(self) -> pd.DataFrame:
+        """
+        生成与 DataFrame.corr() 相同的皮尔逊相关系数矩阵（成对忽略缺失值）
+
+        Returns:
+            pd.DataFrame: 相关系数矩阵
+        """
+        columns = self.numeric_columns
+        block = np.ix_([self._index[column] for column in columns], [self._index[column] for column in columns])
+        m2 = self._m2[block]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = self._comoment[block] / np.sqrt(m2 * m2.T)
+        corr = np.where(self._n[block] > 1, np.clip(corr, -1, 1), np.nan)
+        return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def _chunk_moments(values: np.ndarray):
+    """
+    计算一个分块中各列两两之间的成对统计量：计数、均值、二阶矩、协方差（未除以自由度）、最小值、最大值
+
+    矩阵元素 [i, j] 只统计第 i、j 列都非空的行，均值与二阶矩属于第 i 列
+    """
+    present = ~np.isnan(values)
+    mask = present.astype("float64")
+    count = mask.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        center = np.where(count > 0, np.nansum(values, axis=0) / count, 0.0)
+    # 先按列均值中心化以减小大数相减的误差
+    centered = np.where(present, values - center, 0.0)
+
+    n = mask.T @ mask
+    sums = centered.T @ mask
+    squares = (centered * centered).T @ mask
+    products = centered.T @ centered
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pair_mean = np.where(n > 0, sums / n, 0.0)
+    mean = pair_mean + center[:, None]
+    m2 = squares - sums * pair_mean
+    comoment = products - sums * pair_mean.T
+    minimum = np.min(np.where(present, values, np.inf), axis=0, initial=np.inf)
+    maximum = np.max(np.where(present, values, -np.inf), axis=0, initial=-np.inf)
+    return n, np.where(n > 0, mean, 0.0), m2, comoment, minimum, maximum
@@ -0,0 +1,147 @@
+import io
+from operator import itemgetter
+from string import Formatter
+from typing import Any, Callable, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+
+# 编译后的模板片段：(字面量, 取值函数, 转换标记, 格式说明)，取值函数为 None 表示只有字面量
+_Part = Tuple[str, Optional[Callable[[Mapping[str, Any]], Any]], Optional[str], str]
+
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+
+def _compile(text: str) -> List[_Part]:
+    parts = []
+    for literal, field, format_spec, conversion in Formatter().parse(text):
+        if field is None:
+            parts.append((literal, None, None, ""))
+            continue
+        if not field or not field.isidentifier():
+            raise ValueError(f"模板字段只能是名称: {{{field}}}")
+        if format_spec and "{" in format_spec:
+            raise ValueError(f"模板不支持嵌套字段: {{{field}:{format_spec}}}")
+        parts.append((literal, itemgetter(field), conversion, format_spec or ""))
+    return parts
+
+
+class Template:
+    """
+    预编译的响应模板，语法与 str.format 相同（字段只能是名称）
+
+    构造时解析一次模板文本，渲染时按片段写入 io.StringIO 或拼接列表，不再重复解析，也没有逐行 += 的字符串复制
+    """
+
+    def __init__(self, text: str):
+        """
+        编译模板
+
+        Args:
+            text (str): 模板文本，如 "姓名：{name}\\n"
+        """
+        self.text = text
+        self._parts = _compile(text)
+
+    def _pieces(self, values: Mapping[str, Any]) -> Iterable[str]:
+        for literal, getter, conversion, format_spec in self._parts:
+            if literal:
+                yield literal
+            if getter is not None:
+                value = getter(values)
+                if conversion:
+                    value = _CONVERSIONS[conversion](value)
+                yield format(value, format_spec)
+
+    def write(self, out: io.StringIO, values: Mapping[str, Any]) -> None:
+        """
+        将渲染结果写入缓冲区
+
+        Args:
+            out (io.StringIO): 输出缓冲区
+            values (Mapping[str, Any]): 字段值
+        """
+        for piece in self._pieces(values):
+            out.write(piece)
+
+    def render(self, values: Optional[Mapping[str, Any]] = None, **kwargs) -> str:
+        """
+        渲染模板
+
+        Args:
+            values (Optional[Mapping[str, Any]]): 字段值
+            **kwargs: 其他字段值，与 values 合并
+
+        Returns:
+            str: 渲染结果
+        """
+        if kwargs:
+            values = {**values, **kwargs} if values else kwargs
+        return "".join(self._pieces(values or {}))
+
+
+class ListTemplate:
+    """
+    列表类响应的模板：标题 + 逐项内容 + 结尾，各部分都是预编译的 Template，
+    逐项渲染时可使用从 start 开始的序号字段 index
+    """
+
+    def __init__(self, header: str, item: str, footer: str = "", items_key: str = "items", start: int = 1,
+                 separator: str = ""):
+        """
+        编译模板
+
+        Args:
+            header (str): 标题模板，使用整个数据字典的字段
+            item (str): 单项模板，使用列表元素的字段和 index
+            footer (str): 结尾模板，使用整个数据字典的字段
+            items_key (str): 数据字典中列表所在的键
+            start (int): 序号起始值
+            separator (str): 列表项之间的分隔符
+        """
+        self.header = Template(header)
+        self.item = Template(item)
+        self.footer = Template(footer)
+        self.items_key = items_key
+        self.start = start
+        self.separator = separator
+
+    def _items(self, data: Mapping[str, Any]) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        for index, item in enumerate(data.get(self.items_key, ()), self.start):
+            separator = self.separator if index != self.start else ""
+            # 字符串列表项通过 {value} 引用
+            yield separator, {**item, "index": index} if isinstance(item, Mapping) else {"value": item, "index": index}
+
+    def render(self, data: Mapping[str, Any]) -> str:
+        """
+        渲染标题、全部列表项和结尾
+
+        Args:
+            data (Mapping[str, Any]): 数据字典，data[items_key] 为列表项（字典或字符串）
+
+        Returns:
+            str: 渲染结果
+        """
+        out = io.StringIO()
+        self.header.write(out, data)
+        for separator, fields in self._items(data):
+            out.write(separator)
+            self.item.write(out, fields)
+        self.footer.write(out, data)
+        return out.getvalue()
+
+    def stream(self, data: Mapping[str, Any]) -> Iterator[str]:
+        """
+        逐段渲染：标题、每个列表项、结尾各为一段；data[items_key] 可以是惰性生成器，
+        每取到一项就输出一项
+
+        Args:
+            data (Mapping[str, Any]): 数据字典
+
+        Returns:
+            Iterator[str]: 渲染片段
+        """
+        yield self.header.render(data)
+        for separator, fields in self._items(data):
+            yield separator + self.item.render(fields)
+        footer = self.footer.render(data)
+        if footer:
+            yield footer
\ No newline at end of file
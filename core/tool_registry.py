@@ -0,0 +1,181 @@
+import functools
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterator, List, NamedTuple, Optional, Union
+
+
+class ToolSpec(NamedTuple):
+    """
+    已注册工具的描述，生成 function calling 的 schema 时不需要构造工具
+    """
+    name: str
+    description: str
+    parameters: Dict[str, Any]
+    factory: Callable[[], Any]
+    # 相同共享键的工具在所有注册表之间共用一个实例，None 表示不共享
+    share_key: Optional[Hashable]
+
+
+# 进程内共享的工具实例：共享键 -> 工具
+_shared_tools: Dict[Hashable, Any] = {}
+_shared_tools_lock = threading.Lock()
+
+
+def _shared_instance(key: Hashable, factory: Callable[[], Any]) -> Any:
+    tool = _shared_tools.get(key)
+    if tool is None:
+        with _shared_tools_lock:
+            tool = _shared_tools.get(key)
+            if tool is None:
+                tool = _shared_tools[key] = factory()
+    return tool
+
+
+def clear_shared_tools() -> None:
+    """
+    清空进程内共享的工具实例，之后首次使用时重新构造
+    """
+    with _shared_tools_lock:
+        _shared_tools.clear()
+
+
+def _share_key(tool_class: type, kwargs: Dict[str, Any]) -> Optional[Hashable]:
+    key = (tool_class, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        # 参数不可哈希（如传入了自定义数据字典）时不共享
+        return None
+    return key
+
+
+class ToolRegistry:
+    """
+    工具注册表：按工具名 O(1) 查找，工具在首次使用时才构造
+
+    以工具类和构造参数注册、且类属性 STATELESS 为真的工具，只要类和参数相同就在所有 Agent、所有会话之间
+    共享同一个实例；有可变状态的工具（如可增删条目的知识库）默认每个注册表各自构造
+    """
+
+    def __init__(self):
+        """
+        初始化工具注册表
+        """
+        self._specs: Dict[str, ToolSpec] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._schema: Optional[List[Dict[str, Any]]] = None
+        self._schema_json: Optional[str] = None
+
+    def register(self, tool: Union[type, Callable[[], Any], Any], name: Optional[str] = None,
+                 shared: Optional[bool] = None, **kwargs) -> str:
+        """
+        注册工具
+
+        Args:
+            tool: 工具类（kwargs 为构造参数）、工具实例，或返回工具实例的无参工厂函数（需要指定 name）
+            name (Optional[str]): 工具名，默认使用工具的 name 属性
+            shared (Optional[bool]): 工具类的实例是否在注册表之间共享，默认取工具类的 STATELESS 属性
+            **kwargs: 工具类的构造参数
+
+        Returns:
+            str: 工具名
+        """
+        instance = None
+        if isinstance(tool, type):
+            factory = functools.partial(tool, **kwargs) if kwargs else tool
+            if shared is None:
+                shared = getattr(tool, "STATELESS", False)
+            share_key = _share_key(tool, kwargs) if shared else None
+        elif hasattr(tool, "execute"):
+            instance, factory, share_key = tool, (lambda: tool), None
+        else:
+            factory, share_key = tool, None
+        name = name or getattr(tool, "name", None)
+        if not name:
+            raise ValueError("注册工具工厂函数时需要指定工具名")
+
+        spec = ToolSpec(name, getattr(tool, "description", ""),
+                        getattr(tool, "parameters", {"type": "object", "properties": {}}), factory, share_key)
+        with self._lock:
+            self._specs[name] = spec
+            self._instances.pop(name, None)
+            if instance is not None:
+                self._instances[name] = instance
+            self._schema = self._schema_json = None
+        return name
+
+    def get(self, name: str) -> Any:
+        """
+        按工具名获取工具，首次获取时构造
+
+        Args:
+            name (str): 工具名
+
+        Returns:
+            Any: 工具实例
+        """
+        tool = self._instances.get(name)
+        if tool is not None:
+            return tool
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"未注册的工具: {name}")
+        with self._lock:
+            tool = self._instances.get(name)
+            if tool is None:
+                tool = spec.factory() if spec.share_key is None else _shared_instance(spec.share_key, spec.factory)
+                self._instances[name] = tool
+        return tool
+
+    def names(self) -> List[str]:
+        """
+        按注册顺序返回工具名
+        """
+        return list(self._specs)
+
+    def __getitem__(self, key: Union[str, int]) -> Any:
+        # 整数下标按注册顺序取工具，兼容原先按位置访问 Agent.tools 的写法
+        if isinstance(key, int):
+            key = self.names()[key]
+        return self.get(key)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __iter__(self) -> Iterator[Any]:
+        for name in self.names():
+            yield self.get(name)
+
+    def schema(self) -> List[Dict[str, Any]]:
+        """
+        生成 function calling 使用的工具描述（OpenAI 兼容格式），结果缓存到下次注册工具为止，
+        生成时不构造工具
+
+        Returns:
+            List[Dict[str, Any]]: 工具描述列表
+        """
+        schema = self._schema
+        if schema is None:
+            schema = [
+                {"type": "function",
+                 "function": {"name": spec.name, "description": spec.description, "parameters": spec.parameters}}
+                for spec in self._specs.values()
+            ]
+            self._schema = schema
+        return schema
+
+    def schema_json(self) -> str:
+        """
+        工具描述的 JSON 文本，可直接放入请求体
+
+        Returns:
+            str: JSON 文本
+        """
+        text = self._schema_json
+        if text is None:
+            text = self._schema_json = json.dumps(self.schema(), ensure_ascii=False)
+        return text
\ No newline at end of file
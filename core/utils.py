@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, Optional
 
 
 def save_to_file(data: Any, file_path: str, format: str = 'json'):
@@ -53,6 +53,34 @@ def format_response(response: str, max_length: int = 1000) -> str:
     Returns:
         格式化后的响应
     """
-    if len(response) > max_length:
-        return response[:max_length] + "\n[内容已截断]"
-    return response
\ No newline at end of file
+    return "".join(truncate_stream((response,), max_length))
+
+
+def truncate_stream(chunks: Iterable[str], max_length: Optional[int] = 1000) -> Iterator[str]:
+    """
+    在流式输出过程中限制总长度：超出 max_length 时截断当前片段、追加截断提示，并停止读取后续片段
+    
+    Args:
+        chunks (Iterable[str]): 响应片段
+        max_length (Optional[int]): 最大长度，None 表示不限制
+        
+    Returns:
+        Iterator[str]: 限制长度后的片段，拼接结果与 format_response 相同
+    """
+    chunks = iter(chunks)
+    if max_length is None:
+        yield from chunks
+        return
+    remaining = max_length
+    for chunk in chunks:
+        if len(chunk) > remaining:
+            if remaining:
+                yield chunk[:remaining]
+            yield "\n[内容已截断]"
+            # 不再需要后续片段，提前结束上游生成器
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            return
+        remaining -= len(chunk)
+        yield chunk
\ No newline at end of file
@@ -0,0 +1,503 @@
+import json
+import os
+import re
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from core.search_index import BaseIndex, document_text
+
+
+# 中文字符连续片段 或 拉丁字母/数字单词
+_RUN_PATTERN = re.compile(r'[一-鿿]+|[a-z0-9]+')
+
+
+def char_ngrams(text: str, cjk_ngrams: Sequence[int] = (1, 2), word_ngram: int = 3) -> List[str]:
+    """
+    字符 n-gram 特征：中文按单字和相邻字切分，拉丁单词保留整词并按首尾加边界符的字符 n-gram 切分，
+    词形相近的单词（如 refund / refunds）因此共享大部分特征
+
+    Args:
+        text (str): 文本
+        cjk_ngrams (Sequence[int]): 中文 n-gram 长度
+        word_ngram (int): 拉丁单词的字符 n-gram 长度
+
+    Returns:
+        List[str]: 特征列表
+    """
+    features = []
+    for run in _RUN_PATTERN.findall(text.lower()):
+        if '一' <= run[0] <= '鿿':
+            for n in cjk_ngrams:
+                features.extend(run[i:i + n] for i in range(len(run) - n + 1))
+        else:
+            features.append(run)
+            padded = f"<{run}>"
+            features.extend(padded[i:i + word_ngram] for i in range(len(padded) - word_ngram + 1))
+    return features
+
+
+class BaseEmbedder(ABC):
+    """
+    文本向量化基类，向量化结果为按行 L2 归一化的 float32 矩阵，点积即余弦相似度
+    """
+
+    dim: int
+
+    def fit(self, texts: List[str]) -> None:
+        """
+        根据语料估计参数（如逆文档频率），无需训练的实现保持默认
+
+        Args:
+            texts (List[str]): 语料
+        """
+        pass
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        批量向量化
+
+        Args:
+            texts (List[str]): 文本列表
+
+        Returns:
+            np.ndarray: 形状为 (len(texts), dim) 的 float32 矩阵
+        """
+        pass
+
+    def save(self, directory: str) -> None:
+        """
+        将参数保存到索引目录，无参数的实现保持默认
+
+        Args:
+            directory (str): 索引目录
+        """
+        pass
+
+    def load(self, directory: str) -> None:
+        """
+        从索引目录读取参数，无参数的实现保持默认
+
+        Args:
+            directory (str): 索引目录
+        """
+        pass
+
+
+class HashingEmbedder(BaseEmbedder):
+    """
+    本地的哈希字符 n-gram TF-IDF 向量化：特征经 CRC32 哈希到固定维度（带符号以抵消冲突的偏差），
+    词频取对数后乘以逆文档频率，无需词表和联网
+    """
+
+    IDF_FILE = "idf.npy"
+
+    def __init__(self, dim: int = 1024, cjk_ngrams: Sequence[int] = (1, 2), word_ngram: int = 3):
+        """
+        初始化向量化器
+
+        Args:
+            dim (int): 向量维度
+            cjk_ngrams (Sequence[int]): 中文 n-gram 长度
+            word_ngram (int): 拉丁单词的字符 n-gram 长度
+        """
+        self.dim = dim
+        self.cjk_ngrams = tuple(cjk_ngrams)
+        self.word_ngram = word_ngram
+        # 未估计逆文档频率时各维度权重相同
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    def _hashed(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        特征哈希后的维度和符号
+        """
+        hashes = np.fromiter((zlib.crc32(feature.encode("utf-8"))
+                              for feature in char_ngrams(text, self.cjk_ngrams, self.word_ngram)), dtype=np.uint32)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        return (hashes & 0x7FFFFFFF) % self.dim, signs
+
+    def fit(self, texts: List[str]) -> None:
+        """
+        估计各维度的逆文档频率
+
+        Args:
+            texts (List[str]): 语料
+        """
+        df = np.zeros(self.dim, dtype=np.int64)
+        for text in texts:
+            df[np.unique(self._hashed(text)[0])] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        批量向量化
+
+        Args:
+            texts (List[str]): 文本列表
+
+        Returns:
+            np.ndarray: 形状为 (len(texts), dim) 的 float32 矩阵，行已 L2 归一化
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            dims, signs = self._hashed(text)
+            np.add.at(vectors[row], dims, signs)
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors)) * self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def save(self, directory: str) -> None:
+        """
+        保存逆文档频率
+
+        Args:
+            directory (str): 索引目录
+        """
+        np.save(os.path.join(directory, self.IDF_FILE), self.idf)
+
+    def load(self, directory: str) -> None:
+        """
+        读取逆文档频率
+
+        Args:
+            directory (str): 索引目录
+        """
+        path = os.path.join(directory, self.IDF_FILE)
+        if os.path.exists(path):
+            self.idf = np.load(path)
+
+
+class VectorIndex(BaseIndex):
+    """
+    向量检索索引：文档向量按行存放在连续的 float32 矩阵中，查询向量与矩阵分块做矩阵乘法后取 top-k
+
+    设置 nlist 时使用倒排文件（IVF）索引：球面 k-means 将向量聚为 nlist 簇并按簇重排矩阵，
+    查询只扫描最近的 nprobe 个簇和聚类后新增的行。新增行超过已聚类行数时自动重新聚类。
+    删除只做标记，失效行在重新聚类、compact 或 save 时清理。
+
+    设置 directory 时可用 save 持久化，再次打开时以内存映射方式加载矩阵，冷启动不必重新向量化。
+    """
+
+    VECTORS = "vectors.npy"
+    CENTROIDS = "centroids.npy"
+    META = "meta.json"
+
+    def __init__(self, fields: Iterable[str] = ("title", "content"), embedder: Optional[BaseEmbedder] = None,
+                 directory: Optional[str] = None, nlist: int = 0, nprobe: int = 4, block_rows: int = 65536):
+        """
+        初始化（或从目录加载）向量索引
+
+        Args:
+            fields (Iterable[str]): 参与向量化的文档字段
+            embedder (Optional[BaseEmbedder]): 向量化器，默认为 HashingEmbedder
+            directory (Optional[str]): 持久化目录，已有索引时直接加载
+            nlist (int): IVF 簇数量，0 表示不聚类、逐行扫描
+            nprobe (int): 查询时扫描的簇数量
+            block_rows (int): 分块计算得分时每块的行数，限制临时内存
+        """
+        self.fields = tuple(fields)
+        self.embedder = embedder or HashingEmbedder()
+        self.directory = directory
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.block_rows = block_rows
+
+        # 读写共用一把锁，矩阵扩容、聚类重排时查询不会看到不一致的行号
+        self._lock = threading.RLock()
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._live = np.zeros(0, dtype=bool)
+        self._count = 0
+        # IVF：簇中心，以及第 i 簇在矩阵中占据的行 [offsets[i], offsets[i + 1])；clustered 之后的行未聚类
+        self._centroids: Optional[np.ndarray] = None
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._clustered = 0
+
+        if directory and os.path.exists(os.path.join(directory, self.META)):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.documents
+
+    def add_document(self, doc_id: str, document: Dict[str, Any]) -> None:
+        """
+        添加或覆盖一篇文档
+
+        Args:
+            doc_id (str): 文档ID
+            document (Dict[str, Any]): 文档内容
+        """
+        self.add_documents([(doc_id, document)])
+
+    def add_documents(self, documents: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        批量添加文档，整批一次向量化；索引为空时先用这批文档估计向量化器的参数
+
+        Args:
+            documents (Iterable[Tuple[str, Dict[str, Any]]]): (文档ID, 文档内容) 序列
+        """
+        documents = list(documents)
+        if not documents:
+            return
+        texts = [document_text(document, self.fields) for _, document in documents]
+        with self._lock:
+            if not self.documents:
+                self.embedder.fit(texts)
+            vectors = self.embedder.embed(texts)
+            self._reserve(self._count + len(documents))
+            for (doc_id, document), vector in zip(documents, vectors):
+                self._discard(doc_id)
+                row = self._count
+                self._matrix[row] = vector
+                self._live[row] = True
+                self._ids.append(doc_id)
+                self._rows[doc_id] = row
+                self.documents[doc_id] = document
+                self._count += 1
+            if self.nlist and self._count - self._clustered > max(self.nlist * 39, self._clustered):
+                # k-means 每簇至少需要数十个样本才能稳定
+                self.build_ivf()
+
+    def remove_document(self, doc_id: str) -> None:
+        """
+        删除一篇文档
+
+        Args:
+            doc_id (str): 文档ID
+        """
+        with self._lock:
+            self._discard(doc_id)
+            if self._count > 1024 and len(self.documents) < self._count // 2:
+                self.compact()
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取文档内容
+
+        Args:
+            doc_id (str): 文档ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 文档内容，不存在时返回 None
+        """
+        return self.documents.get(doc_id)
+
+    def doc_ids(self, limit: Optional[int] = None) -> List[str]:
+        """
+        列出索引中的文档ID
+
+        Args:
+            limit (Optional[int]): 最多返回的数量
+
+        Returns:
+            List[str]: 文档ID列表
+        """
+        return list(self.documents)[:limit]
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        检索与查询向量余弦相似度最高的文档
+
+        Args:
+            query (str): 查询文本
+            top_k (int): 返回结果数量
+
+        Returns:
+            List[Tuple[str, float]]: 按得分降序排列的 (文档ID, 余弦相似度) 列表，只包含正分结果
+        """
+        return self.search_batch([query], top_k)[0]
+
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[str, float]]]:
+        """
+        批量检索：整批查询一次向量化，不聚类时与矩阵分块做一次矩阵乘法
+
+        Args:
+            queries (List[str]): 查询文本列表
+            top_k (int): 每个查询返回结果数量
+
+        Returns:
+            List[List[Tuple[str, float]]]: 与 queries 一一对应的检索结果
+        """
+        if not queries:
+            return []
+        vectors = self.embedder.embed(queries)
+        with self._lock:
+            if not self.documents:
+                return [[] for _ in queries]
+            if self._centroids is None:
+                scores = np.empty((self._count, len(queries)), dtype=np.float32)
+                for start, stop in self._blocks(0, self._count):
+                    np.matmul(self._matrix[start:stop], vectors.T, out=scores[start:stop])
+                scores[~self._live[:self._count]] = -np.inf
+                return [self._top(np.arange(self._count), scores[:, i], top_k) for i in range(len(queries))]
+            return [self._search_ivf(vector, top_k) for vector in vectors]
+
+    def build_ivf(self, nlist: Optional[int] = None, iterations: int = 10, seed: int = 0) -> None:
+        """
+        用球面 k-means 聚类并按簇重排矩阵
+
+        Args:
+            nlist (Optional[int]): 簇数量，默认使用初始化时的 nlist
+            iterations (int): k-means 迭代次数
+            seed (int): 初始簇中心的随机种子
+        """
+        with self._lock:
+            self.compact()
+            count = self._count
+            nlist = min(nlist or self.nlist, count)
+            if nlist < 1:
+                return
+            data = self._matrix[:count]
+            rng = np.random.default_rng(seed)
+            centroids = data[rng.choice(count, nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assign = self._assign(data, centroids)
+                counts = np.bincount(assign, minlength=nlist)
+                order = np.argsort(assign, kind="stable")
+                starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+                nonempty = counts > 0
+                # 空簇保留原来的中心
+                sums = np.add.reduceat(data[order], starts[nonempty], axis=0)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                centroids[nonempty] = np.divide(sums, norms, out=np.zeros_like(sums), where=norms > 0)
+
+            assign = self._assign(data, centroids)
+            order = np.argsort(assign, kind="stable")
+            self._matrix = np.ascontiguousarray(data[order])
+            self._ids = [self._ids[row] for row in order]
+            self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            self._live = np.ones(count, dtype=bool)
+            self._centroids = centroids
+            self._offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=nlist))))
+            self._clustered = count
+
+    def compact(self) -> None:
+        """
+        清理已删除文档占用的行，聚类结构保持不变
+        """
+        with self._lock:
+            live = self._live[:self._count]
+            if live.all():
+                return
+            keep = np.flatnonzero(live)
+            if self._centroids is not None:
+                clusters = np.repeat(np.arange(len(self._centroids)), np.diff(self._offsets))
+                kept = keep[keep < self._clustered]
+                self._offsets = np.concatenate(
+                    ([0], np.cumsum(np.bincount(clusters[kept], minlength=len(self._centroids)))))
+                self._clustered = len(kept)
+            self._matrix = self._matrix[keep]
+            self._ids = [self._ids[row] for row in keep]
+            self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            self._live = np.ones(len(keep), dtype=bool)
+            self._count = len(keep)
+
+    def save(self) -> None:
+        """
+        持久化到 directory：矩阵以 .npy 格式写出，下次打开时可直接内存映射
+        """
+        if not self.directory:
+            raise ValueError("未设置向量索引目录")
+        with self._lock:
+            self.compact()
+            os.makedirs(self.directory, exist_ok=True)
+            self._write_array(self.VECTORS, self._matrix[:self._count])
+            if self._centroids is not None:
+                self._write_array(self.CENTROIDS, self._centroids)
+            self.embedder.save(self.directory)
+            meta = {
+                "fields": list(self.fields),
+                "dim": self.embedder.dim,
+                "ids": self._ids,
+                "documents": self.documents,
+                "offsets": self._offsets.tolist() if self._centroids is not None else None,
+                "clustered": self._clustered,
+            }
+            path = os.path.join(self.directory, self.META)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+
+    def _write_array(self, name: str, array: np.ndarray) -> None:
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(path + ".tmp", path)
+
+    def _load(self) -> None:
+        with open(os.path.join(self.directory, self.META), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        stored_fields = tuple(meta["fields"])
+        if stored_fields != self.fields or meta["dim"] != self.embedder.dim:
+            raise ValueError(f"向量索引目录 {self.directory} 的字段为 {stored_fields}、维度为 {meta['dim']}，"
+                             f"与指定的 {self.fields}、{self.embedder.dim} 不一致")
+        self.embedder.load(self.directory)
+        # 只读映射，写入前由 _reserve 复制到内存
+        self._matrix = np.load(os.path.join(self.directory, self.VECTORS), mmap_mode="r")
+        self._count = len(self._matrix)
+        self._live = np.ones(self._count, dtype=bool)
+        self._ids = meta["ids"]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self.documents = meta["documents"]
+        if meta["offsets"] is not None:
+            self._centroids = np.load(os.path.join(self.directory, self.CENTROIDS))
+            self._offsets = np.asarray(meta["offsets"], dtype=np.int64)
+            self._clustered = meta["clustered"]
+
+    def _reserve(self, rows: int) -> None:
+        """
+        确保矩阵至少有 rows 行且可写，容量按倍数增长
+        """
+        if rows <= len(self._matrix) and self._matrix.flags.writeable:
+            return
+        capacity = max(rows, 2 * len(self._matrix), 64)
+        matrix = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        matrix[:self._count] = self._matrix[:self._count]
+        live = np.zeros(capacity, dtype=bool)
+        live[:self._count] = self._live[:self._count]
+        self._matrix, self._live = matrix, live
+
+    def _discard(self, doc_id: str) -> None:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return
+        self._live[row] = False
+        self._ids[row] = None
+        del self.documents[doc_id]
+
+    def _blocks(self, start: int, stop: int) -> Iterator[Tuple[int, int]]:
+        for begin in range(start, stop, self.block_rows):
+            yield begin, min(begin + self.block_rows, stop)
+
+    def _assign(self, data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assign = np.empty(len(data), dtype=np.int64)
+        for start, stop in self._blocks(0, len(data)):
+            assign[start:stop] = np.argmax(data[start:stop] @ centroids.T, axis=1)
+        return assign
+
+    def _search_ivf(self, vector: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        centroid_scores = self._centroids @ vector
+        nprobe = min(self.nprobe, len(centroid_scores))
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        rows = np.concatenate([np.arange(self._offsets[c], self._offsets[c + 1]) for c in probes] +
+                              [np.arange(self._clustered, self._count)])
+        rows = rows[self._live[rows]]
+        return self._top(rows, self._matrix[rows] @ vector, top_k)
+
+    def _top(self, rows: np.ndarray, scores: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        if top_k < 1:
+            return []
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self._ids[rows[i]], float(scores[i])) for i in best if scores[i] > 0]
\ No newline at end of file
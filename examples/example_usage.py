@@ -2,6 +2,8 @@ from agents.weather_agent import WeatherAgent
 from agents.data_analyst_agent import DataAnalystAgent
 from agents.learning_assistant_agent import LearningAssistantAgent
 from agents.customer_service_agent import CustomerServiceAgent
+from agents.orchestrator_agent import OrchestratorAgent
+from core import instrumentation
 from core.config import Config
 
 
@@ -115,6 +117,58 @@ def example_customer_service_agent():
         print(f"Agent: {response}")
 
 
+def example_orchestrator_agent():
+    """
+    编排 Agent 示例
+    """
+    print("\n=== 编排 Agent 示例 ===")
+    
+    # 创建配置
+    config = Config({
+        "model": "qwen-plus",
+        "temperature": 0.7
+    })
+    
+    # 创建编排 Agent，由它把请求转交给合适的 Agent
+    orchestrator = OrchestratorAgent(config)
+    orchestrator.current_user_id = "user123"  # 模拟用户ID
+    
+    # 单一请求转交给一个 Agent，复合请求并发交给多个 Agent 后合并结果
+    queries = [
+        "北京的天气怎么样？",
+        "上海的天气怎么样？顺便查一下订单 ORD001",
+    ]
+    
+    for query in queries:
+        print(f"\n用户: {query}")
+        response = orchestrator.get_response(query)
+        print(f"Agent: {response}")
+    orchestrator.close()
+
+
+def example_instrumentation():
+    """
+    埋点示例
+    """
+    print("\n=== 埋点示例 ===")
+    
+    # 启用埋点：span 保留在内存中，指标按 Prometheus 文本格式输出
+    spans = instrumentation.InMemoryExporter()
+    prometheus = instrumentation.PrometheusExporter()
+    instrumentation.enable([spans, prometheus])
+    
+    service_agent = CustomerServiceAgent(Config({"model": "qwen-plus"}))
+    service_agent.get_response("我想查询订单 ORD001 的状态", user_id="user123")
+    
+    # 各阶段耗时：意图识别、实体抽取、工具调用、格式化
+    for span in spans.spans:
+        print(f"{span.name:<20}{span.label or '':<24}{span.duration_ns / 1000:>10.1f} us")
+    
+    # 关闭埋点时导出最后一次指标
+    instrumentation.disable()
+    print(prometheus.text.splitlines()[2])
+
+
 def example_config_usage():
     """
     配置使用示例
@@ -145,4 +199,6 @@ if __name__ == "__main__":
     example_data_analyst_agent()
     example_learning_assistant_agent()
     example_customer_service_agent()
+    example_orchestrator_agent()
+    example_instrumentation()
     example_config_usage()
\ No newline at end of file
@@ -1,14 +1,37 @@
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 from agents.weather_agent import WeatherAgent
 from agents.data_analyst_agent import DataAnalystAgent
 from agents.learning_assistant_agent import LearningAssistantAgent
 from agents.customer_service_agent import CustomerServiceAgent
+from agents.orchestrator_agent import Branch, OrchestratorAgent
+from core import instrumentation
 from core.config import Config
 from tools.weather_tool import WeatherTool
+import tools.weather_tool as weather_tool
 from tools.data_analysis_tool import DataAnalysisTool
+import tools.data_analysis_tool as data_analysis_tool
+from core.frame_cache import FrameCache
+from core.streaming_stats import StreamingSummary
+from core.columnar import pyarrow_available, read_columns
+import pandas as pd
 from tools.learning_tool import LearningResourceTool
 from tools.customer_service_tool import CustomerInfoTool
 from tools.knowledge_base_tool import KnowledgeBaseTool
+from core.disk_index import SegmentedIndex
+from core.llm import close_clients
+from core.mock_llm import MockLLMServer
 
 
 class TestWeatherAgent(unittest.TestCase):
@@ -46,6 +69,14 @@ class TestWeatherAgent(unittest.TestCase):
         result = self.agent.process_request("今天天气好吗？")
         self.assertIn("城市", result)
 
+    def test_recall_city_from_session(self):
+        """
+        测试没有提供城市时沿用本会话上一次查询的城市
+        """
+        self.agent.get_response("北京的天气怎么样？", session_id="u1")
+        self.assertIn("北京", self.agent.get_response("今天天气好吗？", session_id="u1"))
+        self.assertIn("城市", self.agent.get_response("今天天气好吗？", session_id="u2"))
+
 
 class TestDataAnalystAgent(unittest.TestCase):
     """
@@ -143,6 +174,230 @@ class TestWeatherTool(unittest.TestCase):
         self.assertIn("天气", result)
 
 
+class StubWeatherHandler(BaseHTTPRequestHandler):
+    """
+    本地天气服务桩，返回 OpenWeatherMap 格式的数据并记录请求次数
+    """
+    requests_seen = []
+    delay = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        city = parse_qs(url.query)["q"][0]
+        self.requests_seen.append(city)
+        time.sleep(self.delay)
+        if city == "故障城市":
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = {
+            "weather": [{"description": "多云"}],
+            "main": {"temp": 18.5, "humidity": 40},
+            "wind": {"speed": 2},
+        }
+        if url.path == "/bulk":
+            data = {"list": [data for _ in city.split(",")]}
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestWeatherToolClient(unittest.TestCase):
+    """
+    天气工具真实客户端模式测试类（使用本地 HTTP 桩服务）
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubWeatherHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/weather"
+        cls.bulk_url = f"http://127.0.0.1:{cls.server.server_port}/bulk"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        StubWeatherHandler.requests_seen = []
+        StubWeatherHandler.delay = 0
+        self.tool = WeatherTool(api_url=self.url, api_key="test", retries=0)
+
+    def test_fetch_and_cache(self):
+        """
+        测试请求真实接口，并对规范化后的城市名命中缓存
+        """
+        result = self.tool.execute({"city": "北京"})
+        self.assertEqual(result, "北京当前天气：多云，温度18.5°C，湿度40%，风速2m/s。")
+        self.tool.execute({"city": "北京"})
+        self.tool.execute({"city": " 北京市 "})
+        self.assertEqual(StubWeatherHandler.requests_seen, ["北京"])
+
+    def test_reply_uses_caller_spelling(self):
+        """
+        测试上游收到去除空白的城市名，缓存命中时回复使用各自调用方的写法
+        """
+        self.assertTrue(self.tool.execute({"city": " 北京市 "}).startswith("北京市当前天气"))
+        self.assertTrue(self.tool.execute({"city": "北京"}).startswith("北京当前天气"))
+        self.assertEqual(StubWeatherHandler.requests_seen, ["北京市"])
+
+    def test_agent_client_config(self):
+        """
+        测试通过配置设置天气客户端的超时、重试与连接池
+        """
+        agent = WeatherAgent(Config({
+            "weather_api_url": self.url, "weather_timeout": 1, "weather_retries": 0, "weather_pool_size": 4,
+        }))
+        tool = agent.tools[0]
+        self.assertEqual((tool.timeout, tool.retries, tool.pool_size), (1, 0, 4))
+        self.assertIn("多云", agent.process_request("杭州的天气"))
+
+    def test_stale_while_revalidate(self):
+        """
+        测试缓存过期后先返回旧值并在后台刷新
+        """
+        tool = WeatherTool(api_url=self.url, retries=0, cache_ttl=0, stale_ttl=60)
+        first = tool.execute({"city": "上海"})
+        self.assertEqual(tool.execute({"city": "上海"}), first)
+        for _ in range(100):
+            if len(StubWeatherHandler.requests_seen) == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(StubWeatherHandler.requests_seen, ["上海", "上海"])
+
+    def test_http_error(self):
+        """
+        测试接口返回错误
+        """
+        result = self.tool.execute({"city": "故障城市"})
+        self.assertIn("出错", result)
+
+    def test_concurrent_requests_coalesced(self):
+        """
+        测试同一城市的并发请求只向上游发起一次
+        """
+        StubWeatherHandler.delay = 0.2
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.tool.execute({"city": "广州"})))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(StubWeatherHandler.requests_seen, ["广州"])
+        self.assertEqual(len(set(results)), 1)
+
+    def test_execute_many_bulk(self):
+        """
+        测试批量查询合并为一次批量请求，并复用缓存
+        """
+        tool = WeatherTool(api_url=self.url, bulk_url=self.bulk_url, retries=0)
+        tool.execute({"city": "北京"})
+        results = tool.execute_many(["北京", "上海", "深圳", "上海市"])
+        self.assertEqual(StubWeatherHandler.requests_seen, ["北京", "上海,深圳"])
+        self.assertEqual(set(results), {"北京", "上海", "深圳", "上海市"})
+        self.assertIn("深圳当前天气", results["深圳"])
+
+    def test_shared_executor_and_refresh_skip(self):
+        """
+        测试所有工具共享同一个上游请求线程池，已有请求在进行时不再提交刷新任务
+        """
+        other = WeatherTool(api_url=self.url, retries=0)
+        self.tool.execute_many(["北京"])
+        other.execute_many(["上海"])
+        self.assertIsNotNone(weather_tool._fetch_executor)
+
+        self.tool._flights.acquire("南京")
+        with mock.patch.object(weather_tool, "_get_fetch_executor") as get_executor:
+            self.tool._refresh_in_background("南京", "南京")
+        get_executor.assert_not_called()
+        self.tool._flights.release("南京", {})
+
+        weather_tool.close()
+        self.assertIsNone(weather_tool._fetch_executor)
+        self.assertIn("杭州当前天气", self.tool.execute_many(["杭州"])["杭州"])
+
+    def test_execute_many_without_bulk(self):
+        """
+        测试未配置批量接口时逐个城市并发请求，失败的城市单独返回错误
+        """
+        results = self.tool.execute_many(["杭州", "成都", "故障城市"])
+        self.assertCountEqual(StubWeatherHandler.requests_seen, ["杭州", "成都", "故障城市"])
+        self.assertIn("杭州当前天气", results["杭州"])
+        self.assertIn("出错", results["故障城市"])
+
+
+class TestStartup(unittest.TestCase):
+    """
+    启动开销测试类
+    """
+
+    def test_heavy_dependencies_not_imported(self):
+        """
+        测试导入并创建全部 Agent 时不导入 pandas、matplotlib、requests 等重量级依赖，也不构造工具
+        """
+        script = (
+            "import sys\n"
+            "from core.config import Config\n"
+            "from agents.weather_agent import WeatherAgent\n"
+            "from agents.data_analyst_agent import DataAnalystAgent\n"
+            "from agents.learning_assistant_agent import LearningAssistantAgent\n"
+            "from agents.customer_service_agent import CustomerServiceAgent\n"
+            "for cls in (WeatherAgent, DataAnalystAgent, LearningAssistantAgent, CustomerServiceAgent):\n"
+            "    cls(Config())\n"
+            "print(sorted(m for m in ('numpy', 'pandas', 'matplotlib', 'requests', 'urllib3', 'asyncio')"
+            " if m in sys.modules))\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True,
+                                check=True, env=dict(os.environ, PYTHONPATH=root)).stdout
+        self.assertEqual(output.strip(), "[]")
+
+    def test_tool_constructed_on_first_use(self):
+        """
+        测试工具在首次使用时才构造，配置相同的 Agent 共享同一个工具实例
+        """
+        class CountingTool(WeatherTool):
+            instances = 0
+
+            def __init__(self, **kwargs):
+                CountingTool.instances += 1
+                super().__init__(**kwargs)
+
+        with mock.patch("agents.weather_agent.WeatherTool", CountingTool):
+            first = WeatherAgent(Config())
+            second = WeatherAgent(Config())
+            self.assertEqual(CountingTool.instances, 0)
+            tool = first.get_tool("weather")
+            self.assertIs(second.get_tool("weather"), tool)
+            self.assertIs(first.tools[0], tool)
+        self.assertEqual(CountingTool.instances, 1)
+
+    def test_stateful_tools_not_shared(self):
+        """
+        测试有可变状态的工具不在 Agent 之间共享，一个 Agent 新增的知识库条目对另一个不可见
+        """
+        first = CustomerServiceAgent(Config())
+        second = CustomerServiceAgent(Config())
+        self.assertIsNot(first.get_tool("knowledge_base"), second.get_tool("knowledge_base"))
+        self.assertIsNot(first.get_tool("customer_info"), second.get_tool("customer_info"))
+        first.get_tool("knowledge_base").add_entry("发票", {"title": "发票开具", "content": "订单完成后可在线申请发票"})
+        self.assertIn("在线申请发票", first.get_tool("knowledge_base").execute({"query": "怎么开发票"}))
+        self.assertNotIn("在线申请发票", second.get_tool("knowledge_base").execute({"query": "怎么开发票"}))
+
 class TestDataAnalysisTool(unittest.TestCase):
     """
     数据分析工具测试类
@@ -170,6 +425,228 @@ class TestDataAnalysisTool(unittest.TestCase):
         self.assertIn("路径", result)
 
 
+class TestDataAnalysisCache(unittest.TestCase):
+    """
+    数据分析缓存测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.directory = tempfile.mkdtemp()
+        self.data_path = os.path.join(self.directory, "sales.csv")
+        with open(self.data_path, "w", encoding="utf-8") as f:
+            f.write("price,amount,region\n1,10,north\n2,20,south\n3,35,north\n")
+        # 这里覆盖 pandas 整体读取 CSV 的路径，不转换为 Arrow 缓存
+        self.tool = DataAnalysisTool(frame_cache=FrameCache(), arrow_cache_dir=None)
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        # 等待后台渲染结束后再删除目录
+        self.tool.chart_renderer.close()
+        shutil.rmtree(self.directory)
+
+    def test_repeat_query_uses_cache(self):
+        """
+        测试文件未变化时重复查询不再读取文件
+        """
+        with mock.patch("tools.data_analysis_tool.pd.read_csv", wraps=pd.read_csv) as read_csv:
+            first = self.tool.execute({"data_path": self.data_path})
+            second = self.tool.execute({"data_path": self.data_path, "query": "统计"})
+        self.assertEqual(read_csv.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertIn("数值列相关性", first)
+
+    def test_modified_file_reloaded(self):
+        """
+        测试文件变化后重新读取
+        """
+        self.tool.execute({"data_path": self.data_path})
+        with open(self.data_path, "a", encoding="utf-8") as f:
+            f.write("4,40,south\n")
+        result = self.tool.execute({"data_path": self.data_path})
+        self.assertIn("(4, 3)", result)
+        self.assertEqual(len(self.tool.frame_cache), 1)
+
+    def test_streaming_mode(self):
+        """
+        测试分块流式分析的报告与整体读取一致，且不整体载入文件
+        """
+        tool = DataAnalysisTool(frame_cache=FrameCache(), chunk_size=2, arrow_cache_dir=None)
+        expected = self.tool.execute({"data_path": self.data_path, "query": "画图"})
+        with mock.patch.object(DataAnalysisTool, "_loader", return_value=mock.Mock()) as loader:
+            streamed = tool.execute({"data_path": self.data_path, "query": "画图", "stream": True})
+        loader.return_value.assert_not_called()
+        self.assertEqual(streamed, expected)
+        self.assertIn("_chart.png", streamed)
+
+
+    def test_chart_cache(self):
+        """
+        测试图表在后台渲染，相同数据的重复请求不再调用 matplotlib，数据变化后重新渲染
+        """
+        first = self.tool.execute({"data_path": self.data_path, "query": "画图", "wait_chart": True})
+        chart_path = os.path.join(self.directory, "sales_chart.png")
+        self.assertIn(f"已生成图表并保存至: {chart_path}", first)
+        self.assertTrue(os.path.exists(chart_path))
+        with mock.patch("matplotlib.figure.Figure") as figure:
+            self.assertEqual(self.tool.execute({"data_path": self.data_path, "query": "画图"}), first)
+        figure.assert_not_called()
+
+        with open(self.data_path, "a", encoding="utf-8") as f:
+            f.write("4,40,south\n")
+        with mock.patch.object(self.tool.chart_renderer, "_render", return_value=chart_path) as render:
+            result = self.tool.execute({"data_path": self.data_path, "query": "画图"})
+            # 关闭渲染线程池会等待后台渲染结束
+            self.tool.chart_renderer.close()
+        self.assertIn(f"图表正在后台生成，完成后保存至: {chart_path}", result)
+        render.assert_called_once()
+
+class TestMultiFileAnalysis(unittest.TestCase):
+    """
+    多文件分析测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.directory = tempfile.mkdtemp()
+        self.shards = os.path.join(self.directory, "shards")
+        os.makedirs(self.shards)
+        frame = pd.DataFrame({"price": [1.5, 2, 3, 4, 8, 13], "amount": [10, 20, 35, 30, None, 70],
+                              "region": ["north", "south", "north", "east", "south", "north"]})
+        self.frame = frame
+        for day, rows in enumerate((slice(0, 2), slice(2, 5), slice(5, 6))):
+            frame[rows].to_csv(os.path.join(self.shards, f"day{day}.csv"), index=False)
+        # 不支持的文件被忽略
+        with open(os.path.join(self.shards, "notes.txt"), "w", encoding="utf-8") as f:
+            f.write("ignored")
+        self.tool = DataAnalysisTool(frame_cache=FrameCache())
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        data_analysis_tool.close()
+        self.tool.chart_renderer.close()
+        shutil.rmtree(self.directory)
+
+    def test_merged_statistics(self):
+        """
+        测试目录下各分片的统计结果在进程池中计算并合并，与整体数据一致
+        """
+        result = self.tool.execute({"data_path": self.shards, "query": "画图", "wait_chart": True})
+        self.assertIn("共 3 个文件", result)
+        self.assertIn("(6, 3)", result)
+        self.assertIn("['price', 'amount', 'region']", result)
+        self.assertTrue(os.path.exists(os.path.join(self.shards, "merged_chart.png")))
+
+        entries = self.tool._file_summaries(self.tool._expand(self.shards))
+        summary = StreamingSummary()
+        for entry in entries:
+            summary.merge(entry.frame)
+        numeric = self.frame[["price", "amount"]]
+        pd.testing.assert_frame_equal(summary.describe(), numeric.describe())
+        pd.testing.assert_frame_equal(summary.corr(), numeric.corr())
+
+    def test_glob_and_cache(self):
+        """
+        测试通配符匹配，文件未变化时复用各分片的部分统计量
+        """
+        pattern = os.path.join(self.shards, "day[01].csv")
+        first = self.tool.execute({"data_path": pattern})
+        self.assertIn("共 2 个文件", first)
+        self.assertIn("(5, 3)", first)
+        with mock.patch.object(data_analysis_tool, "summarize_file") as summarize:
+            self.assertEqual(self.tool.execute({"data_path": pattern}), first)
+        summarize.assert_not_called()
+
+        empty = self.tool.execute({"data_path": os.path.join(self.shards, "*.json")})
+        self.assertIn("没有支持的数据文件", empty)
+
+    def test_agent_directory(self):
+        """
+        测试数据分析 Agent 识别以 / 结尾的目录
+        """
+        agent = DataAnalystAgent(Config())
+        response = agent.process_request(f"分析 {self.shards}/ 下的数据")
+        self.assertIn("共 3 个文件", response)
+
+
+class TestColumnarIngest(unittest.TestCase):
+    """
+    列式文件读取测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.directory = tempfile.mkdtemp()
+        self.frame = pd.DataFrame({"price": [1, 2, 3], "amount": [10, 20, 35], "region": ["north", "south", "north"]})
+        self.csv_path = os.path.join(self.directory, "sales.csv")
+        self.frame.to_csv(self.csv_path, index=False)
+        self.cache_dir = os.path.join(self.directory, "arrow")
+        self.tool = DataAnalysisTool(frame_cache=FrameCache(), arrow_cache_dir=self.cache_dir)
+        self.expected = DataAnalysisTool(frame_cache=FrameCache(), arrow_cache_dir=None).execute(
+            {"data_path": self.csv_path}).split("\n", 1)[1]
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        shutil.rmtree(self.directory)
+
+    @unittest.skipIf(pyarrow_available(), "已安装 pyarrow")
+    def test_missing_pyarrow(self):
+        """
+        测试未安装 pyarrow 时列式文件给出明确提示，CSV 仍用 pandas 读取
+        """
+        path = os.path.join(self.directory, "sales.parquet")
+        open(path, "wb").close()
+        self.assertIn("需要安装 pyarrow", self.tool.execute({"data_path": path}))
+        self.assertTrue(self.tool.execute({"data_path": self.csv_path}).endswith(self.expected))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    @unittest.skipUnless(pyarrow_available(), "未安装 pyarrow")
+    def test_columnar_formats(self):
+        """
+        测试 Parquet / Feather 只读取数值列，报告与 CSV 一致
+        """
+        for name, write in (("sales.parquet", self.frame.to_parquet), ("sales.feather", self.frame.to_feather)):
+            path = os.path.join(self.directory, name)
+            write(path)
+            with mock.patch("tools.data_analysis_tool.read_columns", wraps=read_columns) as reader:
+                result = self.tool.execute({"data_path": path})
+            reader.assert_called_once_with(path, ["price", "amount"])
+            self.assertTrue(result.endswith(self.expected), name)
+
+    @unittest.skipUnless(pyarrow_available(), "未安装 pyarrow")
+    def test_csv_converted_once(self):
+        """
+        测试 CSV 首次访问时转换为 Arrow 缓存文件，之后不再解析 CSV
+        """
+        result = self.tool.execute({"data_path": self.csv_path})
+        self.assertTrue(result.endswith(self.expected))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        with mock.patch("pyarrow.csv.open_csv") as convert, \
+                mock.patch("tools.data_analysis_tool.pd.read_csv") as read_csv:
+            tool = DataAnalysisTool(frame_cache=FrameCache(), arrow_cache_dir=self.cache_dir)
+            self.assertEqual(tool.execute({"data_path": self.csv_path}), result)
+        convert.assert_not_called()
+        read_csv.assert_not_called()
+
+        # CSV 变化后重新转换并删除旧的缓存文件
+        with open(self.csv_path, "a", encoding="utf-8") as f:
+            f.write("4,40,south\n")
+        self.assertIn("(4, 3)", self.tool.execute({"data_path": self.csv_path}))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+
 class TestLearningResourceTool(unittest.TestCase):
     """
     学习资源工具测试类
@@ -204,6 +681,15 @@ class TestLearningResourceTool(unittest.TestCase):
         self.assertIn("Python", result)
         self.assertTrue("题" in result or "question" in result.lower())
 
+    def test_unknown_subject(self):
+        """
+        测试未知主题时列出可用主题，结构化模式返回主题列表
+        """
+        result = self.tool.execute({"query": "推荐资源", "subject": "rust"})
+        self.assertEqual(result, "抱歉，没有找到关于 rust 的资源。我们当前提供以下主题的学习资源：\n- python\n- ai\n- web\n")
+        result = self.tool.execute({"query": "练习题", "subject": "web", "structured": True})
+        self.assertEqual(result, {"subject": "web", "topics": ["python", "ai"]})
+
 
 class TestCustomerServiceAgent(unittest.TestCase):
     """
@@ -245,6 +731,15 @@ class TestCustomerServiceAgent(unittest.TestCase):
         # 测试是否返回了用户信息的某些字段
         self.assertTrue("姓名" in result or "邮箱" in result or "手机号" in result)
 
+    def test_guest_order_query(self):
+        """
+        测试未知用户只凭订单号查询订单，已知用户仍只能查询自己的订单
+        """
+        result = self.agent.process_request("我想查询订单 ORD003 的状态")
+        self.assertIn("蓝牙音箱", result)
+        self.agent.current_user_id = "user123"
+        self.assertIn("未找到", self.agent.process_request("我想查询订单 ORD003 的状态"))
+
 
 class TestCustomerInfoTool(unittest.TestCase):
     """
@@ -280,6 +775,33 @@ class TestCustomerInfoTool(unittest.TestCase):
         self.assertIn("ORD001", result)
         self.assertIn("无线耳机", result)
 
+    def test_structured_result(self):
+        """
+        测试结构化结果模式返回字典
+        """
+        result = self.tool.execute({"query_type": "order", "order_id": "ORD001", "user_id": "user123",
+                                    "structured": True})
+        self.assertEqual(result["order_id"], "ORD001")
+        self.assertEqual(result["product"], "无线耳机")
+        profile = self.tool.execute({"query_type": "profile", "user_id": "user123", "structured": True})
+        self.assertEqual((profile["name"], profile["order_count"]), ("张三", 2))
+        self.assertIn("error", self.tool.execute({"query_type": "profile", "user_id": "nobody", "structured": True}))
+
+    def test_order_index_follows_updates(self):
+        """
+        测试订单号索引随订单新增和转移保持一致
+        """
+        store = self.tool.store
+        store.upsert_order("user456", "ORD009", product="键盘", status="处理中")
+        self.assertEqual(store.find_order("ORD009")[0], "user456")
+        self.assertIn("键盘", self.tool.execute({"query_type": "order", "order_id": "ORD009"}))
+        self.assertEqual(store.get_customer("user123")["order_count"], 2)
+
+        store.upsert_order("user456", "ORD001", product="无线耳机", status="已退货")
+        self.assertEqual(store.find_order("ORD001"), ("user456", store.get_order("user456", "ORD001")))
+        self.assertEqual(store.get_customer("user123")["order_count"], 1)
+        self.assertIsNone(store.find_order("ORD404"))
+
 
 class TestKnowledgeBaseTool(unittest.TestCase):
     """
@@ -315,6 +837,510 @@ class TestKnowledgeBaseTool(unittest.TestCase):
         # 检查是否返回了配送相关信息
         self.assertTrue("配送" in result or "delivery" in result.lower() or "时间" in result)
 
+    def test_synonym_query(self):
+        """
+        测试通过同义词检索条目
+        """
+        result = self.tool.execute({"query": "怎么退款"})
+        self.assertIn("1. 退货政策", result)
+        self.assertNotIn("配送时间", result)
+
+    def test_single_character_keyword(self):
+        """
+        测试单字关键词也能命中查询中的多字片段
+        """
+        result = self.tool.execute({"query": "几天能到"})
+        self.assertIn("1. 配送时间", result)
+
+    def test_no_match(self):
+        """
+        测试没有匹配条目时返回主题列表
+        """
+        result = self.tool.execute({"query": "心情不错"})
+        self.assertIn("抱歉", result)
+        self.assertIn("支付方式", result)
+
+    def test_structured_result(self):
+        """
+        测试结构化结果模式返回匹配条目或主题列表
+        """
+        result = self.tool.execute({"query": "退货政策", "structured": True})
+        self.assertEqual(result["items"][0]["title"], "退货政策")
+        result = self.tool.execute({"query": "心情不错", "structured": True})
+        self.assertEqual(result["items"], [])
+        self.assertIn("支付方式", result["topics"])
+
+    def test_add_and_remove_entry(self):
+        """
+        测试增量维护知识库条目
+        """
+        self.tool.add_entry("发票", {"title": "发票开具", "content": "下单后可在订单详情页申请电子发票。"})
+        self.assertIn("电子发票", self.tool.execute({"query": "怎么开发票"}))
+        self.tool.remove_entry("发票")
+        self.assertNotIn("电子发票", self.tool.execute({"query": "怎么开发票"}))
+
+    def test_vector_fallback(self):
+        """
+        测试关键词没有命中时退回向量检索，关闭向量检索时返回主题列表
+        """
+        self.assertIn("1. 产品保修", self.tool.execute({"query": "坏了能修吗"}))
+        self.assertIn("抱歉", KnowledgeBaseTool(vector_search=False).execute({"query": "坏了能修吗"}))
+        self.tool.add_entry("发票", {"title": "发票开具", "content": "下单后可在订单详情页申请电子发票。"})
+        self.assertIn("发票开具", self.tool.execute({"query": "能给我开票吗"}))
+
+    def test_persistent_index(self):
+        """
+        测试磁盘持久化索引同样检索同义词，且重启后直接复用
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            agent = CustomerServiceAgent(Config({"kb_index_dir": directory}))
+            self.assertIn("1. 退货政策", agent.process_request("怎么退款"))
+            reopened = KnowledgeBaseTool(index_dir=directory)
+            self.assertIn("1. 退货政策", reopened.execute({"query": "怎么退款"}))
+            # 向量索引同样持久化，重启后以内存映射方式加载
+            self.assertFalse(reopened.vectors._matrix.flags.writeable)
+            self.assertIn("1. 产品保修", reopened.execute({"query": "坏了能修吗"}))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_index_fields_checked(self):
+        """
+        测试传入的索引字段与知识库不一致时报错
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            index = SegmentedIndex(os.path.join(directory, "index"), fields=("title", "content"))
+            with self.assertRaises(ValueError) as context:
+                KnowledgeBaseTool(index=index)
+            self.assertIn("知识库索引的字段", str(context.exception))
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestAsyncRuntime(unittest.TestCase):
+    """
+    异步运行时测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.config = Config({"model": "test", "temperature": 0.7})
+        self.agent = WeatherAgent(self.config)
+
+    def test_aget_response_concurrent_sessions(self):
+        """
+        测试同一个 Agent 实例并发处理多个会话，且会话历史互不干扰
+        """
+        cities = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安"] * 3
+
+        async def run():
+            queries = [self.agent.aget_response(f"{city}的天气", session_id=f"s{i}") for i, city in enumerate(cities)]
+            return await asyncio.gather(*queries)
+
+        results = asyncio.run(run())
+        for i, (city, result) in enumerate(zip(cities, results)):
+            self.assertIn(city, result)
+            history = list(self.agent.sessions.peek(f"s{i}").messages)
+            self.assertEqual([item.role for item in history], ["user", "assistant"])
+            self.assertEqual(history[0].content, f"{city}的天气")
+
+    def test_aget_response_user_per_session(self):
+        """
+        测试并发会话各自使用自己的用户ID
+        """
+        agent = CustomerServiceAgent(self.config)
+        users = [("user123", "张三"), ("user456", "李四")] * 10
+
+        async def run():
+            queries = [
+                agent.aget_response("查看我的个人信息", session_id=f"u{i}", user_id=user_id)
+                for i, (user_id, _) in enumerate(users)
+            ]
+            return await asyncio.gather(*queries)
+
+        for (user_id, name), result in zip(users, asyncio.run(run())):
+            self.assertIn(name, result)
+        self.assertIsNone(agent.current_user_id)
+        self.assertIn("guest", agent.get_response("查看我的个人信息", session_id="anonymous"))
+
+    def test_get_response_session(self):
+        """
+        测试同步接口的会话隔离
+        """
+        self.agent.get_response("北京的天气", session_id="a")
+        self.agent.get_response("上海的天气")
+        self.assertEqual(len(self.agent.sessions.peek("a").messages), 2)
+        self.assertEqual(self.agent.memory[0], {"role": "user", "content": "上海的天气"})
+        self.assertEqual(self.agent.history[1].role, "assistant")
+
+    def test_aexecute(self):
+        """
+        测试同步工具自动在线程池中异步执行
+        """
+        result = asyncio.run(WeatherTool().aexecute({"city": "北京"}))
+        self.assertIn("北京", result)
+
+
+class TestStreamingResponse(unittest.TestCase):
+    """
+    流式响应测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.config = Config({"model": "test", "temperature": 0.7})
+        self.agent = CustomerServiceAgent(self.config)
+
+    def test_stream_matches_response(self):
+        """
+        测试流式输出逐条输出知识库条目，拼接结果与 get_response 相同，并记入会话历史
+        """
+        query = "退货和配送问题怎么办"
+        chunks = list(self.agent.stream_response(query, session_id="stream"))
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual("".join(chunks), self.agent.get_response(query, session_id="plain"))
+        history = list(self.agent.sessions.peek("stream").messages)
+        self.assertEqual([item.content for item in history], [query, "".join(chunks)])
+
+    def test_max_length(self):
+        """
+        测试流式输出时限制长度，截断后不再生成后续片段
+        """
+        tool = self.agent.get_tool(KnowledgeBaseTool.name)
+        with mock.patch.object(tool.index, "get_document", wraps=tool.index.get_document) as get_document:
+            chunks = list(self.agent.stream_response("退货和配送问题怎么办", max_length=30))
+        self.assertEqual(get_document.call_count, 1)
+        self.assertEqual(chunks[-1], "\n[内容已截断]")
+        self.assertEqual(len("".join(chunks[:-1])), 30)
+
+    def test_astream_response(self):
+        """
+        测试异步流式输出使用各自的会话
+        """
+        async def run(session_id, user_id):
+            return [chunk async for chunk in self.agent.astream_response("查看我的个人信息", session_id=session_id,
+                                                                         user_id=user_id)]
+
+        async def main():
+            return await asyncio.gather(run("a", "user123"), run("b", "user456"))
+
+        first, second = asyncio.run(main())
+        self.assertIn("张三", "".join(first))
+        self.assertIn("李四", "".join(second))
+        self.assertEqual(self.agent.sessions.peek("b").user_id, "user456")
+        self.assertIsNone(self.agent.current_user_id)
+
+    def test_data_analysis_sections(self):
+        """
+        测试数据分析先输出标题，再输出统计报告和图表信息
+        """
+        directory = tempfile.mkdtemp()
+        data_path = os.path.join(directory, "sales.csv")
+        with open(data_path, "w", encoding="utf-8") as f:
+            f.write("price,amount\n1,10\n2,20\n")
+        tool = DataAnalysisTool(frame_cache=FrameCache(), arrow_cache_dir=None)
+        try:
+            chunks = tool.stream({"data_path": data_path, "query": "统计"})
+            self.assertEqual(next(chunks), f"数据文件 {data_path} 分析结果：\n")
+            self.assertIn("数值列统计", next(chunks))
+            self.assertEqual(list(chunks), [])
+            # 读取数据时出错，已输出的标题后追加错误提示
+            with open(data_path, "w", encoding="utf-8") as f:
+                f.write("")
+            chunks = list(tool.stream({"data_path": data_path}))
+            self.assertEqual(chunks[1], "\n错误：数据文件为空")
+            self.assertEqual(tool.execute({"data_path": data_path}), "错误：数据文件为空")
+        finally:
+            tool.chart_renderer.close()
+            shutil.rmtree(directory)
+
+
+class TestLLMFallback(unittest.TestCase):
+    """
+    大模型兜底测试类（使用本地服务替身）
+    """
+
+    @staticmethod
+    def respond(prompt):
+        if prompt.startswith("请判断用户输入属于以下哪一类意图"):
+            return "profile" if "我是谁" in prompt else "none"
+        return "模型回答"
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.server = MockLLMServer(responder=self.respond).start()
+        self.agent = CustomerServiceAgent(Config({"model": "qwen-plus", "llm_base_url": self.server.base_url,
+                                                    "llm_retries": 0}))
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        close_clients()
+        self.server.close()
+
+    def test_intent_fallback(self):
+        """
+        测试关键词未命中时由大模型判断意图
+        """
+        result = self.agent.get_response("我是谁", user_id="user123")
+        self.assertIn("张三", result)
+        # 关键词命中时不调用大模型
+        self.server.requests.clear()
+        self.agent.get_response("我的个人信息")
+        self.assertEqual(self.server.requests, [])
+
+    def test_answer_generation(self):
+        """
+        测试其他请求由大模型参考知识库生成回答，并记录 token 用量
+        """
+        self.assertEqual(self.agent.get_response("你们几点下班"), "模型回答")
+        self.assertEqual([path for path, _ in self.server.requests], ["/v1/chat/completions"] * 2)
+        self.assertGreater(self.agent.llm.metrics.snapshot()["completion_tokens"], 0)
+
+    def test_llm_unavailable(self):
+        """
+        测试大模型不可用时退回知识库检索结果
+        """
+        self.server.close()
+        result = self.agent.get_response("你们几点下班")
+        self.assertIn("抱歉", result)
+
+
+class TestAgentResponseCache(unittest.TestCase):
+    """
+    Agent 响应缓存测试类
+    """
+
+    def test_cached_response(self):
+        """
+        测试相同或近似的请求直接返回缓存的响应，不再调用工具
+        """
+        agent = CustomerServiceAgent(Config({"model": "test"}))
+        first = agent.get_response("我想了解退货政策是什么？")
+        self.assertIn("7天无理由退货", first)
+        with mock.patch.object(agent, "process_request") as process_request, \
+                mock.patch.object(agent, "stream_request") as stream_request:
+            self.assertEqual(agent.get_response("我想了解怎么退货"), first)
+            self.assertEqual("".join(agent.stream_response("我想了解一下退货的政策")), first)
+            self.assertEqual(agent.get_response("那我想了解退货政策"), first)
+        process_request.assert_not_called()
+        stream_request.assert_not_called()
+        stats = agent.response_cache.stats()
+        self.assertEqual((stats["exact_hits"], stats["similar_hits"]), (2, 1))
+
+    def test_user_scoped(self):
+        """
+        测试客服的缓存按用户隔离
+        """
+        agent = CustomerServiceAgent(Config({"model": "test"}))
+        self.assertIn("张三", agent.get_response("查看我的个人信息", user_id="user123"))
+        self.assertIn("李四", agent.get_response("查看我的个人信息", user_id="user456"))
+
+    def test_config(self):
+        """
+        测试按 Agent 类名配置有效期，0 表示不缓存
+        """
+        config = Config({"model": "test", "response_cache_ttl": {"WeatherAgent": 0, "LearningAssistantAgent": 30}})
+        self.assertIsNone(WeatherAgent(config).response_cache)
+        self.assertEqual(LearningAssistantAgent(config).response_cache.ttl, 30)
+        self.assertIsNone(DataAnalystAgent(Config({"model": "test"})).response_cache)
+        # 推荐和练习题随机挑选，默认不缓存
+        self.assertIsNone(LearningAssistantAgent(Config({"model": "test"})).response_cache)
+
+    def test_session_dependent_not_cached(self):
+        """
+        测试依赖会话上下文的请求不缓存，命中缓存时仍记住城市
+        """
+        agent = WeatherAgent(Config({"model": "test"}))
+        with mock.patch.object(agent, "process_request", return_value="北京：晴"):
+            agent.get_response("北京的天气怎么样？", session_id="u1")
+            agent.get_response("北京的天气怎么样？", session_id="u2")
+        self.assertEqual(agent.sessions.peek("u2").recall("city"), "北京")
+        self.assertEqual(len(agent.response_cache), 1)
+        with mock.patch.object(agent, "process_request", return_value="请提供城市") as process_request:
+            agent.get_response("今天天气好吗？", session_id="u3")
+            agent.get_response("今天天气好吗？", session_id="u3")
+        self.assertEqual(process_request.call_count, 2)
+
+
+class TestOrchestratorAgent(unittest.TestCase):
+    """
+    编排 Agent 测试类
+    """
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.agent = OrchestratorAgent(Config({"model": "test", "orchestrator_timeout": {"default": 1.0,
+                                                                                          "WeatherAgent": 0.3}}))
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        self.agent.close()
+
+    @staticmethod
+    def slow(delay, result):
+        def process_request(user_input):
+            time.sleep(delay)
+            return result
+        return process_request
+
+    def test_plan(self):
+        """
+        测试单一请求交给得分最高的 Agent，复合请求按子句拆成多个分支，都不相关时交给客服
+        """
+        self.assertEqual(self.agent.plan("北京的天气怎么样？"), [Branch("WeatherAgent", "北京的天气怎么样？")])
+        self.assertEqual(self.agent.plan("请分析数据，数据路径: sales.csv"),
+                         [Branch("DataAnalystAgent", "请分析数据，数据路径: sales.csv")])
+        self.assertEqual(self.agent.plan("北京的天气怎么样，还有订单 ORD001 到哪了"),
+                         [Branch("WeatherAgent", "北京的天气怎么样"), Branch("CustomerServiceAgent", "订单 ORD001 到哪了")])
+        self.assertEqual(self.agent.plan("你好"), [Branch("CustomerServiceAgent", "你好")])
+
+    def test_compound_response(self):
+        """
+        测试复合请求的各分支结果按子句顺序合并，并沿用会话的用户
+        """
+        result = self.agent.get_response("北京的天气怎么样？顺便查下订单 ORD001", user_id="user123")
+        weather, order = result.split("\n\n", 1)
+        self.assertIn("北京", weather)
+        self.assertIn("无线耳机", order)
+        # 学习助手随机挑选推荐的资源，只比较固定的开头
+        streamed = "".join(self.agent.stream_response("推荐一些Python学习资源"))
+        self.assertTrue(streamed.startswith("为您推荐以下python学习资源"))
+
+    def test_parallel_fan_out(self):
+        """
+        测试各分支并发执行，总耗时约等于最慢的分支
+        """
+        weather = self.agent.agents["WeatherAgent"]
+        service = self.agent.agents["CustomerServiceAgent"]
+        with mock.patch.object(weather, "process_request", self.slow(0.2, "天气结果")), \
+                mock.patch.object(service, "process_request", self.slow(0.2, "订单结果")):
+            start = time.perf_counter()
+            result = self.agent.get_response("上海的天气怎么样，订单 ORD002 呢")
+            elapsed = time.perf_counter() - start
+        self.assertEqual(result, "天气结果\n\n订单结果")
+        self.assertLess(elapsed, 0.35)
+
+    def test_branch_timeout(self):
+        """
+        测试超时的分支返回提示，不拖慢其他分支
+        """
+        weather = self.agent.agents["WeatherAgent"]
+        with mock.patch.object(weather, "process_request", self.slow(2.0, "天气结果")):
+            start = time.perf_counter()
+            result = self.agent.get_response("上海的天气怎么样，订单 ORD002 呢")
+            self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn("天气查询暂时没有响应", result)
+        self.assertIn("ORD002", result)
+
+    def test_async_timeout_cancels_branch(self):
+        """
+        测试异步处理时超时的分支被取消
+        """
+        weather = self.agent.agents["WeatherAgent"]
+        cancelled = []
+
+        async def aprocess_request(user_input):
+            try:
+                await asyncio.sleep(2.0)
+            except asyncio.CancelledError:
+                cancelled.append(user_input)
+                raise
+            return "天气结果"
+
+        with mock.patch.object(weather, "aprocess_request", aprocess_request):
+            result = asyncio.run(self.agent.aget_response("上海的天气怎么样，订单 ORD002 呢", user_id="user456"))
+        self.assertEqual(cancelled, ["上海的天气怎么样"])
+        self.assertIn("天气查询暂时没有响应", result)
+        self.assertIn("ORD002", result)
+
+
+class TestAgentInstrumentation(unittest.TestCase):
+    """
+    Agent 与工具埋点测试类
+    """
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.exporter = instrumentation.InMemoryExporter()
+        self.tracer = instrumentation.enable([self.exporter])
+        self.agent = CustomerServiceAgent(Config({"response_cache_ttl": 0}))
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        instrumentation.disable()
+
+    def test_get_response_spans(self):
+        """
+        测试一次请求记录意图识别、实体抽取、工具调用和格式化各阶段，且都挂在同一个请求之下
+        """
+        self.agent.get_response("我想查询订单 ORD001 的状态", user_id="user123")
+        root = self.exporter.find("agent.get_response", "CustomerServiceAgent")[0]
+        self.assertIsNone(root.parent_id)
+        names = {span.name for span in self.exporter.spans if span.trace_id == root.trace_id}
+        self.assertEqual(names, {"agent.get_response", "agent.route", "entities.extract", "tool.execute",
+                                 "tool.format"})
+        execute = self.exporter.find("tool.execute", "customer_info")[0]
+        self.assertEqual(execute.parent_id, root.span_id)
+        self.assertEqual(self.exporter.find("tool.format")[0].label, "customer_info")
+        self.assertLessEqual(execute.duration_ns, root.duration_ns)
+
+    def test_per_tool_counters(self):
+        """
+        测试按工具统计调用次数和耗时直方图，出错的调用单独计数
+        """
+        for _ in range(3):
+            self.agent.get_response("我想查询订单 ORD001 的状态", user_id="user123")
+        self.agent.get_response("退货政策是什么")
+        stats = self.tracer.metrics.get("tool.execute", "customer_info")
+        self.assertEqual((stats.calls, stats.errors, stats.histogram.count), (3, 0, 3))
+        self.assertEqual(self.tracer.metrics.get("tool.stream", "knowledge_base").calls, 1)
+        self.assertEqual(self.tracer.metrics.get("agent.get_response", "CustomerServiceAgent").calls, 4)
+
+        tool = self.agent.get_tool("customer_info")
+        with mock.patch.object(tool.store, "get_order", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                self.agent.get_response("我想查询订单 ORD001 的状态", user_id="user123")
+        stats = self.tracer.metrics.get("tool.execute", "customer_info")
+        self.assertEqual((stats.calls, stats.errors), (4, 1))
+        self.assertEqual(self.tracer.metrics.get("agent.get_response", "CustomerServiceAgent").errors, 1)
+
+    def test_stream_and_async(self):
+        """
+        测试流式输出记录 tool.stream，异步请求与同步请求记录相同的阶段
+        """
+        "".join(self.agent.stream_response("退货政策是什么"))
+        self.assertEqual(len(self.exporter.find("tool.stream", "knowledge_base")), 1)
+
+        self.exporter.clear()
+        asyncio.run(self.agent.aget_response("我想查询订单 ORD001 的状态", user_id="user123"))
+        root = self.exporter.find("agent.get_response")[0]
+        self.assertEqual(self.exporter.find("tool.execute", "customer_info")[0].trace_id, root.trace_id)
+
+    def test_disabled(self):
+        """
+        测试关闭埋点后不再记录
+        """
+        instrumentation.disable()
+        self.agent.get_response("我想查询订单 ORD001 的状态", user_id="user123")
+        self.assertEqual(len(self.exporter.spans), 0)
+
 
 class TestConfig(unittest.TestCase):
     """
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from benchmarks import corpora
+from benchmarks.cases import CASES
+from benchmarks.harness import compare, measure, percentile, save_results, load_results
+from benchmarks.suite import main, run, run_case, select
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+    """
+    基准计时与比较测试类
+    """
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.baseline = {"size": 1000, "cases": {
+            "fast": {"p50_ms": 0.01, "p95_ms": 0.02, "p99_ms": 0.03, "ops_per_s": 90000.0, "peak_rss_mb": 30.0},
+            "slow": {"p50_ms": 5.0, "p95_ms": 8.0, "p99_ms": 9.0, "ops_per_s": 200.0, "peak_rss_mb": 60.0},
+            "broken": {"error": "RuntimeError: boom"},
+        }}
+
+    def test_percentile(self):
+        """
+        测试最近秩法分位数
+        """
+        samples = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(samples, 0.5), 50.0)
+        self.assertEqual(percentile(samples, 0.99), 99.0)
+        self.assertEqual(percentile(samples, 1.0), 100.0)
+        self.assertEqual(percentile([3.0], 0.95), 3.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_measure(self):
+        """
+        测试计时结果包含全部指标，操作按调用序号轮换输入
+        """
+        seen = []
+        metrics = measure(seen.append, iterations=50, warmup=5)
+        self.assertEqual(metrics["iterations"], 50)
+        self.assertEqual(len(seen), 55)
+        self.assertLessEqual(metrics["p50_ms"], metrics["p95_ms"])
+        self.assertLessEqual(metrics["p95_ms"], metrics["p99_ms"])
+        self.assertGreater(metrics["ops_per_s"], 0)
+        self.assertGreater(metrics["peak_rss_mb"], 0)
+
+    def test_compare_flags_regressions(self):
+        """
+        测试超过阈值的变差被标记为回退，吞吐下降同样算变差，出错的用例被跳过
+        """
+        current = json.loads(json.dumps(self.baseline))
+        current["cases"]["slow"].update(p95_ms=10.0, ops_per_s=150.0, p50_ms=4.0)
+        current["cases"]["fast"]["peak_rss_mb"] = 31.0
+        changes = {(change.case, change.metric): change for change in compare(self.baseline, current)}
+        self.assertTrue(changes[("slow", "p95_ms")].regressed)
+        self.assertAlmostEqual(changes[("slow", "p95_ms")].worse_by, 0.25)
+        self.assertTrue(changes[("slow", "ops_per_s")].regressed)
+        self.assertFalse(changes[("slow", "p50_ms")].regressed)
+        self.assertLess(changes[("slow", "p50_ms")].worse_by, 0)
+        self.assertFalse(changes[("fast", "peak_rss_mb")].regressed)
+        self.assertNotIn(("broken", "p50_ms"), changes)
+
+        only_latency = compare(self.baseline, current, metrics=["p50_ms", "p95_ms"])
+        self.assertEqual({change.metric for change in only_latency}, {"p50_ms", "p95_ms"})
+
+    def test_compare_ignores_jitter(self):
+        """
+        测试亚毫秒级操作的微小抖动不算回退
+        """
+        current = json.loads(json.dumps(self.baseline))
+        current["cases"]["fast"].update(p99_ms=0.06, ops_per_s=60000.0)
+        changes = {(change.case, change.metric): change for change in compare(self.baseline, current)}
+        self.assertGreater(changes[("fast", "p99_ms")].worse_by, 0.10)
+        self.assertFalse(changes[("fast", "p99_ms")].regressed)
+        self.assertFalse(changes[("fast", "ops_per_s")].regressed)
+        strict = {(change.case, change.metric): change
+                  for change in compare(self.baseline, current, min_delta_ms=0)}
+        self.assertTrue(strict[("fast", "p99_ms")].regressed)
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """
+    基准套件测试类
+    """
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        shutil.rmtree(self.directory)
+
+    def test_corpora(self):
+        """
+        测试合成语料固定可复现，同一规模只构建一次
+        """
+        self.assertEqual(corpora.size_of("100k"), 100000)
+        self.assertEqual(corpora.size_of("250"), 250)
+        self.assertEqual(list(corpora.kb_entries(5)), list(corpora.kb_entries(5)))
+        path = corpora.customer_db(self.directory, 50)
+        modified = os.path.getmtime(path)
+        self.assertEqual(corpora.customer_db(self.directory, 50), path)
+        self.assertEqual(os.path.getmtime(path), modified)
+
+    def test_cases_cover_tools_and_agents(self):
+        """
+        测试用例覆盖每个工具和每个 Agent
+        """
+        for prefix in ("tool.weather", "tool.customer_info", "tool.knowledge_base", "tool.learning",
+                       "tool.data_analysis", "agent.weather", "agent.customer_service", "agent.data_analyst",
+                       "agent.learning", "agent.orchestrator"):
+            self.assertTrue(select(prefix), prefix)
+
+    def test_run_and_compare(self):
+        """
+        测试在小规模语料上运行用例、写出结果，并与自身比较没有回退
+        """
+        names = ["tool.knowledge_base.hit", "tool.customer_info.order", "agent.customer_service.order"]
+        results = run(100, names, data_dir=self.directory, iterations=20, warmup=2, isolate=False)
+        for name in names:
+            self.assertNotIn("error", results["cases"][name], name)
+            self.assertEqual(results["cases"][name]["iterations"], 20)
+        path = os.path.join(self.directory, "results.json")
+        save_results(path, results)
+        self.assertEqual(load_results(path)["cases"].keys(), results["cases"].keys())
+        self.assertEqual(main(["compare", path, path]), 0)
+
+    def test_run_case_error(self):
+        """
+        测试用例准备出错时记录错误而不是中断整个套件
+        """
+        CASES["test.broken"] = CASES["tool.weather.mock"]._replace(setup=lambda size, data_dir: 1 / 0)
+        try:
+            self.assertIn("ZeroDivisionError", run_case("test.broken", 10, self.directory)["error"])
+        finally:
+            del CASES["test.broken"]
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,1200 @@
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from core.search_index import tokenize, InvertedIndex
+from core.disk_index import SegmentedIndex
+from core.intent_router import IntentRouter
+from core.entities import extract_entities, extract_entity
+from core.memory import RingBuffer, SessionMemory
+from core.singleflight import SingleFlight
+from core.frame_cache import FrameCache
+from core.streaming_stats import KLLSketch, StreamingSummary
+from core.charts import ChartRenderer
+from core.lazy import lazy_import
+from core.tool_registry import ToolRegistry, clear_shared_tools
+from core.customer_store import CustomerStore
+from core.templates import ListTemplate, Template
+from core.utils import format_response, truncate_stream
+from core.llm import LLMClient, LLMError
+from core.mock_llm import MockLLMServer, count_tokens
+from core.vector_index import HashingEmbedder, VectorIndex, char_ngrams
+from core.response_cache import MinHasher, ResponseCache, normalize, shingles
+from core import instrumentation
+from core.instrumentation import Histogram, InMemoryExporter, JsonLinesExporter, PrometheusExporter
+from tools.base_tool import BaseTool
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import numpy as np
+import pandas as pd
+
+
+class TestInvertedIndex(unittest.TestCase):
+    """
+    倒排索引测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.index = InvertedIndex()
+        self.index.add_document("returns", {"title": "退货政策", "content": "7天无理由退货"})
+        self.index.add_document("delivery", {"title": "配送时间", "content": "2-7个工作日送达, fast delivery"})
+
+    def test_tokenize(self):
+        """
+        测试中文 n-gram 与英文单词分词
+        """
+        self.assertEqual(tokenize("退货政策 Return Policy"), ["退货", "货政", "政策", "return", "policy"])
+        self.assertEqual(tokenize("天"), ["天"])
+        self.assertEqual(tokenize("几天能到", unigrams=True), ["几天", "天能", "能到", "几", "天", "能", "到"])
+
+    def test_single_character_keyword(self):
+        """
+        测试单字关键词能命中查询中的多字片段，文档中的常用字不会单独命中
+        """
+        index = InvertedIndex(fields=("title", "keywords", "content"))
+        index.add_document("shipping", {"title": "发货时间", "keywords": ["天"]})
+        index.add_document("returns", {"title": "退货政策", "content": "7天无理由退货"})
+        self.assertEqual([doc_id for doc_id, _ in index.search("几天能到")], ["shipping"])
+        self.assertEqual(index.search("退"), [])
+
+    def test_search_ranking(self):
+        """
+        测试 BM25 检索排序
+        """
+        hits = self.index.search("退货政策是什么")
+        self.assertEqual(hits[0][0], "returns")
+        self.assertEqual(self.index.search("delivery")[0][0], "delivery")
+        self.assertEqual(self.index.search("无关内容"), [])
+
+    def test_update_and_remove(self):
+        """
+        测试文档覆盖与删除
+        """
+        self.index.add_document("returns", {"title": "换货说明", "content": "15天内可换货"})
+        self.assertEqual(self.index.search("退货"), [])
+        self.assertEqual(self.index.search("换货")[0][0], "returns")
+        self.index.remove_document("returns")
+        self.assertEqual(self.index.search("换货"), [])
+        self.assertEqual(len(self.index), 1)
+
+
+class TestSegmentedIndex(unittest.TestCase):
+    """
+    磁盘分段索引测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.directory = tempfile.mkdtemp()
+        self.index = SegmentedIndex(self.directory, max_segments=100)
+        self.index.add_documents([
+            ("returns", {"title": "退货政策", "content": "7天无理由退货"}),
+            ("delivery", {"title": "配送时间", "content": "2-7个工作日送达"}),
+        ])
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        shutil.rmtree(self.directory)
+
+    def test_search_and_get(self):
+        """
+        测试检索与读取文档
+        """
+        self.assertEqual(self.index.search("退货政策")[0][0], "returns")
+        self.assertEqual(self.index.get_document("delivery")["title"], "配送时间")
+        self.assertIsNone(self.index.get_document("missing"))
+
+    def test_incremental_update_and_delete(self):
+        """
+        测试增量更新与删除
+        """
+        self.index.add_document("returns", {"title": "换货说明", "content": "15天内可换货"})
+        self.assertEqual(self.index.search("退货"), [])
+        self.assertEqual(self.index.get_document("returns")["title"], "换货说明")
+        self.index.remove_document("delivery")
+        self.assertEqual(self.index.search("配送"), [])
+        self.assertEqual(len(self.index), 1)
+
+    def test_reopen_and_merge(self):
+        """
+        测试重新打开后数据保持一致，合并后失效文档被清除
+        """
+        self.index.add_document("returns", {"title": "换货说明", "content": "15天内可换货"})
+        self.index.remove_document("delivery")
+        reopened = SegmentedIndex(self.directory)
+        self.assertEqual(reopened.doc_ids(), ["returns"])
+        self.assertEqual(reopened.search("换货")[0][0], "returns")
+
+        reopened.merge()
+        self.assertEqual(len(reopened._segments), 1)
+        self.assertEqual(reopened._segments[0].doc_count, 1)
+        self.assertEqual(SegmentedIndex(self.directory).get_document("returns")["title"], "换货说明")
+
+    def test_background_merge(self):
+        """
+        测试段数量超过阈值时自动合并
+        """
+        index = SegmentedIndex(self.directory, max_segments=2)
+        for i in range(5):
+            index.add_document(f"doc{i}", {"title": f"文档{i}", "content": "售后服务"})
+        index.close()
+        self.assertLessEqual(len(index._segments), index.max_segments)
+        self.assertEqual(len(index), 7)
+        self.assertEqual(len(index.search("售后", top_k=10)), 5)
+
+
+class TestIntentRouter(unittest.TestCase):
+    """
+    意图路由器测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.router = IntentRouter()
+        self.router.register("service", {"order": ["订单", "订单号", "order"], "help": ["帮助", "help"]})
+        self.router.register("weather", {"weather": ["天气", "weather"]})
+
+    def test_route_single_pass(self):
+        """
+        测试单次扫描识别多个命名空间的意图
+        """
+        result = self.router.route("查询订单号 ORD001，顺便看看北京天气")
+        self.assertEqual(result.best("service"), "order")
+        self.assertEqual(result.best("weather"), "weather")
+        self.assertEqual(result.intents(), ["service.order", "weather.weather"])
+        # 较长关键词命中时，前缀关键词同样记录位置
+        self.assertCountEqual(result.spans["service.order"], [(2, 5), (2, 4)])
+
+    def test_coverage(self):
+        """
+        测试按命名空间统计命中关键词覆盖的字符数，重叠部分只计一次
+        """
+        result = self.router.route("查询订单号 ORD001，顺便看看北京天气")
+        self.assertEqual(result.coverage("service"), 3)
+        self.assertEqual(result.coverage("weather"), 2)
+        self.assertEqual(result.coverage("learn"), 0)
+
+    def test_priority_and_case(self):
+        """
+        测试意图优先级与大小写不敏感
+        """
+        result = self.router.route("HELP me with my Order")
+        self.assertEqual(result.intents("service"), ["order", "help"])
+        self.assertEqual(result.matched("service", "help"), ["HELP"])
+
+    def test_no_match(self):
+        """
+        测试未命中时的返回
+        """
+        result = self.router.route("你好")
+        self.assertFalse(result)
+        self.assertIsNone(result.best("service"))
+
+    def test_case_folding_chars(self):
+        """
+        测试大小写折叠后才等于关键词的字符不会导致异常，行为与小写化后做子串判断一致
+        """
+        self.router.register("learn", {"learn": ["study"]})
+        result = self.router.route("ſtudy ORDER")
+        self.assertIsNone(result.best("learn"))
+        self.assertEqual(result.best("service"), "order")
+        # 小写后长度变化时，位置对应小写化后的文本
+        self.assertEqual(self.router.route("İ weather").matched("weather", "weather"), ["weather"])
+
+
+class TestEntityExtraction(unittest.TestCase):
+    """
+    实体抽取测试类
+    """
+    
+    def test_order_id_priority(self):
+        """
+        测试订单号规则的优先级与兜底规则
+        """
+        self.assertEqual(extract_entity("我想查询订单 ORD001 的状态", "order_id"), "ORD001")
+        self.assertEqual(extract_entity("订单 A 的订单号：ORD002", "order_id"), "ORD002")
+        self.assertEqual(extract_entity("帮我看看 ord003 到哪了", "order_id"), "ORD003")
+        self.assertIsNone(extract_entity("我想查询物流", "order_id"))
+
+    def test_low_priority_rule_does_not_consume(self):
+        """
+        测试低优先级规则的命中不会吞掉其中更高优先级的命中
+        """
+        self.assertEqual(extract_entity("订单订单号：ORD001", "order_id"), "ORD001")
+        self.assertEqual(extract_entity("data path: 数据路径:x.csv", "data_path"), "x.csv")
+        self.assertEqual(extract_entities("订单订单号：ORD001")["order_id"].span, (6, 12))
+
+    def test_city_and_data_path(self):
+        """
+        测试城市与数据路径抽取
+        """
+        self.assertEqual(extract_entity("北京的天气怎么样？", "city"), "北京")
+        self.assertEqual(extract_entity("what is the weather in Shanghai", "city"), "Shanghai")
+        self.assertEqual(extract_entity("请分析数据，数据路径:sample.csv", "data_path"), "sample.csv")
+        self.assertEqual(extract_entity("统计一下 report.json 和 a.csv", "data_path"), "report.json")
+
+    def test_subject(self):
+        """
+        测试学习主题抽取
+        """
+        self.assertEqual(extract_entity("我想学React", "subject"), "web")
+        self.assertEqual(extract_entity("JS 和 Python 哪个好学", "subject"), "python")
+        self.assertEqual(extract_entity("tutorial on rust", "subject"), "rust")
+
+    def test_extract_entities_single_pass(self):
+        """
+        测试一次抽取多类实体并返回位置
+        """
+        text = "订单号：ORD001，北京的天气"
+        entities = extract_entities(text, ("order_id", "city"))
+        self.assertEqual(entities["order_id"].value, "ORD001")
+        self.assertEqual(entities["city"].kind, "city")
+        start, end = entities["city"].span
+        self.assertEqual(text[start:end], "北京")
+
+
+class TestSessionMemory(unittest.TestCase):
+    """
+    会话存储测试类
+    """
+    
+    def test_ring_buffer(self):
+        """
+        测试环形缓冲区覆盖最旧元素
+        """
+        buffer = RingBuffer(3)
+        for i in range(5):
+            buffer.append(i)
+        self.assertEqual(list(buffer), [2, 3, 4])
+        self.assertEqual(list(reversed(buffer)), [4, 3, 2])
+        self.assertEqual(buffer.last(), 4)
+
+    def test_bounded_history(self):
+        """
+        测试会话历史有界
+        """
+        memory = SessionMemory(capacity=4)
+        session = memory.get("s1")
+        for i in range(10):
+            session.add("user", str(i))
+        self.assertEqual([message.content for message in session.messages], ["6", "7", "8", "9"])
+
+    def test_lru_eviction(self):
+        """
+        测试超过会话数上限时淘汰最久未使用的会话
+        """
+        memory = SessionMemory(max_sessions=2)
+        memory.get("a")
+        memory.get("b")
+        memory.get("a")
+        memory.get("c")
+        self.assertIn("a", memory)
+        self.assertNotIn("b", memory)
+        self.assertEqual(len(memory), 2)
+
+    def test_ttl_eviction(self):
+        """
+        测试闲置超过 TTL 的会话被淘汰
+        """
+        memory = SessionMemory(ttl=60)
+        memory.get("a").last_access -= 120
+        memory.get("b")
+        self.assertNotIn("a", memory)
+
+    def test_expired_session_not_returned(self):
+        """
+        测试过期但尚未被淘汰的会话不会被读取或沿用
+        """
+        memory = SessionMemory(ttl=60)
+        session = memory.get("a")
+        session.add("user", "你好")
+        session.last_access -= 120
+        self.assertIsNone(memory.peek("a"))
+        self.assertNotIn("a", memory)
+        renewed = memory.get("a")
+        self.assertIsNot(renewed, session)
+        self.assertEqual(len(renewed.messages), 0)
+
+    def test_entity_index(self):
+        """
+        测试最近实体索引
+        """
+        session = SessionMemory().get("s1")
+        self.assertIsNone(session.recall("city"))
+        session.remember("city", "北京")
+        session.remember("city", "上海")
+        self.assertEqual(session.recall("city"), "上海")
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    请求合并测试类
+    """
+    
+    def test_followers_share_result(self):
+        """
+        测试跟随方共享 leader 的结果与异常
+        """
+        flights = SingleFlight()
+        future, leader = flights.acquire("k")
+        follower, is_leader = flights.acquire("k")
+        self.assertTrue(leader)
+        self.assertFalse(is_leader)
+        self.assertIs(future, follower)
+        flights.release("k", 42)
+        self.assertEqual(follower.result(), 42)
+        self.assertFalse(flights.in_flight("k"))
+
+        future, _ = flights.acquire("k")
+        flights.release("k", error=ValueError("boom"))
+        self.assertRaises(ValueError, future.result)
+
+    def test_do(self):
+        """
+        测试 do 在没有并发时直接执行
+        """
+        flights = SingleFlight()
+        self.assertEqual(flights.do("k", lambda x: x * 2, 21), 42)
+        self.assertRaises(ZeroDivisionError, flights.do, "k", lambda: 1 / 0)
+        self.assertFalse(flights.in_flight("k"))
+
+
+class TestFrameCache(unittest.TestCase):
+    """
+    数据缓存测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.directory = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(3):
+            path = f"{self.directory}/{i}.txt"
+            with open(path, "w") as f:
+                f.write("x" * 10)
+            self.paths.append(path)
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        shutil.rmtree(self.directory)
+
+    def test_memory_budget(self):
+        """
+        测试超过内存预算时淘汰最久未使用的条目
+        """
+        cache = FrameCache(max_bytes=25)
+        loads = []
+
+        def loader(path):
+            loads.append(path)
+            return open(path).read()
+
+        for path in self.paths:
+            cache.load(path, loader, len)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.total_bytes, 20)
+        cache.load(self.paths[2], loader, len)
+        cache.load(self.paths[0], loader, len)
+        self.assertEqual(loads, self.paths + [self.paths[0]])
+
+    def test_memo(self):
+        """
+        测试派生结果只计算一次
+        """
+        cache = FrameCache()
+        calls = []
+        entry = cache.load(self.paths[0], lambda path: open(path).read(), len)
+        for _ in range(3):
+            self.assertEqual(entry.memo("upper", lambda: calls.append(1) or entry.frame.upper()), "X" * 10)
+        self.assertEqual(len(calls), 1)
+
+
+class TestStreamingStats(unittest.TestCase):
+    """
+    流式统计测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        rng = np.random.default_rng(7)
+        self.df = pd.DataFrame({
+            "a": rng.normal(size=1000),
+            "b": rng.integers(0, 100, 1000),
+            "label": ["x"] * 1000,
+            "c": rng.normal(5, 2, 1000),
+        })
+        self.df.loc[rng.choice(1000, 100), "a"] = np.nan
+        self.df.loc[rng.choice(1000, 50), "c"] = np.nan
+
+    def test_chunked_matches_pandas(self):
+        """
+        测试分块累积的统计表与相关性矩阵与整体计算结果一致（数据量未触发草图压缩）
+        """
+        summary = StreamingSummary()
+        for start in range(0, len(self.df), 137):
+            summary.update(self.df.iloc[start:start + 137])
+        numeric = self.df.select_dtypes(include=["number"])
+        self.assertEqual(summary.shape, self.df.shape)
+        self.assertEqual(summary.numeric_columns, ["a", "b", "c"])
+        self.assertEqual(str(summary.describe()), str(numeric.describe()))
+        self.assertEqual(str(summary.corr()), str(numeric.corr()))
+
+    def test_merge_partial_results(self):
+        """
+        测试合并两个部分结果与整体累积一致
+        """
+        first, second = StreamingSummary(), StreamingSummary()
+        first.update(self.df.iloc[:400])
+        second.update(self.df.iloc[400:])
+        first.merge(second)
+        np.testing.assert_allclose(first.corr().to_numpy(), self.df[["a", "b", "c"]].corr().to_numpy())
+        self.assertEqual(first.rows, 1000)
+
+    def test_non_numeric_in_later_chunk(self):
+        """
+        测试后续分块出现非数值时该列不再视为数值列
+        """
+        summary = StreamingSummary()
+        summary.update(pd.DataFrame({"x": [1, 2], "y": [1.0, 2.0]}))
+        summary.update(pd.DataFrame({"x": ["n/a", "3"], "y": [3.0, 4.0]}))
+        self.assertEqual(summary.numeric_columns, ["y"])
+
+    def test_kll_sketch_bounded(self):
+        """
+        测试分位数草图的内存有界且误差在预期范围内
+        """
+        rng = np.random.default_rng(0)
+        values = rng.normal(size=200000)
+        sketch = KLLSketch(k=200, seed=0)
+        for start in range(0, len(values), 10000):
+            sketch.update(values[start:start + 10000])
+        self.assertFalse(sketch.exact)
+        self.assertLess(sketch.size, 1000)
+        ordered = np.sort(values)
+        for q, estimate in zip((0.1, 0.5, 0.9), sketch.quantiles((0.1, 0.5, 0.9))):
+            rank = np.searchsorted(ordered, estimate) / len(values)
+            self.assertLess(abs(rank - q), 0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestChartRenderer(unittest.TestCase):
+    """
+    后台图表渲染器测试类
+    """
+    
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.directory = tempfile.mkdtemp()
+        self.renderer = ChartRenderer(max_workers=1)
+        self.counts, self.edges = np.histogram([1, 2, 2, 3, 5], bins=4)
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        self.renderer.close()
+        shutil.rmtree(self.directory)
+
+    def test_render_and_cache(self):
+        """
+        测试并发请求共用一次渲染，相同数据的图表复制到新路径而不再渲染
+        """
+        path = os.path.join(self.directory, "a.png")
+        first, cached = self.renderer.histogram(("data", "x", 4), path, self.counts, self.edges, "x")
+        second, _ = self.renderer.histogram(("data", "x", 4), path, self.counts, self.edges, "x")
+        self.assertFalse(cached)
+        self.assertIs(first, second)
+        self.assertEqual(first.result(timeout=30), path)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(8), b"\x89PNG\r\n\x1a\n")
+
+        copy_path = os.path.join(self.directory, "b.png")
+        with mock.patch("matplotlib.figure.Figure") as figure:
+            future, cached = self.renderer.histogram(("data", "x", 4), copy_path, self.counts, self.edges, "x")
+        figure.assert_not_called()
+        self.assertTrue(cached)
+        self.assertEqual(future.result(), copy_path)
+        self.assertTrue(os.path.exists(copy_path))
+
+
+class TestLazy(unittest.TestCase):
+    """
+    延迟导入测试类
+    """
+
+    def test_lazy_module(self):
+        """
+        测试模块在首次访问属性时才导入
+        """
+        module = lazy_import("json")
+        self.assertIn("not loaded", repr(module))
+        self.assertEqual(module.dumps([1]), "[1]")
+        self.assertIn("loaded", repr(module))
+
+
+class TestToolRegistry(unittest.TestCase):
+    """
+    工具注册表测试类
+    """
+
+    class EchoTool:
+        name = "echo"
+        description = "Echo the input"
+        parameters = {"type": "object", "properties": {"text": {"type": "string"}}}
+        STATELESS = True
+        instances = 0
+
+        def __init__(self, prefix: str = "", table=None):
+            TestToolRegistry.EchoTool.instances += 1
+            self.prefix = prefix
+
+        def execute(self, params):
+            return self.prefix + params["text"]
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        clear_shared_tools()
+        TestToolRegistry.EchoTool.instances = 0
+        self.registry = ToolRegistry()
+
+    def test_lazy_shared_lookup(self):
+        """
+        测试按名称查找、首次使用时构造，以及类和参数相同的工具在注册表之间共享
+        """
+        self.registry.register(self.EchoTool, prefix="> ")
+        other = ToolRegistry()
+        other.register(self.EchoTool, prefix="> ")
+        self.assertEqual(self.EchoTool.instances, 0)
+        self.assertEqual(self.registry.get("echo").execute({"text": "hi"}), "> hi")
+        self.assertIs(other["echo"], self.registry[0])
+        self.assertEqual(self.EchoTool.instances, 1)
+
+        # 参数不可哈希时不共享
+        self.registry.register(self.EchoTool, name="echo_table", table={"a": 1})
+        other.register(self.EchoTool, name="echo_table", table={"a": 1})
+        self.assertIsNot(self.registry.get("echo_table"), other.get("echo_table"))
+        with self.assertRaises(KeyError):
+            self.registry.get("missing")
+
+    def test_stateful_not_shared(self):
+        """
+        测试 STATELESS 不为真的工具默认不共享，shared 参数可以覆盖
+        """
+        class StoreTool(self.EchoTool):
+            STATELESS = False
+
+        self.registry.register(StoreTool)
+        other = ToolRegistry()
+        other.register(StoreTool)
+        self.assertIsNot(self.registry.get("echo"), other.get("echo"))
+        self.registry.register(StoreTool, name="shared_store", shared=True)
+        other.register(StoreTool, name="shared_store", shared=True)
+        self.assertIs(self.registry.get("shared_store"), other.get("shared_store"))
+        self.registry.register(self.EchoTool, name="own_echo", shared=False)
+        other.register(self.EchoTool, name="own_echo", shared=False)
+        self.assertIsNot(self.registry.get("own_echo"), other.get("own_echo"))
+
+    def test_schema_cached(self):
+        """
+        测试 function calling 描述不构造工具、结果被缓存，注册新工具后重新生成
+        """
+        self.registry.register(self.EchoTool)
+        schema = self.registry.schema()
+        self.assertEqual(schema[0]["function"]["name"], "echo")
+        self.assertEqual(schema[0]["function"]["parameters"], self.EchoTool.parameters)
+        self.assertIs(self.registry.schema(), schema)
+        self.assertIs(self.registry.schema_json(), self.registry.schema_json())
+        self.assertEqual(self.EchoTool.instances, 0)
+
+        self.registry.register(lambda: self.EchoTool("# "), name="hash")
+        self.assertEqual([item["function"]["name"] for item in self.registry.schema()], ["echo", "hash"])
+        self.assertEqual(self.registry.get("hash").execute({"text": "x"}), "# x")
+
+
+
+class TestCustomerStore(unittest.TestCase):
+    """
+    客户存储测试类
+    """
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = CustomerStore(os.path.join(self.temp_dir, "customers.db"))
+        self.store.load_nested({
+            "u1": {"name": "张三", "email": "a@example.com", "phone": "1", "level": "VIP",
+                   "orders": {"O1": {"product": "耳机", "status": "已发货", "tracking_number": "SF1",
+                                     "delivery_date": "2023-10-15"}}},
+        })
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_lookup_and_wal(self):
+        """
+        测试文件数据库使用 WAL 模式，以及按用户查询资料和订单
+        """
+        connection = self.store._connection()
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        profile = self.store.get_customer("u1")
+        self.assertEqual((profile["name"], profile["order_count"]), ("张三", 1))
+        self.assertEqual(self.store.get_order("u1", "O1")["tracking_number"], "SF1")
+        # 订单不属于该用户时查不到
+        self.store.upsert_customer("u2", name="李四")
+        self.assertIsNone(self.store.get_order("u2", "O1"))
+        self.assertIsNone(self.store.get_customer("missing"))
+
+    def test_cache_invalidation(self):
+        """
+        测试写入订单后用户资料缓存失效
+        """
+        self.assertEqual(self.store.get_customer("u1")["order_count"], 1)
+        self.store.upsert_order("u1", "O2", product="手表", status="处理中")
+        self.assertEqual(self.store.get_customer("u1")["order_count"], 2)
+        self.store.upsert_customer("u1", name="张三丰", level="VIP")
+        self.assertEqual(self.store.get_customer("u1")["name"], "张三丰")
+
+    def test_thread_local_connections(self):
+        """
+        测试每个线程复用自己的连接，且能读到其他线程写入的数据
+        """
+        main = self.store._connection()
+        self.assertIs(self.store._connection(), main)
+        results = []
+
+        def worker():
+            results.append((self.store._connection() is main, self.store.get_order("u1", "O1")["product"]))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [(False, "耳机")])
+
+    def test_memory_concurrent_writes(self):
+        """
+        测试内存数据库在多个线程同时读写时不报表被锁定
+        """
+        store = CustomerStore()
+
+        def worker(n):
+            for i in range(200):
+                store.upsert_order(f"user{n}", f"ORD{n}-{i}", product="商品", status="已发货")
+                store.find_order(f"ORD{n}-{i}")
+            store.upsert_customer(f"user{n}", name=f"name{n}")
+            return store.get_customer(f"user{n}")["order_count"]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertEqual(list(executor.map(worker, range(8))), [200] * 8)
+        store.close()
+
+    def test_bulk_load(self):
+        """
+        测试批量导入跨越多个批次，且重建了二级索引
+        """
+        store = CustomerStore()
+        customers = ((f"user{i}", f"name{i}", None, None, "普通会员") for i in range(250))
+        orders = ((f"ORD{i}", f"user{i % 250}", "商品", "已签收", None, None) for i in range(1000))
+        store.bulk_load(customers, orders, batch_size=64)
+        self.assertEqual(store.get_customer("user7")["order_count"], 4)
+        indexes = [row[0] for row in store._connection().execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+        self.assertIn("idx_orders_user", indexes)
+        store.close()
+
+
+class TestTemplates(unittest.TestCase):
+    """
+    响应模板测试类
+    """
+
+    def test_template(self):
+        """
+        测试预编译模板与 str.format 的渲染结果一致
+        """
+        text = "订单 {order_id} 信息：\n金额：{amount:.2f}，{{原样}} {note!r}\n"
+        values = {"order_id": "ORD001", "amount": 3.14159, "note": "无"}
+        self.assertEqual(Template(text).render(values), text.format(**values))
+        self.assertEqual(Template("{a}-{b}").render({"a": 1}, b=2), "1-2")
+        with self.assertRaises(KeyError):
+            Template("{missing}").render()
+        with self.assertRaises(ValueError):
+            Template("{items[0]}")
+
+    def test_list_template(self):
+        """
+        测试列表模板的序号、分隔符和标题结尾
+        """
+        template = ListTemplate("共 {count} 项：\n", "{index}. {title}\n", "完\n")
+        data = {"count": 2, "items": [{"title": "甲"}, {"title": "乙"}]}
+        self.assertEqual(template.render(data), "共 2 项：\n1. 甲\n2. 乙\n完\n")
+        topics = ListTemplate("主题：", "{value}", "。", items_key="topics", separator="、")
+        self.assertEqual(topics.render({"topics": ["退货", "配送"]}), "主题：退货、配送。")
+        self.assertEqual(topics.render({"topics": []}), "主题：。")
+
+
+class TestTruncateStream(unittest.TestCase):
+    """
+    流式长度限制测试类
+    """
+
+    def test_matches_format_response(self):
+        """
+        测试流式截断的结果与 format_response 相同
+        """
+        chunks = ["abc", "", "defg", "hij"]
+        text = "".join(chunks)
+        for max_length in range(len(text) + 2):
+            self.assertEqual("".join(truncate_stream(chunks, max_length)), format_response(text, max_length))
+        self.assertEqual(list(truncate_stream(chunks, None)), chunks)
+
+    def test_stops_upstream(self):
+        """
+        测试截断后不再读取上游片段
+        """
+        produced = []
+
+        def chunks():
+            for i in range(100):
+                produced.append(i)
+                yield "x" * 10
+
+        self.assertEqual(len("".join(truncate_stream(chunks(), 25))), 25 + len("\n[内容已截断]"))
+        self.assertEqual(produced, [0, 1, 2])
+
+
+class TestLLMClient(unittest.TestCase):
+    """
+    大模型客户端测试类（使用本地服务替身）
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockLLMServer(delay=0.01).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.server.requests.clear()
+        self.clients = []
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        for client in self.clients:
+            client.close()
+
+    def client(self, **kwargs) -> LLMClient:
+        client = LLMClient(self.server.base_url, model="qwen-plus", **kwargs)
+        self.clients.append(client)
+        return client
+
+    def test_chat_metrics(self):
+        """
+        测试单独发送对话请求，并记录每次调用的耗时和 token 用量
+        """
+        client = self.client()
+        result = client.generate("你好\n北京天气怎么样", system="你是助手")
+        self.assertEqual(result.text, "收到：北京天气怎么样")
+        self.assertEqual(self.server.requests, [("/v1/chat/completions", 1)])
+        self.assertEqual(result.call.completion_tokens, count_tokens(result.text))
+        self.assertGreater(result.call.latency, 0)
+        snapshot = client.metrics.snapshot()
+        self.assertEqual((snapshot["calls"], snapshot["errors"], snapshot["prompts"]), (1, 0, 1))
+        self.assertEqual(snapshot["prompt_tokens"], count_tokens("你是助手") + count_tokens("你好\n北京天气怎么样"))
+
+    def test_micro_batching(self):
+        """
+        测试并发提交的提示词合并为一次请求，结果按提示词分发
+        """
+        client = self.client(max_batch_size=8, batch_window=0.2)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda i: client.complete(f"问题{i}"), range(8)))
+        self.assertEqual(results, [f"收到：问题{i}" for i in range(8)])
+        self.assertEqual(self.server.requests, [("/v1/completions", 8)])
+        self.assertEqual(client.metrics.snapshot()["prompts"], 8)
+        self.assertEqual(client.metrics.recent[0].batch_size, 8)
+
+    def test_error(self):
+        """
+        测试接口不可用时抛出 LLMError 并记录错误
+        """
+        client = LLMClient("http://127.0.0.1:9/v1", timeout=1, retries=0)
+        self.clients.append(client)
+        with self.assertRaises(LLMError):
+            client.complete("你好")
+        self.assertEqual(client.metrics.snapshot()["errors"], 1)
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    响应缓存测试类
+    """
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.cache = ResponseCache(ttl=60)
+
+    def test_normalize(self):
+        """
+        测试规范化忽略全角、大小写、空白和标点
+        """
+        self.assertEqual(normalize("ＰＹＴＨＯＮ 教程？"), "python教程")
+        self.assertEqual(shingles("abc"), frozenset({"ab", "bc"}))
+
+    def test_normalize_filler_words(self):
+        """
+        测试疑问词和语气词不影响规范化结果，“为什么”保留
+        """
+        self.assertEqual(normalize("退货政策是什么？"), normalize("怎么退货"))
+        self.assertEqual(normalize("为什么退货"), "为什么退货")
+        self.assertEqual(normalize("什么？"), "什么")
+
+    def test_exact_and_similar_hits(self):
+        """
+        测试规范化后相同的输入精确命中，近似的输入近似命中，不相关的输入未命中
+        """
+        self.cache.set("推荐一些Python学习资源", "资源列表")
+        self.assertEqual(self.cache.get("推荐一些 python 学习资源！"), "资源列表")
+        self.assertEqual(self.cache.get("给我推荐一些Python学习资源"), "资源列表")
+        self.assertIsNone(self.cache.get("今天北京天气怎么样"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["exact_hits"], stats["similar_hits"], stats["misses"]), (1, 1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+
+    def test_lookup_probe_reused(self):
+        """
+        测试未命中时查找算出的签名和实体传给 set 后不再重新计算
+        """
+        self.cache.set("退货政策是什么", "7天无理由退货")
+        self.assertEqual(self.cache.get("怎么退货"), "7天无理由退货")
+        response, probe = self.cache.lookup("我想查询订单 ORD001 的状态")
+        self.assertIsNone(response)
+        with mock.patch("core.response_cache.extract_entities") as extract, \
+                mock.patch.object(self.cache.hasher, "signature") as signature:
+            self.cache.set("我想查询订单 ORD001 的状态", "ORD001 已发货", probe=probe)
+        extract.assert_not_called()
+        signature.assert_not_called()
+        self.assertEqual(self.cache.get("我想查询订单ORD001的状态"), "ORD001 已发货")
+
+    def test_guard(self):
+        """
+        测试实体或数字不同的近似输入不会命中
+        """
+        self.cache.set("我想查询订单 ORD001 的状态", "ORD001 已发货")
+        self.assertIsNone(self.cache.get("我想查询订单 ORD002 的状态"))
+        self.cache.set("北京的天气怎么样", "北京晴")
+        self.assertIsNone(self.cache.get("上海的天气怎么样"))
+
+    def test_scope(self):
+        """
+        测试不同作用域的条目互不可见
+        """
+        self.cache.set("我的个人信息", "张三", scope="user123")
+        self.assertEqual(self.cache.get("我的个人信息", scope="user123"), "张三")
+        self.assertIsNone(self.cache.get("我的个人信息", scope="user456"))
+
+    def test_expiry_and_eviction(self):
+        """
+        测试过期条目不再命中，超过容量时淘汰最久未使用的条目
+        """
+        with mock.patch("core.response_cache.time.monotonic", return_value=0.0):
+            self.cache.set("推荐一些Python学习资源", "资源列表")
+        with mock.patch("core.response_cache.time.monotonic", return_value=61.0):
+            self.assertIsNone(self.cache.get("推荐一些Python学习资源"))
+        self.assertEqual(len(self.cache), 0)
+
+        cache = ResponseCache(ttl=60, max_size=2)
+        cache.set("第一个问题", "1")
+        cache.set("第二个问题", "2")
+        cache.get("第一个问题")
+        cache.set("第三个问题", "3")
+        self.assertIsNone(cache.get("第二个问题"))
+        self.assertEqual(cache.get("第一个问题"), "1")
+        # 被淘汰条目的分桶一并清理
+        self.assertTrue(all(key in cache._entries for bucket in cache._buckets.values() for key in bucket))
+
+    def test_minhash_estimates_jaccard(self):
+        """
+        测试 MinHash 签名的一致比例接近 Jaccard 相似度
+        """
+        hasher = MinHasher(num_perm=128, bands=32)
+        a = frozenset(str(i) for i in range(100))
+        b = frozenset(str(i) for i in range(50, 150))
+        sa, sb = hasher.signature(a), hasher.signature(b)
+        estimate = sum(x == y for x, y in zip(sa, sb)) / len(sa)
+        self.assertAlmostEqual(estimate, 50 / 150, delta=0.15)
+        with self.assertRaises(ValueError):
+            MinHasher(num_perm=10, bands=3)
+
+
+class TestVectorIndex(unittest.TestCase):
+    """
+    向量检索索引测试类
+    """
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.documents = [
+            ("return", {"title": "退货政策", "content": "七天无理由退货，退款原路返回"}),
+            ("delivery", {"title": "配送时间", "content": "一般三个工作日内送达"}),
+            ("warranty", {"title": "产品保修", "content": "一年免费保修，损坏可维修"}),
+            ("refund", {"title": "Refund policy", "content": "Refunds are issued within 7 days"}),
+        ]
+        self.index = VectorIndex()
+        self.index.add_documents(self.documents)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        shutil.rmtree(self.directory)
+
+    def test_char_ngrams(self):
+        """
+        测试中文切分为单字和相邻字，拉丁单词切分为带边界符的字符 n-gram
+        """
+        self.assertEqual(char_ngrams("保修"), ["保", "修", "保修"])
+        self.assertEqual(char_ngrams("Pay"), ["pay", "<pa", "pay", "ay>"])
+
+    def test_embeddings(self):
+        """
+        测试向量为 L2 归一化的 float32 矩阵，空文本为零向量
+        """
+        vectors = HashingEmbedder(dim=64).embed(["退货", "", "refund"])
+        self.assertEqual((vectors.dtype, vectors.shape), (np.float32, (3, 64)))
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), [1, 0, 1], rtol=1e-5)
+
+    def test_search(self):
+        """
+        测试按余弦相似度检索，批量检索与逐个检索结果一致
+        """
+        self.assertEqual(self.index.search("东西坏了能修吗", top_k=1)[0][0], "warranty")
+        self.assertEqual(self.index.search("refunded", top_k=1)[0][0], "refund")
+        queries = ["多久送达", "怎么退款"]
+        self.assertEqual(self.index.search_batch(queries, top_k=2), [self.index.search(q, top_k=2) for q in queries])
+        self.assertEqual(self.index.search("", top_k=3), [])
+
+    def test_update_and_remove(self):
+        """
+        测试覆盖和删除文档后不再返回旧内容
+        """
+        self.index.add_document("warranty", {"title": "以旧换新", "content": "旧手机可折价换购"})
+        self.assertNotIn("warranty", [doc_id for doc_id, _ in self.index.search("保修维修", top_k=4)])
+        self.index.remove_document("return")
+        self.assertNotIn("return", [doc_id for doc_id, _ in self.index.search("退货退款", top_k=4)])
+        self.assertEqual(len(self.index), 3)
+        self.index.compact()
+        self.assertEqual(self.index.get_document("warranty")["title"], "以旧换新")
+        self.assertEqual(self.index.search("旧手机", top_k=1)[0][0], "warranty")
+
+    def test_ivf(self):
+        """
+        测试聚类后只扫描部分簇，近邻仍能找到，新增和删除的文档同样生效
+        """
+        rng = np.random.default_rng(0)
+        words = [f"topic{i}" for i in range(40)]
+        documents = [(f"doc{i}", {"title": " ".join(rng.choice(words, 5)), "content": ""}) for i in range(400)]
+        index = VectorIndex(nlist=16, nprobe=4)
+        index.add_documents(documents)
+        self.assertIsNone(index._centroids)
+        index.build_ivf()
+        self.assertEqual(index._clustered, 400)
+        exact = VectorIndex()
+        exact.add_documents(documents)
+        recalled = sum(index.search(doc["title"], top_k=1)[0][1] >= exact.search(doc["title"], top_k=1)[0][1] - 1e-6
+                       for _, doc in documents[:50])
+        self.assertGreaterEqual(recalled, 45)
+        index.add_document("new", {"title": "brand new entry", "content": ""})
+        self.assertEqual(index.search("brand new entry", top_k=1)[0][0], "new")
+        index.remove_document("doc0")
+        self.assertNotIn("doc0", [doc_id for doc_id, _ in index.search(documents[0][1]["title"], top_k=5)])
+        index.compact()
+        self.assertEqual(index._offsets[-1], index._clustered)
+        self.assertEqual(index.search("brand new entry", top_k=1)[0][0], "new")
+
+    def test_persistence(self):
+        """
+        测试保存后以内存映射方式加载，检索结果不变，加载后仍可写入
+        """
+        index = VectorIndex(directory=self.directory, nlist=2)
+        index.add_documents(self.documents)
+        index.build_ivf()
+        index.save()
+        reopened = VectorIndex(directory=self.directory, nlist=2)
+        self.assertIsInstance(reopened._matrix, np.memmap)
+        self.assertEqual(reopened.search("东西坏了能修吗", top_k=2), index.search("东西坏了能修吗", top_k=2))
+        reopened.add_document("pay", {"title": "支付方式", "content": "支持微信和支付宝"})
+        self.assertEqual(reopened.search("微信支付", top_k=1)[0][0], "pay")
+        with self.assertRaises(ValueError):
+            VectorIndex(fields=("title",), directory=self.directory)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    埋点测试类
+    """
+
+    def setUp(self):
+        """
+        测试前准备
+        """
+        self.exporter = InMemoryExporter()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        测试后清理
+        """
+        instrumentation.disable()
+        shutil.rmtree(self.directory)
+
+    def test_histogram(self):
+        """
+        测试小值精确记录，大值的分位数误差不超过桶宽，合并后计数相加
+        """
+        histogram = Histogram(bits=8)
+        for value in range(1, 101):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(0.5), 50)
+        self.assertEqual(histogram.percentile(0.99), 99)
+        self.assertEqual((histogram.min, histogram.max, histogram.count, histogram.total), (1, 100, 100, 5050))
+        self.assertEqual(histogram.count_at_or_below(10), 10)
+
+        large = Histogram(bits=8)
+        values = [1000 + 7919 * i for i in range(5000)]
+        for value in values:
+            large.record(value)
+        for fraction in (0.5, 0.95, 0.99):
+            exact = values[math.ceil(fraction * len(values)) - 1]
+            self.assertLessEqual(abs(large.percentile(fraction) - exact) / exact, 1 / 128)
+        self.assertEqual(large.percentile(1.0), values[-1])
+        # 桶数量按对数增长
+        self.assertLess(len(large.counts), 3000)
+
+        large.merge(histogram)
+        self.assertEqual(large.count, 5100)
+        self.assertEqual(large.min, 1)
+        with self.assertRaises(ValueError):
+            large.merge(Histogram(bits=6))
+
+    def test_spans(self):
+        """
+        测试 span 的父子关系、标签沿用、异常记录和按名称聚合的指标
+        """
+        tracer = instrumentation.enable([self.exporter])
+        with tracer.start("agent.get_response", "Agent") as root:
+            with tracer.start("tool.execute", "weather"):
+                with tracer.start("tool.format"):
+                    pass
+            with self.assertRaises(KeyError):
+                with tracer.start("tool.execute", "weather"):
+                    raise KeyError("city")
+        self.assertIsNone(instrumentation.current_span.get())
+
+        fmt = self.exporter.find("tool.format")[0]
+        first, failed = self.exporter.find("tool.execute", "weather")
+        self.assertEqual(fmt.label, "weather")
+        self.assertEqual(fmt.parent_id, first.span_id)
+        self.assertEqual(first.parent_id, root.span_id)
+        self.assertEqual({fmt.trace_id, first.trace_id, failed.trace_id}, {root.span_id})
+        self.assertEqual(failed.error, "KeyError")
+        self.assertGreaterEqual(root.duration_ns, first.duration_ns + failed.duration_ns)
+
+        stats = tracer.metrics.get("tool.execute", "weather")
+        self.assertEqual((stats.calls, stats.errors, stats.histogram.count), (2, 1, 2))
+        tracer.flush()
+        self.assertIn({"name": "tool.format", "label": "weather", "calls": 1},
+                      [{key: entry[key] for key in ("name", "label", "calls")} for entry in self.exporter.metrics])
+
+    def test_disabled(self):
+        """
+        测试未启用时 span() 返回共享空对象，工具执行的埋点处不分配内存
+        """
+        self.assertIsNone(instrumentation.tracer)
+        self.assertIs(instrumentation.span("tool.execute", "weather"), instrumentation.NOOP_SPAN)
+
+        class EchoTool(BaseTool):
+            name = "echo"
+
+            def execute(self, params):
+                return "ok"
+
+        tool, params = EchoTool(), {}
+        self.assertTrue(hasattr(EchoTool.execute, "__wrapped__"))
+        tool.execute(params)
+        before = sys.getallocatedblocks()
+        for _ in range(10000):
+            tool.execute(params)
+        self.assertLess(sys.getallocatedblocks() - before, 10)
+        self.assertEqual(len(self.exporter.spans), 0)
+
+    def test_exporters(self):
+        """
+        测试 JSON Lines 每个 span 一行、flush 时追加指标，Prometheus 文本包含计数器、直方图和分位数
+        """
+        path = os.path.join(self.directory, "spans.jsonl")
+        prometheus = PrometheusExporter(path=os.path.join(self.directory, "metrics.prom"))
+        tracer = instrumentation.enable([JsonLinesExporter(path), prometheus])
+        for _ in range(3):
+            with tracer.start("tool.execute", 'we"ather'):
+                pass
+        instrumentation.disable()
+
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record["type"] for record in records], ["span"] * 3 + ["metrics"])
+        self.assertEqual(records[0]["name"], "tool.execute")
+        self.assertEqual(records[-1]["metrics"][0]["calls"], 3)
+
+        with open(prometheus.path, encoding="utf-8") as f:
+            text = f.read()
+        self.assertEqual(text, prometheus.text)
+        labels = 'span="tool.execute",label="we\\"ather"'
+        self.assertIn(f"agent_span_calls_total{{{labels}}} 3", text)
+        self.assertIn(f"agent_span_errors_total{{{labels}}} 0", text)
+        self.assertIn(f'agent_span_duration_seconds_bucket{{{labels},le="+Inf"}} 3', text)
+        self.assertIn(f'agent_span_duration_seconds_bucket{{{labels},le="10.0"}} 3', text)
+        self.assertIn(f'agent_span_latency_seconds{{{labels},quantile="0.99"}}', text)
+        self.assertIn("# TYPE agent_span_duration_seconds histogram", text)
\ No newline at end of file
@@ -1,25 +1,78 @@
+import functools
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+from core import instrumentation
+from core.runtime import run_sync
+
+
+# 工具执行结果：默认为文本；调用方传入 structured=True 时为结构化字典，由调用方统一序列化
+ToolResult = Union[str, Dict[str, Any]]
+
+
+def _traced(execute: Callable[..., ToolResult]) -> Callable[..., ToolResult]:
+    # 启用埋点时每次执行记录一个以工具名为标签的 tool.execute span；未启用时只多一次变量读取
+    @functools.wraps(execute)
+    def wrapper(self: "BaseTool", params: Dict[str, Any]) -> ToolResult:
+        tracer = instrumentation.tracer
+        if tracer is None:
+            return execute(self, params)
+        with tracer.start("tool.execute", self.name):
+            return execute(self, params)
+    return wrapper
+
+
+def _timed(span: instrumentation.Span, chunks: Iterator[str]) -> Iterator[str]:
+    with span:
+        yield from chunks
+
+
+def _traced_stream(stream: Callable[..., Iterator[str]]) -> Callable[..., Iterator[str]]:
+    # 流式输出的 tool.stream span 从创建生成器开始，到输出结束或生成器被关闭为止，包含调用方处理各片段的时间
+    @functools.wraps(stream)
+    def wrapper(self: "BaseTool", params: Dict[str, Any]) -> Iterator[str]:
+        tracer = instrumentation.tracer
+        if tracer is None:
+            return stream(self, params)
+        return _timed(tracer.start("tool.stream", self.name, activate=False), stream(self, params))
+    return wrapper
 
 
 class BaseTool(ABC):
     """
     工具基类，定义了工具的基本接口
     """
+
+    # 工具名称、描述和参数的 JSON Schema，子类覆盖；注册表据此生成 function calling 描述，无需构造工具
+    name: str = ""
+    description: str = ""
+    parameters: Dict[str, Any] = {"type": "object", "properties": {}}
+    # 没有可变状态（或只有线程安全的缓存）时为 True，类和构造参数相同的实例在所有 Agent 之间共享
+    STATELESS: bool = False
     
-    def __init__(self, name: str, description: str):
+    def __init__(self, name: Optional[str] = None, description: Optional[str] = None):
         """
         初始化工具
         
         Args:
-            name (str): 工具名称
-            description (str): 工具描述
+            name (Optional[str]): 工具名称，默认使用类属性 name
+            description (Optional[str]): 工具描述，默认使用类属性 description
         """
-        self.name = name
-        self.description = description
+        if name is not None:
+            self.name = name
+        if description is not None:
+            self.description = description
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 子类实现的 execute 和 stream 统一加上埋点
+        execute = cls.__dict__.get("execute")
+        if execute is not None and not getattr(execute, "__isabstractmethod__", False):
+            cls.execute = _traced(execute)
+        if "stream" in cls.__dict__:
+            cls.stream = _traced_stream(cls.__dict__["stream"])
 
     @abstractmethod
-    def execute(self, params: Dict[str, Any]) -> str:
+    def execute(self, params: Dict[str, Any]) -> ToolResult:
         """
         执行工具的抽象方法，子类必须实现
         
@@ -27,6 +80,67 @@ class BaseTool(ABC):
             params (Dict[str, Any]): 工具执行参数
             
         Returns:
-            str: 工具执行结果
+            ToolResult: 工具执行结果
+        """
+        pass
+
+    def stream(self, params: Dict[str, Any]) -> Iterator[str]:
+        """
+        逐段输出文本结果，拼接后与 execute 的结果相同；默认一次输出完整结果，
+        结果较长的工具可以覆盖为边生成边输出
+        
+        Args:
+            params (Dict[str, Any]): 工具执行参数
+            
+        Returns:
+            Iterator[str]: 结果片段
+        """
+        yield self.execute(params)
+
+    @staticmethod
+    def respond(params: Dict[str, Any], template, data: Dict[str, Any]) -> ToolResult:
+        """
+        按调用方要求返回结果：params 中 structured 为真时直接返回数据字典，否则用预编译模板渲染为文本
+        
+        Args:
+            params (Dict[str, Any]): 工具执行参数
+            template: core.templates 中的 Template 或 ListTemplate
+            data (Dict[str, Any]): 结果数据
+            
+        Returns:
+            ToolResult: 数据字典或渲染后的文本
+        """
+        if params.get("structured"):
+            return data
+        tracer = instrumentation.tracer
+        if tracer is None:
+            return template.render(data)
+        with tracer.start("tool.format"):
+            return template.render(data)
+
+    @staticmethod
+    def fail(params: Dict[str, Any], message: str) -> ToolResult:
+        """
+        返回错误提示，结构化模式下为 {"error": 提示}
+        
+        Args:
+            params (Dict[str, Any]): 工具执行参数
+            message (str): 错误提示
+            
+        Returns:
+            ToolResult: 错误字典或提示文本
+        """
+        return {"error": message} if params.get("structured") else message
+
+    async def aexecute(self, params: Dict[str, Any]) -> ToolResult:
+        """
+        异步执行工具，默认将同步的 execute 放到共享的有界线程池中执行，
+        子类可以覆盖为原生异步实现
+        
+        Args:
+            params (Dict[str, Any]): 工具执行参数
+            
+        Returns:
+            ToolResult: 工具执行结果
         """
-        pass
\ No newline at end of file
+        return await run_sync(self.execute, params)
\ No newline at end of file
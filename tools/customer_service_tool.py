@@ -1,102 +1,149 @@
-from tools.base_tool import BaseTool
-from typing import Dict, Any
+from tools.base_tool import BaseTool, ToolResult
+from typing import Dict, Any, Optional
+from core.customer_store import CustomerStore
+from core.templates import Template
+
+
+# 模拟客户数据，未指定数据库文件时导入内存数据库
+DEFAULT_CUSTOMERS = {
+    "user123": {
+        "name": "张三",
+        "email": "zhangsan@example.com",
+        "phone": "138****8888",
+        "level": "VIP",
+        "orders": {
+            "ORD001": {
+                "product": "无线耳机",
+                "status": "已发货",
+                "tracking_number": "SF1234567890",
+                "delivery_date": "2023-10-15"
+            },
+            "ORD002": {
+                "product": "智能手表",
+                "status": "已签收",
+                "tracking_number": "YT0987654321",
+                "delivery_date": "2023-09-20"
+            }
+        }
+    },
+    "user456": {
+        "name": "李四",
+        "email": "lisi@example.com",
+        "phone": "139****9999",
+        "level": "普通会员",
+        "orders": {
+            "ORD003": {
+                "product": "蓝牙音箱",
+                "status": "处理中",
+                "tracking_number": "ZTO111222333",
+                "delivery_date": "预计2023-10-25"
+            }
+        }
+    }
+}
+
+PROFILE_TEMPLATE = Template(
+    "用户信息：\n"
+    "姓名：{name}\n"
+    "邮箱：{email}\n"
+    "手机号：{phone}\n"
+    "会员等级：{level}\n"
+    "订单数量：{order_count}个\n"
+)
+ORDER_TEMPLATE = Template(
+    "订单 {order_id} 信息：\n"
+    "商品：{product}\n"
+    "状态：{status}\n"
+    "快递单号：{tracking_number}\n"
+    "预计/实际送达日期：{delivery_date}\n"
+)
 
 
 class CustomerInfoTool(BaseTool):
     """
     客户信息工具，用于查询用户个人信息和订单信息
     """
+
+    name = "customer_info"
+    description = "Query customer information and order details"
+    parameters = {
+        "type": "object",
+        "properties": {
+            "query_type": {"type": "string", "enum": ["profile", "order"], "description": "查询类型：个人信息或订单"},
+            "user_id": {"type": "string", "description": "用户ID"},
+            "order_id": {"type": "string", "description": "订单号，查询订单时必填"},
+        },
+        "required": ["query_type"],
+    }
     
-    def __init__(self):
+    def __init__(self, db_path: Optional[str] = None, store: Optional[CustomerStore] = None):
         """
         初始化客户信息工具
+        
+        Args:
+            db_path (Optional[str]): SQLite 数据库文件路径，为空时使用导入了模拟数据的内存数据库
+            store (Optional[CustomerStore]): 自定义存储，优先于 db_path
         """
-        super().__init__("customer_info", "Query customer information and order details")
+        super().__init__()
 
-        # 模拟客户数据库
-        self.customer_db = {
-            "user123": {
-                "name": "张三",
-                "email": "zhangsan@example.com",
-                "phone": "138****8888",
-                "level": "VIP",
-                "orders": {
-                    "ORD001": {
-                        "product": "无线耳机",
-                        "status": "已发货",
-                        "tracking_number": "SF1234567890",
-                        "delivery_date": "2023-10-15"
-                    },
-                    "ORD002": {
-                        "product": "智能手表",
-                        "status": "已签收",
-                        "tracking_number": "YT0987654321",
-                        "delivery_date": "2023-09-20"
-                    }
-                }
-            },
-            "user456": {
-                "name": "李四",
-                "email": "lisi@example.com",
-                "phone": "139****9999",
-                "level": "普通会员",
-                "orders": {
-                    "ORD003": {
-                        "product": "蓝牙音箱",
-                        "status": "处理中",
-                        "tracking_number": "ZTO111222333",
-                        "delivery_date": "预计2023-10-25"
-                    }
-                }
-            }
-        }
+        # 未指定数据库文件时使用导入了模拟数据的内存数据库
+        if store is None:
+            store = CustomerStore(db_path)
+            if db_path is None:
+                store.load_nested(DEFAULT_CUSTOMERS)
+        self.store = store
 
-    def execute(self, params: Dict[str, Any]) -> str:
+    def execute(self, params: Dict[str, Any]) -> ToolResult:
         """
         执行客户信息查询
         
         Args:
-            params (Dict[str, Any]): 包含查询参数的字典
+            params (Dict[str, Any]): 包含查询参数的字典，structured 为真时返回结构化字典
             
         Returns:
-            str: 查询结果
+            ToolResult: 查询结果
         """
         query_type = params.get("query_type")
-        user_id = params.get("user_id", "guest")
-        
-        if user_id not in self.customer_db:
-            return f"未找到用户 {user_id} 的信息，请确认用户身份或联系客服。"
+        user_id = params.get("user_id")
+        if query_type == "order" and not user_id:
+            # 未确认用户身份时只凭订单号查询
+            return self._query_order(params, None)
+        user_id = user_id or "guest"
         
-        customer = self.customer_db[user_id]
+        customer = self.store.get_customer(user_id)
+        if customer is None:
+            return self.fail(params, f"未找到用户 {user_id} 的信息，请确认用户身份或联系客服。")
         
         if query_type == "profile":
             # 查询用户个人信息
-            result = f"用户信息：\n"
-            result += f"姓名：{customer['name']}\n"
-            result += f"邮箱：{customer['email']}\n"
-            result += f"手机号：{customer['phone']}\n"
-            result += f"会员等级：{customer['level']}\n"
-            result += f"订单数量：{len(customer['orders'])}个\n"
-            
-            return result
+            return self.respond(params, PROFILE_TEMPLATE, {"user_id": user_id, **customer})
             
         elif query_type == "order":
             # 查询订单信息
-            order_id = params.get("order_id")
-            if not order_id:
-                return "请提供订单号。"
-            
-            if order_id in customer['orders']:
-                order = customer['orders'][order_id]
-                result = f"订单 {order_id} 信息：\n"
-                result += f"商品：{order['product']}\n"
-                result += f"状态：{order['status']}\n"
-                result += f"快递单号：{order['tracking_number']}\n"
-                result += f"预计/实际送达日期：{order['delivery_date']}\n"
-                
-                return result
-            else:
-                return f"未找到订单号 {order_id} 的信息，请确认订单号是否正确。"
+            return self._query_order(params, user_id)
         
         else:
-            return f"不支持的查询类型: {query_type}"
\ No newline at end of file
+            return self.fail(params, f"不支持的查询类型: {query_type}")
+
+    def _query_order(self, params: Dict[str, Any], user_id: Optional[str]) -> ToolResult:
+        """
+        查询订单，未指定用户时通过全局订单号索引查询
+        
+        Args:
+            params (Dict[str, Any]): 包含查询参数的字典
+            user_id (Optional[str]): 用户ID
+            
+        Returns:
+            ToolResult: 查询结果
+        """
+        order_id = params.get("order_id")
+        if not order_id:
+            return self.fail(params, "请提供订单号。")
+        if user_id is None:
+            found = self.store.find_order(order_id)
+            order = found[1] if found is not None else None
+        else:
+            order = self.store.get_order(user_id, order_id)
+        if order is None:
+            return self.fail(params, f"未找到订单号 {order_id} 的信息，请确认订单号是否正确。")
+        return self.respond(params, ORDER_TEMPLATE, {"order_id": order_id, **order})
\ No newline at end of file
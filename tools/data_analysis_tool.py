@@ -1,92 +1,548 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 from tools.base_tool import BaseTool
-from typing import Dict, Any
+from typing import Dict, Any, Hashable, Iterator, List, Optional, Tuple
+from itertools import repeat
+import glob
 import os
+import tempfile
+import threading
+from core.charts import ChartRenderer, default_chart_renderer
+from core.columnar import (TableInfo, csv_to_arrow, empty_frame, is_columnar, pyarrow_available, read_columns,
+                           read_info)
+from core.frame_cache import CachedFrame, FrameCache, file_signature
+from core.lazy import lazy_import
+from core.templates import Template
+
+# pandas / numpy 以及依赖它们的统计模块在首次分析数据时才导入
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+streaming_stats = lazy_import("core.streaming_stats")
+
+
+# 统计报告的各部分，整体读取、流式分析与多文件分析共用
+REPORT_TEMPLATE = Template("数据形状: {shape}\n列名: {columns}\n")
+DESCRIBE_TEMPLATE = Template("\n数值列统计:\n{describe}\n")
+CORRELATION_TEMPLATE = Template("\n数值列相关性:\n{correlation}\n")
+
+# 进程内共享的数据缓存，同一文件被多个 Agent 分析时只解析一次
+default_frame_cache = FrameCache()
+
+# CSV 首次分析时转换得到的 Arrow 缓存文件目录
+DEFAULT_ARROW_CACHE_DIR = os.path.join(tempfile.gettempdir(), "data_analysis_arrow")
+
+# 多文件分析时并行计算各文件部分统计量的进程数
+ANALYSIS_WORKERS = os.cpu_count() or 1
+_process_pool: Optional["ProcessPoolExecutor"] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> "ProcessPoolExecutor":
+    global _process_pool
+    if _process_pool is None:
+        # 进程池相关模块只在多文件分析时才导入
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        with _process_pool_lock:
+            if _process_pool is None:
+                # 不使用 fork：调用方进程中通常有其他线程（如 Agent 的共享线程池）
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                _process_pool = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS, mp_context=context)
+    return _process_pool
+
+
+def close() -> None:
+    """
+    关闭共享的统计进程池并等待进行中的任务结束，之后的多文件分析会重新创建进程池
+    """
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def read_chunks(data_path: str, chunk_size: int, columns: Optional[List[str]] = None) -> Iterator["pd.DataFrame"]:
+    """
+    按分块读取数据文件：CSV 按行数分块，其他格式整体读取为一个分块
+    
+    Args:
+        data_path (str): 数据文件路径
+        chunk_size (int): CSV 每个分块的行数
+        columns (Optional[List[str]]): 只读取这些列，None 表示全部列
+        
+    Returns:
+        Iterator[pd.DataFrame]: 数据分块
+    """
+    if data_path.endswith('.csv'):
+        with pd.read_csv(data_path, usecols=columns, chunksize=chunk_size) as reader:
+            yield from reader
+    elif is_columnar(data_path):
+        if columns is None:
+            # 先用空表记录全部列名和类型，数据只读取数值列
+            yield empty_frame(data_path)
+            columns = read_info(data_path).numeric_columns
+        yield read_columns(data_path, columns)
+    else:
+        df = DataAnalysisTool._loader(data_path)(data_path)
+        yield df if columns is None else df[columns]
+
+
+def summarize_file(data_path: str, chunk_size: int) -> "streaming_stats.StreamingSummary":
+    """
+    计算单个文件的部分统计量，可在子进程中执行
+    
+    Args:
+        data_path (str): 数据文件路径
+        chunk_size (int): CSV 每个分块的行数
+        
+    Returns:
+        StreamingSummary: 统计结果
+    """
+    summary = streaming_stats.StreamingSummary()
+    for chunk in read_chunks(data_path, chunk_size):
+        summary.update(chunk)
+    return summary
 
 
 class DataAnalysisTool(BaseTool):
     """
     数据分析工具，用于读取、分析和可视化数据
     """
+
+    name = "data_analysis"
+    description = "Analyze data and generate insights"
+    parameters = {
+        "type": "object",
+        "properties": {
+            "data_path": {"type": "string", "description": "数据文件路径，也可以是目录或通配符"},
+            "query": {"type": "string", "description": "分析需求，包含“图”“chart”等词时生成直方图"},
+            "stream": {"type": "boolean", "description": "是否分块流式分析 CSV"},
+            "wait_chart": {"type": "boolean", "description": "是否等待图表渲染完成"},
+        },
+        "required": ["data_path"],
+    }
     
-    def __init__(self):
+    # 直方图的分箱数量
+    HIST_BINS = 20
+    # 已解析数据的缓存和图表渲染器本身就是进程内共享的
+    STATELESS = True
+
+    def __init__(self, frame_cache: FrameCache = None, chunk_size: int = 100000,
+                 stream_threshold: Optional[int] = 256 * 1024 * 1024,
+                 arrow_cache_dir: Optional[str] = DEFAULT_ARROW_CACHE_DIR, chart_renderer: ChartRenderer = None):
         """
         初始化数据分析工具
+        
+        Args:
+            frame_cache (FrameCache): 已解析数据的缓存，默认使用进程内共享缓存
+            chunk_size (int): 流式分析时每个分块的行数
+            stream_threshold (Optional[int]): CSV 文件超过该大小（字节）时分块流式分析，
+                不再整体载入内存；None 表示只在参数 stream 为 True 时流式分析
+            arrow_cache_dir (Optional[str]): 安装了 pyarrow 时，CSV 首次分析后转换为 Arrow 文件
+                缓存在该目录，之后只读取数值列；None 表示不转换
+            chart_renderer (ChartRenderer): 后台图表渲染器，默认使用进程内共享的渲染器
         """
-        super().__init__("data_analysis", "Analyze data and generate insights")
+        super().__init__()
+        self.frame_cache = frame_cache if frame_cache is not None else default_frame_cache
+        self.chunk_size = chunk_size
+        self.stream_threshold = stream_threshold
+        self.arrow_cache_dir = arrow_cache_dir
+        self.chart_renderer = chart_renderer if chart_renderer is not None else default_chart_renderer
 
     def execute(self, params: Dict[str, Any]) -> str:
         """
         执行数据分析
         
         Args:
-            params (Dict[str, Any]): 包含数据路径和查询的参数字典
+            params (Dict[str, Any]): 包含数据路径和查询的参数字典，wait_chart 为 True 时
+                等待图表渲染完成再返回，默认图表在后台渲染
             
         Returns:
             str: 数据分析结果
         """
         try:
-            data_path = params.get("data_path")
-            query = params.get("query", "")
+            return "".join(self._sections(params))
+        except Exception as e:
+            return self._error_message(e, params.get("data_path"))
+
+    def stream(self, params: Dict[str, Any]) -> Iterator[str]:
+        """
+        逐段输出数据分析结果：标题、统计报告、图表信息，标题在读取数据之前就输出
+        
+        Args:
+            params (Dict[str, Any]): 与 execute 相同
+            
+        Returns:
+            Iterator[str]: 结果片段
+        """
+        started = False
+        try:
+            for section in self._sections(params):
+                started = True
+                yield section
+        except Exception as e:
+            message = self._error_message(e, params.get("data_path"))
+            yield "\n" + message if started else message
+
+    @staticmethod
+    def _error_message(error: Exception, data_path: Optional[str]) -> str:
+        if isinstance(error, FileNotFoundError):
+            return f"错误：找不到文件 {data_path}"
+        if isinstance(error, pd.errors.EmptyDataError):
+            return "错误：数据文件为空"
+        if isinstance(error, pd.errors.ParserError):
+            return "错误：数据文件解析失败"
+        return f"数据分析时出错：{type(error).__name__}: {str(error)}"
+
+    def _sections(self, params: Dict[str, Any]) -> Iterator[str]:
+        """
+        按段生成数据分析结果，异常由调用方转换为错误提示
+        
+        Args:
+            params (Dict[str, Any]): 包含数据路径和查询的参数字典
             
-            if not data_path:
-                return "错误：未提供数据路径"
+        Returns:
+            Iterator[str]: 结果片段
+        """
+        data_path = params.get("data_path")
+        query = params.get("query", "")
+        
+        if not data_path:
+            yield "错误：未提供数据路径"
+            return
+        
+        # 目录或通配符：合并目录下所有分片文件的统计结果
+        paths = self._expand(data_path)
+        if paths is not None:
+            yield from self._analyze_many(data_path, paths, query, params.get("wait_chart", False))
+            return
+        
+        # 检查文件是否存在
+        if not os.path.exists(data_path):
+            yield f"错误：文件 {data_path} 不存在"
+            return
+        
+        loader = self._loader(data_path)
+        if loader is None:
+            yield f"错误：不支持的文件格式: {data_path}"
+            return
+        if is_columnar(data_path) and not pyarrow_available():
+            yield f"错误：读取 {data_path} 需要安装 pyarrow"
+            return
+        
+        # 标题先输出，读取和统计较慢的部分随后逐段输出
+        yield f"数据文件 {data_path} 分析结果：\n"
+        
+        if self._should_stream(data_path, params):
+            # 大文件分块读取，单次扫描累积统计量，内存占用与文件大小无关
+            entry = self.frame_cache.load(data_path, self._stream_summary, lambda summary: summary.nbytes,
+                                          variant="stream")
+            summary = entry.frame
+            numeric_cols = summary.numeric_columns
+            yield entry.memo("summary", lambda: self._report(
+                summary.shape, summary.columns,
+                summary.describe() if numeric_cols else None,
+                summary.corr() if len(numeric_cols) > 1 else None))
+            histogram = lambda column: self._file_histogram(data_path, column, summary.value_range(column))
+        else:
+            source = self._arrow_source(data_path)
+            if source is not None:
+                # 列式数据先读 schema，只解码数值列（投影下推）
+                entry = self.frame_cache.load(source, self._read_numeric, lambda frame: self._sizeof(frame[1]),
+                                              variant="numeric")
+                info, df = entry.frame
+                numeric_cols = info.numeric_columns
+                yield entry.memo("summary", lambda: self._summarize(df, numeric_cols, info.shape, info.columns))
+            else:
+                # 读取数据（文件未变化时复用已解析的数据）
+                entry = self.frame_cache.load(data_path, loader, self._sizeof)
+                df = entry.frame
+                
+                # 基本数据分析（统计结果随数据一起缓存）
+                numeric_cols = entry.memo("numeric_cols",
+                                          lambda: df.select_dtypes(include=['number']).columns.tolist())
+                yield entry.memo("summary", lambda: self._summarize(df, numeric_cols))
+            histogram = lambda column: np.histogram(df[column].dropna(), bins=self.HIST_BINS)
+        
+        chart_path = data_path.rsplit('.', 1)[0] + '_chart.png'
+        chart = self._chart(query, entry, entry.key, numeric_cols, histogram, chart_path,
+                            params.get("wait_chart", False))
+        if chart:
+            yield chart
+
+    def _analyze_many(self, data_path: str, paths: List[str], query: str, wait_chart: bool = False) -> Iterator[str]:
+        """
+        分析多个数据文件：各文件的部分统计量在进程池中并行计算，合并后生成同一格式的报告
+        
+        Args:
+            data_path (str): 目录或通配符
+            paths (List[str]): 匹配到的数据文件
+            query (str): 用户查询
+            wait_chart (bool): 是否等待图表渲染完成
             
-            # 检查文件是否存在
-            if not os.path.exists(data_path):
-                return f"错误：文件 {data_path} 不存在"
+        Returns:
+            Iterator[str]: 数据分析结果片段
+        """
+        if not paths:
+            yield f"错误：{data_path} 中没有支持的数据文件"
+            return
+        if not pyarrow_available() and any(is_columnar(path) for path in paths):
+            yield f"错误：读取 {data_path} 中的列式文件需要安装 pyarrow"
+            return
+        yield f"数据文件 {data_path} 分析结果（共 {len(paths)} 个文件）：\n"
+        
+        entries = self._file_summaries(paths)
+        summary = streaming_stats.StreamingSummary()
+        for entry in entries:
+            summary.merge(entry.frame)
+        numeric_cols = summary.numeric_columns
+        yield self._report(summary.shape, summary.columns,
+                           summary.describe() if numeric_cols else None,
+                           summary.corr() if len(numeric_cols) > 1 else None)
+        
+        def histogram(column: str):
+            # 各文件按合并后的取值范围分箱，频次直接相加
+            value_range = summary.value_range(column)
+            counts = np.zeros(self.HIST_BINS, dtype="int64")
+            edges = None
+            for path, entry in zip(paths, entries):
+                if column in entry.frame.numeric_columns:
+                    file_counts, edges = entry.memo(("histogram", column, value_range),
+                                                    lambda: self._file_histogram(path, column, value_range))
+                    counts += file_counts
+            return counts, edges
+        
+        chart_path = os.path.join(os.path.commonpath([os.path.dirname(path) for path in paths]), 'merged_chart.png')
+        fingerprint = tuple(entry.key for entry in entries)
+        chart = self._chart(query, CachedFrame(None, summary, summary.nbytes), fingerprint, numeric_cols,
+                            histogram, chart_path, wait_chart)
+        if chart:
+            yield chart
+
+    def _expand(self, data_path: str) -> Optional[List[str]]:
+        """
+        展开目录或通配符
+        
+        Args:
+            data_path (str): 数据路径
             
-            # 读取数据
-            if data_path.endswith('.csv'):
-                df = pd.read_csv(data_path)
-            elif data_path.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(data_path)
-            elif data_path.endswith('.json'):
-                df = pd.read_json(data_path)
+        Returns:
+            Optional[List[str]]: 排序后的受支持数据文件，data_path 是单个文件时返回 None
+        """
+        if os.path.isdir(data_path):
+            candidates = [os.path.join(data_path, name) for name in os.listdir(data_path)]
+        elif glob.has_magic(data_path):
+            candidates = glob.glob(data_path, recursive=True)
+        else:
+            return None
+        return sorted(path for path in candidates if os.path.isfile(path) and self._loader(path) is not None)
+
+    def _file_summaries(self, paths: List[str]) -> List[CachedFrame]:
+        """
+        获取各文件的部分统计量，未缓存的文件在进程池中并行计算
+        
+        Args:
+            paths (List[str]): 数据文件
+            
+        Returns:
+            List[CachedFrame]: 与 paths 顺序一致的缓存条目，与单文件流式分析共用缓存
+        """
+        entries = {}
+        missing = []
+        for path in paths:
+            key = (file_signature(path), "stream")
+            entry = self.frame_cache.get(key)
+            if entry is None:
+                missing.append((path, key))
             else:
-                return f"错误：不支持的文件格式: {data_path}"
+                entries[path] = entry
+        
+        missing_paths = [path for path, _ in missing]
+        if len(missing) > 1:
+            pool = _get_process_pool()
+            # 文件较多时每个任务处理多个文件，减少进程间通信次数
+            batch = max(1, len(missing) // (ANALYSIS_WORKERS * 4))
+            summaries = pool.map(summarize_file, missing_paths, repeat(self.chunk_size), chunksize=batch)
+        else:
+            summaries = [summarize_file(path, self.chunk_size) for path in missing_paths]
+        for (path, key), summary in zip(missing, summaries):
+            entry = entries[path] = CachedFrame(key, summary, summary.nbytes)
+            self.frame_cache.put(entry)
+        return [entries[path] for path in paths]
+
+    def _chart(self, query: str, entry: CachedFrame, fingerprint: Hashable, numeric_cols: List[str], histogram,
+               chart_path: str, wait: bool = False) -> str:
+        """
+        查询包含可视化请求时绘制第一个数值列的直方图，图表在后台线程渲染
+        
+        Args:
+            query (str): 用户查询
+            entry (CachedFrame): 缓存条目，直方图结果缓存在其中
+            fingerprint (Hashable): 数据指纹，文件变化后随之变化
+            numeric_cols (List[str]): 数值列
+            histogram: 计算 (频次, 分箱边界) 的函数
+            chart_path (str): 图表保存路径
+            wait (bool): 是否等待渲染完成
             
-            # 基本数据分析
-            result = f"数据文件 {data_path} 分析结果：\n"
-            result += f"数据形状: {df.shape}\n"
-            result += f"列名: {list(df.columns)}\n"
+        Returns:
+            str: 追加到分析结果后的文本，没有生成图表时为空
+        """
+        # 如果查询包含可视化请求，生成图表
+        if not any(visual_keyword in query.lower() for visual_keyword in ['plot', 'chart', 'graph', 'visual', '图', '可视化']):
+            return ""
+        
+        # 如果有数值列，绘制第一列的直方图
+        if not numeric_cols:
+            return ""
+        column = numeric_cols[0]
+        # 频次和分箱边界用 numpy 预先计算并随数据缓存，渲染线程只负责绘图
+        counts, edges = entry.memo(("histogram", column), lambda: histogram(column))
+        future, cached = self.chart_renderer.histogram((fingerprint, column, self.HIST_BINS), chart_path,
+                                                       counts, edges, column)
+        if cached or wait:
+            future.result()
+            return f"\n已生成图表并保存至: {chart_path}"
+        return f"\n图表正在后台生成，完成后保存至: {chart_path}"
+
+    @classmethod
+    def _loader(cls, data_path: str):
+        """
+        根据文件扩展名选择解析函数
+        
+        Args:
+            data_path (str): 数据文件路径
             
-            # 数值列统计
-            numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-            if numeric_cols:
-                result += f"\n数值列统计:\n{df[numeric_cols].describe()}\n"
-                
-                # 如果有多个数值列，生成相关性矩阵
-                if len(numeric_cols) > 1:
-                    correlation = df[numeric_cols].corr()
-                    result += f"\n数值列相关性:\n{correlation}\n"
+        Returns:
+            解析函数，不支持的格式返回 None
+        """
+        if data_path.endswith('.csv'):
+            return pd.read_csv
+        elif data_path.endswith(('.xlsx', '.xls')):
+            return pd.read_excel
+        elif data_path.endswith('.json'):
+            return pd.read_json
+        elif is_columnar(data_path):
+            return cls._read_numeric
+        return None
+
+    @staticmethod
+    def _read_numeric(data_path: str) -> Tuple[TableInfo, "pd.DataFrame"]:
+        """
+        读取列式文件的元数据和数值列，其余列不解码
+        
+        Args:
+            data_path (str): Parquet / Feather / Arrow IPC 文件路径
             
-            # 如果查询包含可视化请求，生成图表
-            if any(visual_keyword in query.lower() for visual_keyword in ['plot', 'chart', 'graph', 'visual', '图', '可视化']):
-                # 生成简单的柱状图
-                plt.figure(figsize=(10, 6))
-                
-                # 如果有数值列，绘制第一列的直方图
-                if numeric_cols:
-                    plt.hist(df[numeric_cols[0]].dropna(), bins=20)
-                    plt.title(f'{numeric_cols[0]} 分布直方图')
-                    plt.xlabel(numeric_cols[0])
-                    plt.ylabel('频次')
-                    
-                    # 保存图表
-                    chart_path = data_path.rsplit('.', 1)[0] + '_chart.png'
-                    plt.savefig(chart_path)
-                    plt.close()
-                    
-                    result += f"\n已生成图表并保存至: {chart_path}"
+        Returns:
+            (元数据, 只包含数值列的数据)
+        """
+        info = read_info(data_path)
+        return info, read_columns(data_path, info.numeric_columns)
+
+    def _arrow_source(self, data_path: str) -> Optional[str]:
+        """
+        选择按列读取的数据源：列式文件直接读取，CSV 使用转换后的 Arrow 缓存文件
+        
+        Args:
+            data_path (str): 数据文件路径
             
-            return result
-        except FileNotFoundError:
-            return f"错误：找不到文件 {data_path}"
-        except pd.errors.EmptyDataError:
-            return "错误：数据文件为空"
-        except pd.errors.ParserError:
-            return "错误：数据文件解析失败"
-        except Exception as e:
-            return f"数据分析时出错：{type(e).__name__}: {str(e)}"
\ No newline at end of file
+        Returns:
+            Optional[str]: 列式文件路径，需要用 pandas 整体读取时返回 None
+        """
+        if is_columnar(data_path):
+            return data_path
+        if data_path.endswith('.csv') and self.arrow_cache_dir is not None and pyarrow_available():
+            return csv_to_arrow(data_path, self.arrow_cache_dir)
+        return None
+
+    @staticmethod
+    def _sizeof(df: "pd.DataFrame") -> int:
+        return int(df.memory_usage(index=True, deep=True).sum())
+
+    def _should_stream(self, data_path: str, params: Dict[str, Any]) -> bool:
+        """
+        判断是否分块流式分析（仅支持 CSV）
+        """
+        if not data_path.endswith('.csv'):
+            return False
+        if params.get("stream") is not None:
+            return bool(params["stream"])
+        return self.stream_threshold is not None and os.path.getsize(data_path) > self.stream_threshold
+
+    def _stream_summary(self, data_path: str) -> "streaming_stats.StreamingSummary":
+        """
+        分块读取 CSV 并累积统计量
+        
+        Args:
+            data_path (str): 数据文件路径
+            
+        Returns:
+            StreamingSummary: 统计结果
+        """
+        return summarize_file(data_path, self.chunk_size)
+
+    def _file_histogram(self, data_path: str, column: str, value_range: Tuple[float, float]):
+        """
+        第二次分块扫描单个数值列，按已知的取值范围累积直方图
+        
+        Args:
+            data_path (str): 数据文件路径
+            column (str): 列名
+            value_range (Tuple[float, float]): 列的最小值与最大值
+            
+        Returns:
+            (频次, 分箱边界)，与 numpy.histogram 的结果一致
+        """
+        counts = np.zeros(self.HIST_BINS, dtype="int64")
+        edges = None
+        for chunk in read_chunks(data_path, self.chunk_size, columns=[column]):
+            chunk_counts, edges = np.histogram(chunk[column].dropna(), bins=self.HIST_BINS, range=value_range)
+            counts += chunk_counts
+        return counts, edges
+
+    @classmethod
+    def _summarize(cls, df: "pd.DataFrame", numeric_cols: List[str], shape: Optional[Tuple[int, int]] = None,
+                   columns: Optional[List[str]] = None) -> str:
+        """
+        生成数据形状、列名、数值列统计和相关性矩阵的文本
+        
+        Args:
+            df (pd.DataFrame): 数据
+            numeric_cols (List[str]): 数值列
+            shape (Optional[Tuple[int, int]]): 完整数据的形状，df 只包含部分列时传入
+            columns (Optional[List[str]]): 完整数据的列名，df 只包含部分列时传入
+            
+        Returns:
+            str: 统计结果文本
+        """
+        numeric = df[numeric_cols]
+        return cls._report(shape if shape is not None else df.shape,
+                           columns if columns is not None else df.columns,
+                           numeric.describe() if numeric_cols else None,
+                           numeric.corr() if len(numeric_cols) > 1 else None)
+
+    @staticmethod
+    def _report(shape: Tuple[int, int], columns, describe: Optional["pd.DataFrame"],
+                correlation: Optional["pd.DataFrame"]) -> str:
+        """
+        将统计结果格式化为文本，整体读取与流式分析共用同一格式
+        
+        Args:
+            shape (Tuple[int, int]): 数据形状
+            columns: 列名
+            describe (Optional["pd.DataFrame"]): 数值列统计，没有数值列时为 None
+            correlation (Optional["pd.DataFrame"]): 数值列相关性矩阵，数值列少于两列时为 None
+            
+        Returns:
+            str: 统计结果文本
+        """
+        parts = [REPORT_TEMPLATE.render(shape=shape, columns=list(columns))]
+        
+        # 数值列统计
+        if describe is not None:
+            parts.append(DESCRIBE_TEMPLATE.render(describe=describe))
+            
+            # 如果有多个数值列，生成相关性矩阵
+            if correlation is not None:
+                parts.append(CORRELATION_TEMPLATE.render(correlation=correlation))
+        return "".join(parts)
\ No newline at end of file
@@ -1,88 +1,196 @@
-from tools.base_tool import BaseTool
-from typing import Dict, Any
-import re
+import os
+from tools.base_tool import BaseTool, ToolResult
+from typing import Dict, Any, Iterator, List, Optional
+from core.lazy import lazy_import
+from core.templates import ListTemplate
+from core.search_index import BaseIndex, InvertedIndex
+from core.disk_index import SegmentedIndex
+
+# 向量检索依赖 numpy，首次构造知识库工具时才导入
+vector_index = lazy_import("core.vector_index")
+
+
+# 模拟知识库，keywords 为检索时补充的同义词
+DEFAULT_KNOWLEDGE_BASE = {
+    "退货政策": {
+        "title": "退货政策",
+        "content": "我们提供7天无理由退货服务。商品需保持原包装且未经使用。请联系客服获取退货标签。",
+        "keywords": ["退货", "return", "政策", "退款"]
+    },
+    "配送时间": {
+        "title": "配送时间",
+        "content": "一般订单在1-3个工作日内发货，配送时间根据地区不同为2-7个工作日。",
+        "keywords": ["配送", "delivery", "时间", "多久", "天"]
+    },
+    "支付方式": {
+        "title": "支付方式", 
+        "content": "我们支持微信支付、支付宝、银联卡、信用卡等多种支付方式。",
+        "keywords": ["支付", "付款", "方式", "pay"]
+    },
+    "会员权益": {
+        "title": "会员权益",
+        "content": "VIP会员享受9折优惠、专属客服、生日礼物等特权。",
+        "keywords": ["会员", "权益", "特权", "VIP"]
+    },
+    "产品保修": {
+        "title": "产品保修",
+        "content": "所有产品享受1年免费保修服务，保修期内非人为损坏可免费维修或更换。",
+        "keywords": ["保修", "维修", "售后"]
+    }
+}
+
+# 参与检索的条目字段
+INDEX_FIELDS = ("title", "keywords", "content")
+
+MATCH_TEMPLATE = ListTemplate("根据您的问题，找到以下相关信息：\n\n", "{index}. {title}\n   {content}\n\n")
+NO_MATCH_TEMPLATE = ListTemplate(
+    "抱歉，我没有找到与您问题直接相关的信息。我们的知识库包含以下主题：", "{value}",
+    "。\n您可以重新表述问题，或联系人工客服获取更详细的帮助。", items_key="topics", separator="、")
 
 
 class KnowledgeBaseTool(BaseTool):
     """
     知识库工具，用于回答常见问题和提供帮助信息
     """
+
+    name = "knowledge_base"
+    description = "Answer common questions and provide help information"
+    parameters = {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "用户问题"},
+        },
+        "required": ["query"],
+    }
     
-    def __init__(self):
+    def __init__(self, index: BaseIndex = None, top_k: int = 3, min_score_ratio: float = 0.3, max_topics: int = 20,
+                 index_dir: Optional[str] = None, vector_search: bool = True, vectors: Optional[BaseIndex] = None,
+                 vector_min_score: float = 0.05, vector_dim: int = 1024):
         """
         初始化知识库工具
+        
+        Args:
+            index (BaseIndex): 检索索引，默认使用内存倒排索引；需按 INDEX_FIELDS 建立
+            top_k (int): 最多返回的条目数量
+            min_score_ratio (float): 结果得分低于最高得分该比例时丢弃
+            max_topics (int): 未命中时最多列出的主题数量
+            index_dir (Optional[str]): 磁盘持久化索引目录，设置后使用 SegmentedIndex，
+                重启时直接映射已有索引文件而不必重建
+            vector_search (bool): 倒排索引没有命中时是否退回向量检索
+            vectors (Optional[BaseIndex]): 向量索引，默认使用哈希 n-gram TF-IDF 的 VectorIndex，
+                设置 index_dir 时持久化到其中的 vectors 子目录
+            vector_min_score (float): 向量检索结果的最低余弦相似度
+            vector_dim (int): 默认向量索引的维度，每个条目占用 4 * vector_dim 字节
+        """
+        super().__init__()
+        self.top_k = top_k
+        self.min_score_ratio = min_score_ratio
+        self.max_topics = max_topics
+
+        # 加载时一次性建立索引；持久化索引已有数据时直接复用，无需重建
+        if index is None:
+            index = SegmentedIndex(index_dir, fields=INDEX_FIELDS) if index_dir else InvertedIndex(fields=INDEX_FIELDS)
+        elif tuple(getattr(index, "fields", INDEX_FIELDS)) != INDEX_FIELDS:
+            # 缺少 keywords 字段时同义词无法命中
+            raise ValueError(f"知识库索引的字段应为 {INDEX_FIELDS}，实际为 {tuple(index.fields)}")
+        self.index = index
+        if not len(self.index):
+            self.index.add_documents(DEFAULT_KNOWLEDGE_BASE.items())
+
+        # 关键词没有命中时按字符 n-gram 向量的相似度检索，覆盖同义词表之外的说法
+        self.vector_min_score = vector_min_score
+        self.vectors = vectors
+        if self.vectors is None and vector_search:
+            self.vectors = vector_index.VectorIndex(
+                fields=INDEX_FIELDS, embedder=vector_index.HashingEmbedder(dim=vector_dim),
+                directory=os.path.join(index_dir, "vectors") if index_dir else None)
+        if self.vectors is not None and not len(self.vectors):
+            self.vectors.add_documents((doc_id, self.index.get_document(doc_id)) for doc_id in self.index.doc_ids())
+            self._save_vectors()
+
+    def add_entry(self, keyword: str, entry: Dict[str, Any]) -> None:
+        """
+        新增或更新知识库条目
+        
+        Args:
+            keyword (str): 条目关键词
+            entry (Dict[str, Any]): 条目内容，包含 title、content 和可选的 keywords
+        """
+        self.index.add_document(keyword, entry)
+        if self.vectors is not None:
+            self.vectors.add_document(keyword, entry)
+            self._save_vectors()
+
+    def remove_entry(self, keyword: str) -> None:
+        """
+        删除知识库条目
+        
+        Args:
+            keyword (str): 条目关键词
         """
-        super().__init__("knowledge_base", "Answer common questions and provide help information")
-
-        # 模拟知识库
-        self.knowledge_base = {
-            "退货政策": {
-                "title": "退货政策",
-                "content": "我们提供7天无理由退货服务。商品需保持原包装且未经使用。请联系客服获取退货标签。"
-            },
-            "配送时间": {
-                "title": "配送时间",
-                "content": "一般订单在1-3个工作日内发货，配送时间根据地区不同为2-7个工作日。"
-            },
-            "支付方式": {
-                "title": "支付方式", 
-                "content": "我们支持微信支付、支付宝、银联卡、信用卡等多种支付方式。"
-            },
-            "会员权益": {
-                "title": "会员权益",
-                "content": "VIP会员享受9折优惠、专属客服、生日礼物等特权。"
-            },
-            "产品保修": {
-                "title": "产品保修",
-                "content": "所有产品享受1年免费保修服务，保修期内非人为损坏可免费维修或更换。"
-            }
-        }
-
-    def execute(self, params: Dict[str, Any]) -> str:
+        self.index.remove_document(keyword)
+        if self.vectors is not None:
+            self.vectors.remove_document(keyword)
+            self._save_vectors()
+
+    def _save_vectors(self) -> None:
+        if getattr(self.vectors, "directory", None):
+            self.vectors.save()
+
+    def execute(self, params: Dict[str, Any]) -> ToolResult:
         """
         执行知识库查询
         
         Args:
-            params (Dict[str, Any]): 包含查询参数的字典
+            params (Dict[str, Any]): 包含查询参数的字典，structured 为真时返回结构化字典
             
         Returns:
-            str: 查询结果
+            ToolResult: 查询结果
         """
-        query = params.get("query", "").lower()
-        
-        # 通过关键词匹配查找相关条目
-        matched_entries = []
-        for keyword, entry in self.knowledge_base.items():
-            # 检查关键词、标题或内容中是否包含查询词
-            if (keyword.lower() in query or 
-                entry['title'].lower() in query or 
-                any(kw in query for kw in [keyword.lower(), entry['title'].lower()]) or
-                query in entry['content'].lower()):
-                matched_entries.append(entry)
-        
-        # 如果没有精确匹配，尝试模糊匹配
-        if not matched_entries:
-            for keyword, entry in self.knowledge_base.items():
-                # 检查是否包含相关词汇
-                if any(token in query for token in ['配送', 'delivery', '时间', '多久', '天']) and '配送时间' in entry['title']:
-                    matched_entries.append(entry)
-                elif any(token in query for token in ['退货', 'return', '政策', '退款']) and '退货政策' in entry['title']:
-                    matched_entries.append(entry)
-                elif any(token in query for token in ['支付', '付款', '方式', 'pay']) and '支付方式' in entry['title']:
-                    matched_entries.append(entry)
-                elif any(token in query for token in ['会员', '权益', '特权', 'VIP']) and '会员权益' in entry['title']:
-                    matched_entries.append(entry)
-                elif any(token in query for token in ['保修', '维修', '售后']) and '产品保修' in entry['title']:
-                    matched_entries.append(entry)
+        query = params.get("query", "")
+        matched_entries = [self.index.get_document(doc_id) for doc_id in self._matches(query)]
         
         if matched_entries:
             # 如果找到匹配项，返回相关内容
-            result = "根据您的问题，找到以下相关信息：\n\n"
-            for i, entry in enumerate(matched_entries, 1):
-                result += f"{i}. {entry['title']}\n"
-                result += f"   {entry['content']}\n\n"
-            return result
+            return self.respond(params, MATCH_TEMPLATE, {"query": query, "items": matched_entries})
         else:
             # 如果没找到匹配项，提供通用帮助信息
-            all_topics = "、".join(self.knowledge_base.keys())
-            return f"抱歉，我没有找到与您问题直接相关的信息。我们的知识库包含以下主题：{all_topics}。\n您可以重新表述问题，或联系人工客服获取更详细的帮助。"
\ No newline at end of file
+            return self.respond(params, NO_MATCH_TEMPLATE,
+                                {"query": query, "items": [], "topics": self.index.doc_ids(limit=self.max_topics)})
+
+    def stream(self, params: Dict[str, Any]) -> Iterator[str]:
+        """
+        逐条输出匹配的条目，每读取一个条目就输出一条
+        
+        Args:
+            params (Dict[str, Any]): 包含查询参数的字典
+            
+        Returns:
+            Iterator[str]: 结果片段
+        """
+        query = params.get("query", "")
+        doc_ids = self._matches(query)
+        if not doc_ids:
+            yield NO_MATCH_TEMPLATE.render({"topics": self.index.doc_ids(limit=self.max_topics)})
+            return
+        entries = (self.index.get_document(doc_id) for doc_id in doc_ids)
+        yield from MATCH_TEMPLATE.stream({"query": query, "items": entries})
+
+    def _matches(self, query: str) -> List[str]:
+        """
+        通过索引检索相关条目，没有命中时退回向量检索，并丢弃得分过低的长尾结果
+        
+        Args:
+            query (str): 查询文本
+            
+        Returns:
+            List[str]: 按相关度排序的条目ID
+        """
+        hits = self.index.search(query, top_k=self.top_k)
+        if not hits and self.vectors is not None:
+            hits = [(doc_id, score) for doc_id, score in self.vectors.search(query, top_k=self.top_k)
+                    if score >= self.vector_min_score]
+        if not hits:
+            return []
+        threshold = hits[0][1] * self.min_score_ratio
+        return [doc_id for doc_id, score in hits if score >= threshold]
\ No newline at end of file
@@ -1,18 +1,40 @@
 import random
-from tools.base_tool import BaseTool
-from typing import Dict, Any
+from tools.base_tool import BaseTool, ToolResult
+from typing import Dict, Any, Optional
+from core.templates import ListTemplate, Template
+
+
+RESOURCES_TEMPLATE = ListTemplate("为您推荐以下{subject}学习资源：\n", "{index}. [{title}]({url}) - {type}\n")
+NO_RESOURCES_TEMPLATE = ListTemplate("抱歉，没有找到关于 {subject} 的资源。我们当前提供以下主题的学习资源：\n", "- {value}\n",
+                                     items_key="topics")
+EXERCISE_TEMPLATE = Template("{subject}练习题：\n问题：{question}\n答案：{answer}\n")
+NO_EXERCISE_TEMPLATE = ListTemplate("抱歉，没有找到关于 {subject} 的练习题。我们当前提供以下主题的练习题：", "{value}",
+                                    items_key="topics", separator="、")
 
 
 class LearningResourceTool(BaseTool):
     """
     学习资源工具，用于推荐学习资源和生成练习题
     """
+
+    name = "learning_resource"
+    description = "Recommend learning resources and generate practice exercises"
+    parameters = {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "用户请求，包含“练习”“题目”等词时生成练习题"},
+            "subject": {"type": "string", "description": "学习主题，如 python、ai、web"},
+            "user_id": {"type": "string", "description": "用户ID"},
+        },
+    }
+    # 资源库只读
+    STATELESS = True
     
     def __init__(self):
         """
         初始化学习资源工具
         """
-        super().__init__("learning_resource", "Recommend learning resources and generate practice exercises")
+        super().__init__()
 
         # 模拟学习资源库
         self.resource_library = {
@@ -46,15 +68,15 @@ class LearningResourceTool(BaseTool):
             ]
         }
 
-    def execute(self, params: Dict[str, Any]) -> str:
+    def execute(self, params: Dict[str, Any]) -> ToolResult:
         """
         执行学习资源推荐或练习题生成
         
         Args:
-            params (Dict[str, Any]): 包含查询参数的字典
+            params (Dict[str, Any]): 包含查询参数的字典，structured 为真时返回结构化字典
             
         Returns:
-            str: 学习资源或练习题
+            ToolResult: 学习资源或练习题
         """
         query = params.get("query", "")
         subject = params.get("subject", "")
@@ -65,9 +87,9 @@ class LearningResourceTool(BaseTool):
         
         # 检查是否请求练习题
         if any(keyword in query.lower() for keyword in ["练习", "题目", "question", "test", "quiz", "习题"]):
-            return self._generate_exercise(target_subject)
+            return self._generate_exercise(target_subject, params)
         else:
-            return self._recommend_resources(target_subject)
+            return self._recommend_resources(target_subject, params)
 
     def _infer_subject_from_query(self, query: str) -> str:
         """
@@ -90,52 +112,44 @@ class LearningResourceTool(BaseTool):
             # 默认返回一个随机主题
             return random.choice(list(self.resource_library.keys()))
 
-    def _recommend_resources(self, subject: str) -> str:
+    def _recommend_resources(self, subject: str, params: Optional[Dict[str, Any]] = None) -> ToolResult:
         """
         推荐学习资源
         
         Args:
             subject (str): 学习主题
+            params (Optional[Dict[str, Any]]): 工具执行参数，决定是否返回结构化字典
             
         Returns:
-            str: 学习资源推荐
+            ToolResult: 学习资源推荐
         """
+        params = params or {}
         subject = subject.lower()
         if subject in self.resource_library:
             resources = self.resource_library[subject]
             selected_resources = random.sample(resources, min(2, len(resources)))
-            
-            result = f"为您推荐以下{subject}学习资源：\n"
-            for i, resource in enumerate(selected_resources, 1):
-                result += f"{i}. [{resource['title']}]({resource['url']}) - {resource['type']}\n"
-            
-            return result
+            return self.respond(params, RESOURCES_TEMPLATE, {"subject": subject, "items": selected_resources})
         else:
             # 如果找不到特定主题，推荐所有可用主题
-            result = f"抱歉，没有找到关于 {subject} 的资源。我们当前提供以下主题的学习资源：\n"
-            for topic in self.resource_library.keys():
-                result += f"- {topic}\n"
-            return result
+            return self.respond(params, NO_RESOURCES_TEMPLATE,
+                                {"subject": subject, "items": [], "topics": list(self.resource_library)})
 
-    def _generate_exercise(self, subject: str) -> str:
+    def _generate_exercise(self, subject: str, params: Optional[Dict[str, Any]] = None) -> ToolResult:
         """
         生成练习题
         
         Args:
             subject (str): 学习主题
+            params (Optional[Dict[str, Any]]): 工具执行参数，决定是否返回结构化字典
             
         Returns:
-            str: 练习题
+            ToolResult: 练习题
         """
+        params = params or {}
         subject = subject.lower()
         if subject in self.exercise_library:
-            exercises = self.exercise_library[subject]
-            selected_exercise = random.choice(exercises)
-            
-            result = f"{subject}练习题：\n"
-            result += f"问题：{selected_exercise['question']}\n"
-            result += f"答案：{selected_exercise['answer']}\n"
-            
-            return result
+            selected_exercise = random.choice(self.exercise_library[subject])
+            return self.respond(params, EXERCISE_TEMPLATE, {"subject": subject, **selected_exercise})
         else:
-            return f"抱歉，没有找到关于 {subject} 的练习题。我们当前提供以下主题的练习题：{'、'.join(self.exercise_library.keys())}"
\ No newline at end of file
+            return self.respond(params, NO_EXERCISE_TEMPLATE,
+                                {"subject": subject, "topics": list(self.exercise_library)})
\ No newline at end of file
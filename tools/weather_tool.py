@@ -1,25 +1,127 @@
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 from tools.base_tool import BaseTool
+from core.cache import FRESH, STALE, TTLCache
+from core.http import shared_session
+from core.lazy import lazy_import
+from core.singleflight import SingleFlight
+
+# requests 在首次请求天气服务时才导入，只使用模拟数据的进程不承担导入开销
+requests = lazy_import("requests")
+
+
+def fetch_errors() -> Tuple[type, ...]:
+    """
+    请求天气服务时可能出现的异常：网络错误、响应格式错误
+    """
+    return requests.RequestException, ValueError, KeyError, IndexError, TypeError
+
+
+# 所有 WeatherTool 共享的上游请求线程池，与执行工具的共享线程池分开；
+# 池内任务只发起请求、从不等待其他任务，因此不会因池满而互相阻塞
+FETCH_WORKERS = 16
+_fetch_executor: Optional[ThreadPoolExecutor] = None
+_fetch_executor_lock = threading.Lock()
+
+
+def _get_fetch_executor() -> ThreadPoolExecutor:
+    global _fetch_executor
+    if _fetch_executor is None:
+        with _fetch_executor_lock:
+            if _fetch_executor is None:
+                _fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="weather-fetch")
+    return _fetch_executor
+
+
+def close() -> None:
+    """
+    关闭共享的上游请求线程池并等待进行中的请求结束，之后的请求会重新创建线程池
+    """
+    global _fetch_executor
+    with _fetch_executor_lock:
+        executor, _fetch_executor = _fetch_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def normalize_city(city: str) -> str:
+    """
+    规范化城市名称作为缓存键，例如 " 北京市 " 与 "北京" 视为同一城市
+
+    Args:
+        city (str): 城市名称
+
+    Returns:
+        str: 规范化后的名称
+    """
+    city = city.strip().lower()
+    if len(city) > 2 and city.endswith("市"):
+        city = city[:-1]
+    return city
 
 
 class WeatherTool(BaseTool):
     """
     天气查询工具，用于获取指定城市的天气信息
     """
-    
-    def __init__(self):
+
+    name = "weather"
+    description = "Get current weather information for a city"
+    parameters = {
+        "type": "object",
+        "properties": {
+            "city": {"type": "string", "description": "城市名称"},
+        },
+        "required": ["city"],
+    }
+    # 只有线程安全的天气数据缓存，共享后各 Agent 共用缓存和连接池
+    STATELESS = True
+
+    def __init__(self, api_url: Optional[str] = None, api_key: Optional[str] = None,
+                 timeout: Union[float, Tuple[float, float]] = (3.05, 10), retries: int = 2,
+                 pool_size: int = 10, cache_ttl: float = 600, stale_ttl: float = 3600,
+                 session: Optional["requests.Session"] = None, bulk_url: Optional[str] = None):
         """
         初始化天气工具
+
+        Args:
+            api_url (Optional[str]): 天气服务地址（OpenWeatherMap 兼容接口），为空时返回模拟数据
+            api_key (Optional[str]): 天气服务的 API Key
+            timeout (Union[float, Tuple[float, float]]): 请求超时（连接超时, 读取超时）
+            retries (int): 失败重试次数
+            pool_size (int): 连接池大小
+            cache_ttl (float): 缓存新鲜期（秒），缓存的是天气服务返回的原始数据
+            stale_ttl (float): 缓存过期后仍直接返回旧值、并在后台刷新的时长（秒）
+            session (Optional[requests.Session]): 自定义 HTTP 会话，默认使用进程内共享的连接池
+            bulk_url (Optional[str]): 批量查询地址，接受逗号分隔的 q 参数，
+                返回 {"list": [...]}（与请求顺序一致）；为空时逐个城市并发请求
         """
-        super().__init__("weather", "Get current weather information for a city")
+        super().__init__()
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self._session = session
+        self.bulk_url = bulk_url
+        self.cache = TTLCache(cache_ttl, stale_ttl)
+        # 同一城市的并发请求只向上游发起一次
+        self._flights = SingleFlight()
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            self._session = shared_session(self.pool_size, self.retries)
+        return self._session
 
     def execute(self, params: dict) -> str:
         """
         执行天气查询
-        
+
         Args:
             params (dict): 包含城市名称的参数字典
-            
+
         Returns:
             str: 天气信息
         """
@@ -27,15 +129,170 @@ class WeatherTool(BaseTool):
         if not city:
             return "错误：未提供城市名称"
 
-        # 这是一个模拟实现，实际应用中需要调用真实的天气API
-        # 例如：OpenWeatherMap, WeatherAPI等
+        if not self.api_url:
+            return self._mock(city)
+
+        key = normalize_city(city)
+        data = self._cached(key, city)
+        if data is None:
+            try:
+                data = self._flights.do(key, self._fetch, key, city)
+            except fetch_errors() as e:
+                return f"获取天气信息时出错：{str(e)}"
+        # 缓存的是原始数据，回复按调用方的写法生成
+        return self.format_weather(city.strip(), data)
+
+    def execute_many(self, cities: Iterable[str]) -> Dict[str, str]:
+        """
+        批量查询多个城市的天气：命中缓存的直接返回，其余城市合并为一次批量请求
+        （未配置 bulk_url 时并发逐个请求），正在被其他调用方请求的城市直接等待其结果
+
+        Args:
+            cities (Iterable[str]): 城市名称列表
+
+        Returns:
+            Dict[str, str]: 城市名称 -> 天气信息
+        """
+        results: Dict[str, str] = {}
+        # 规范化键 -> 该城市在输入中的各种写法
+        pending: Dict[str, List[str]] = {}
+        for city in cities:
+            if not city:
+                continue
+            if not self.api_url:
+                results[city] = self._mock(city)
+                continue
+            key = normalize_city(city)
+            data = self._cached(key, city)
+            if data is not None:
+                results[city] = self.format_weather(city.strip(), data)
+            else:
+                pending.setdefault(key, []).append(city)
+
+        if not pending:
+            return results
+
+        futures = {}
+        leading = {}
+        for key, names in pending.items():
+            future, leader = self._flights.acquire(key)
+            futures[key] = future
+            if leader:
+                leading[key] = names[0]
+
+        if leading:
+            if self.bulk_url and len(leading) > 1:
+                self._submit(leading, self._fetch_bulk_and_release, leading)
+            else:
+                for key, city in leading.items():
+                    self._submit([key], self._fetch_and_release, key, city)
+
+        wait(futures.values())
+        for key, future in futures.items():
+            error = future.exception()
+            for city in pending[key]:
+                if error is not None:
+                    results[city] = f"获取天气信息时出错：{str(error)}"
+                else:
+                    results[city] = self.format_weather(city.strip(), future.result())
+        return results
+
+    @staticmethod
+    def _mock(city: str) -> str:
+        # 未配置天气服务时返回模拟数据
+        return f"【模拟数据】{city}当前天气：晴朗，温度22°C，湿度65%，风速3m/s。"
+
+    def _cached(self, key: str, city: str) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存的天气数据；缓存已过期但仍在宽限期内时返回旧值并在后台刷新
+        """
+        cached, state = self.cache.get(key)
+        if state == FRESH:
+            return cached
+        if state == STALE:
+            self._refresh_in_background(key, city)
+            return cached
+        return None
+
+    def _fetch(self, key: str, city: str) -> Dict[str, Any]:
+        """
+        请求天气服务并将返回的数据写入缓存
+        """
+        params = {"q": city.strip(), "units": "metric", "lang": "zh_cn"}
+        if self.api_key:
+            params["appid"] = self.api_key
+        response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        # 提前校验数据格式，格式错误的数据不写入缓存
+        self.format_weather(city, data)
+        self.cache.set(key, data)
+        return data
+
+    def _fetch_and_release(self, key: str, city: str) -> None:
         try:
-            # 模拟API调用
-            # 在实际应用中，这里应该是真实的API请求
-            # response = requests.get(f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={API_KEY}")
-            # data = response.json()
-            
-            # 模拟返回数据
-            return f"【模拟数据】{city}当前天气：晴朗，温度22°C，湿度65%，风速3m/s。"
-        except Exception as e:
-            return f"获取天气信息时出错：{str(e)}"
\ No newline at end of file
+            result = self._fetch(key, city)
+        except BaseException as e:
+            self._flights.release(key, error=e)
+        else:
+            self._flights.release(key, result)
+
+    def _fetch_bulk_and_release(self, leading: Dict[str, str]) -> None:
+        """
+        一次批量请求多个城市，并为每个城市发布结果
+        """
+        try:
+            params = {"q": ",".join(city.strip() for city in leading.values()), "units": "metric", "lang": "zh_cn"}
+            if self.api_key:
+                params["appid"] = self.api_key
+            response = self.session.get(self.bulk_url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            items = response.json()["list"]
+            if len(items) != len(leading):
+                raise ValueError(f"批量接口返回 {len(items)} 条数据，期望 {len(leading)} 条")
+            results = {}
+            for (key, city), data in zip(leading.items(), items):
+                self.format_weather(city, data)
+                results[key] = data
+            for key, data in results.items():
+                self.cache.set(key, data)
+        except BaseException as e:
+            for key in leading:
+                self._flights.release(key, error=e)
+            return
+        for key, result in results.items():
+            self._flights.release(key, result)
+
+    def _refresh_in_background(self, key: str, city: str) -> None:
+        # 只有成为 leader 时才提交刷新任务，已有请求在进行时直接跳过，池内任务不会等待其他任务；
+        # 刷新失败时等待方收到异常，缓存中的旧值保留到下次请求重试
+        _, leader = self._flights.acquire(key)
+        if leader:
+            self._submit([key], self._fetch_and_release, key, city)
+
+    def _submit(self, keys: Iterable[str], func, *args) -> None:
+        """
+        向共享线程池提交请求任务；线程池已关闭时直接为这些键发布异常，避免等待方永久阻塞
+        """
+        try:
+            _get_fetch_executor().submit(func, *args)
+        except RuntimeError as e:
+            for key in keys:
+                self._flights.release(key, error=e)
+
+    @staticmethod
+    def format_weather(city: str, data: Dict[str, Any]) -> str:
+        """
+        将天气服务返回的数据格式化为回复文本
+
+        Args:
+            city (str): 城市名称
+            data (Dict[str, Any]): OpenWeatherMap 格式的天气数据
+
+        Returns:
+            str: 天气信息
+        """
+        description = data["weather"][0]["description"] if data.get("weather") else "未知"
+        main = data["main"]
+        wind = data.get("wind", {}).get("speed", 0)
+        return f"{city}当前天气：{description}，温度{main['temp']:g}°C，湿度{main['humidity']}%，风速{wind:g}m/s。"